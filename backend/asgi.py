@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Serve the read-heavy endpoints with their async views
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'backend.asgi_urls')
+# Under ASGI each request's database work runs in a thread of its own, so a
+# persistent connection would never be reused; close it after the request
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,24 @@
+"""
+URL configuration for the ASGI entry point, see backend.asgi
+
+The read-heavy GET endpoints resolve to async views first; every other
+route, and every other method on those paths, is backend.urls.
+"""
+from django.urls import include, path
+
+from backend.async_views import SYNC_URLCONF
+from goals import async_views as goal_views
+from scheduler import async_views as scheduler_views
+from time_tracking import async_views as time_views
+
+urlpatterns = [
+    path('api/', include([
+        path('users/<str:user_id>/time-entries/current_time_entry/', time_views.current_time_entry),
+        path('users/<str:user_id>/time-entries/recent_entries/', time_views.recent_entries),
+        path('users/<str:user_id>/time-entries/analytics/', time_views.analytics),
+        path('users/<int:user_id>/goals/', goal_views.user_goals),
+        path('users/<int:user_id>/goals/<int:pk>/', goal_views.goal_tree),
+        path('scheduling/high-priority/<str:user_id>/', scheduler_views.high_priority_tasks),
+    ])),
+    path('', include(SYNC_URLCONF)),
+]
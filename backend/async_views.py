@@ -0,0 +1,50 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.urls import resolve
+from django.views.decorators.csrf import csrf_exempt
+from functools import wraps
+from rest_framework.utils.encoders import JSONEncoder
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+# The URLconf of the sync DRF views, which the async views fall back to
+SYNC_URLCONF = 'backend.urls'
+
+
+def json_response(data, status: int = 200) -> JsonResponse:
+    """JSON encoded the way DRF renders it, so both stacks return the same body"""
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def async_reads(serves: Optional[Callable] = None):
+    """
+    Serve GET requests at a path with the decorated coroutine view
+
+    Every other request, and GETs for which serves(request) is false, goes
+    to the sync view the same path resolves to in SYNC_URLCONF, so an async
+    view only has to implement the common read.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method == 'GET' and (serves is None or serves(request)):
+                return await view(request, *args, **kwargs)
+            match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+            return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+        return wrapper
+    return decorator
+
+
+async def iterate_in_thread(iterator: Iterator) -> AsyncIterator:
+    """
+    Drive a sync iterator from the event loop, one item per sync_to_async call
+
+    Under ASGI, StreamingHttpResponse reads a sync iterator to the end in one
+    go before sending anything. Here each next() runs in the request's sync
+    thread, where its database connection lives, and is sent before the
+    next one is produced.
+    """
+    done = object()
+    next_item = sync_to_async(next)
+    while (item := await next_item(iterator, done)) is not done:
+        yield item
@@ -0,0 +1,129 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that keeps only the fields named in a `fields` kwarg
+
+    Serializers that rename their output keys in to_representation list the
+    renames in `output_names`; those keys are then the public names and the
+    only ones accepted. Unknown names are a ValidationError.
+    """
+    output_names: Dict[str, str] = {}
+
+    def __init__(self, *args, fields: Optional[Sequence[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields = fields
+        if fields is not None:
+            keep = self.resolve_fields(fields)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    def resolve_fields(self, names: Sequence[str]) -> Set[str]:
+        if self.output_names:
+            public = {output: name for name, output in self.output_names.items()}
+        else:
+            public = {name: name for name in self.fields}
+        unknown = [name for name in names if name not in public and name not in public.values()]
+        if unknown:
+            raise exceptions.ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}"})
+        return {public.get(name, name) for name in names}
+
+
+def _column_path(model, source: str) -> Optional[List[str]]:
+    """The model lookup a field source reads, or None if it is not a column"""
+    path = []
+    for name in source.split('.'):
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        path.append(name)
+        model = field.related_model
+    return path
+
+
+def _select_related_paths(select_related, prefix: str = '') -> List[str]:
+    if not isinstance(select_related, dict):
+        return []
+    paths = []
+    for name, nested in select_related.items():
+        paths.append(prefix + name)
+        paths.extend(_select_related_paths(nested, f'{prefix}{name}__'))
+    return paths
+
+
+def sparse_columns(serializer) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    (select_related paths, only() columns) covering a serializer's fields
+
+    Returns None when any field reads something other than a concrete
+    column, such as a method or a reverse relation, in which case the
+    queryset has to stay as it is.
+    """
+    model = serializer.Meta.model
+    related = set()
+    columns = {model._meta.pk.name}
+    for field in serializer.fields.values():
+        if field.source == '*':
+            return None
+        path = _column_path(model, field.source)
+        if path is None:
+            return None
+        for depth in range(1, len(path)):
+            related.add('__'.join(path[:depth]))
+            columns.add('__'.join(path[:depth]))
+        columns.add('__'.join(path))
+    return related, columns
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Field names from a comma-separated query parameter, None when absent"""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin for a `fields=a,b` query parameter on reads
+
+    The named fields are passed to the serializer, which must use
+    SparseFieldsetMixin, and filter_queryset narrows the columns selected to
+    the ones those fields read plus the paginator's ordering.
+    """
+    fields_query_param = 'fields'
+
+    def get_sparse_fields(self) -> Optional[List[str]]:
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        return parse_fields(request.query_params.get(self.fields_query_param))
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        selected = sparse_columns(self.get_serializer_class()(fields=fields))
+        if selected is None:
+            return queryset
+        related, columns = selected
+        # Relations the view already joins must keep their foreign keys
+        joined = _select_related_paths(queryset.query.select_related)
+        ordering = [field.lstrip('-') for field in getattr(self.paginator, 'ordering', ())]
+        return queryset.select_related(*related).only(*columns, *joined, *ordering)
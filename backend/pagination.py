@@ -0,0 +1,180 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from typing import Iterator, List, Optional, Sequence, Tuple
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a keyset cursor cannot be decoded for the given ordering"""
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque cursor for the ordering values of the last item on a page"""
+    raw = json.dumps([
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_values(cursor: str, count: int) -> List:
+    """The raw JSON values stored in a cursor, which must hold `count` of them"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != count:
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def decode_cursor(model, ordering: Sequence[str], cursor: str) -> List:
+    """Ordering values stored in a cursor, converted back to the fields' types"""
+    values = decode_values(cursor, len(ordering))
+    try:
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except ValidationError as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def after_cursor(ordering: Sequence[str], values: Sequence) -> Q:
+    """
+    Filter for the rows that sort after `values` in `ordering`
+
+    Expands the row comparison (a, b) > (x, y) into
+    a > x OR (a = x AND b > y), honouring '-' for descending fields.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def keyset_page(queryset, ordering: Sequence[str], cursor: Optional[str],
+                limit: int) -> Tuple[list, Optional[str]]:
+    """
+    One page of `queryset` in `ordering`, starting after `cursor`
+
+    The ordering must be unique and its fields non-null, for example
+    ('start_time', 'id'). Returns the items and the cursor for the next page,
+    which is None on the last page. Pages cost one indexed range query no
+    matter how deep the client has paged.
+    """
+    if cursor:
+        values = decode_cursor(queryset.model, ordering, cursor)
+        queryset = queryset.filter(after_cursor(ordering, values))
+
+    items = list(queryset.order_by(*ordering)[:limit + 1])
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor([getattr(last, field.lstrip('-')) for field in ordering])
+
+
+def keyset_chunks(queryset, ordering: Sequence[str], chunk_size: int) -> Iterator[list]:
+    """
+    Every row of `queryset` in `ordering`, as lists of at most chunk_size
+
+    Each chunk is a short query of its own that resumes after the last row
+    of the previous chunk, so nothing holds a server-side cursor or a
+    transaction open between chunks; transaction-mode poolers such as
+    PgBouncer cannot keep either across statements. Memory stays bounded by
+    one chunk. The ordering must be unique and its fields non-null.
+    """
+    values = None
+    while True:
+        chunk = queryset if values is None else queryset.filter(after_cursor(ordering, values))
+        rows = list(chunk.order_by(*ordering)[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        values = [getattr(rows[-1], field.lstrip('-')) for field in ordering]
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode
+
+    Requests that carry the cursor parameter (empty for the first page) are
+    paged by `ordering` with keyset_page, so there is no OFFSET scan and no
+    COUNT(*); the response has `next` and `next_cursor` instead of `count`.
+    Other requests keep the page numbers the API has always used. Actions
+    that return a whole collection call paginate_keyset instead, which
+    leaves them unpaged unless a cursor is sent.
+
+    Rows with NULL in an ordering field cannot be placed after a cursor and
+    are left out of keyset pages.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    max_limit = 1000
+
+    keyset = False
+    next_cursor = None
+
+    def keyset_requested(self, request) -> bool:
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_requested(request):
+            return self.paginate_keyset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_keyset(self, queryset, request) -> Optional[list]:
+        if not self.keyset_requested(request):
+            return None
+
+        self.request = request
+        self.keyset = True
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if queryset.model._meta.get_field(name).null:
+                queryset = queryset.filter(**{f'{name}__isnull': False})
+
+        cursor = request.query_params.get(self.cursor_query_param) or None
+        try:
+            items, self.next_cursor = keyset_page(queryset, self.ordering, cursor, self.get_limit(request))
+        except InvalidCursor as e:
+            raise exceptions.ValidationError({self.cursor_query_param: str(e)})
+        return items
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(limit, self.max_limit))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -68,7 +69,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'backend.urls'
+# backend.asgi switches to backend.asgi_urls, which adds the async read views
+ROOT_URLCONF = os.getenv('DJANGO_ROOT_URLCONF', 'backend.urls')
 
 TEMPLATES = [
     {
@@ -97,7 +99,7 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', 600)),
             conn_health_checks=True,
         )
     }
@@ -186,3 +188,48 @@ if not DEBUG:
     SECURE_HSTS_SECONDS = 31536000  # 1 year
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
+
+# Scheduler priority weights
+# Priority = (Urgency * urgency) + (Importance * importance) + (Progress * progress)
+SCHEDULER_PRIORITY_WEIGHTS = {
+    'urgency': float(os.getenv('SCHEDULER_URGENCY_WEIGHT', '0.4')),
+    'importance': float(os.getenv('SCHEDULER_IMPORTANCE_WEIGHT', '0.4')),
+    'progress': float(os.getenv('SCHEDULER_PROGRESS_WEIGHT', '0.2')),
+}
+
+# Complete/skip actions queue their replan for the run_scheduler_worker
+# process. Set to False to replan right after the request commits instead.
+SCHEDULER_ASYNC_RESCHEDULE = os.getenv('SCHEDULER_ASYNC_RESCHEDULE', 'True') == 'True'
+
+# Scheduler and analytics results are cached per user under a stamp that is
+# stored in the database (scheduler.DataVersion) and moved whenever the user's
+# data changes, so a write by any web or worker process invalidates the results
+# cached by all of them. SCHEDULER_CACHE_BACKEND only selects where the results
+# themselves are kept: 'locmem' (each process fills its own) or 'file' (shared
+# by the processes on one host); both evict least recently used entries once
+# SCHEDULER_CACHE_MAX_ENTRIES is reached.
+SCHEDULER_CACHE_BACKEND = os.getenv('SCHEDULER_CACHE_BACKEND', 'locmem')
+SCHEDULER_CACHE_TIMEOUT = int(os.getenv('SCHEDULER_CACHE_TIMEOUT', '300'))
+
+_scheduler_cache_options = {
+    'MAX_ENTRIES': int(os.getenv('SCHEDULER_CACHE_MAX_ENTRIES', '1000')),
+}
+if SCHEDULER_CACHE_BACKEND == 'file':
+    _scheduler_cache = {
+        'BACKEND': 'scheduler.cache.LRUFileBasedCache',
+        'LOCATION': os.getenv('SCHEDULER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'scheduler-cache')),
+        'OPTIONS': _scheduler_cache_options,
+    }
+else:
+    _scheduler_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'scheduler',
+        'OPTIONS': _scheduler_cache_options,
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'scheduler': _scheduler_cache,
+}
@@ -0,0 +1,28 @@
+from backend.async_views import async_reads, json_response
+
+from .models import Goal
+from .serializers import GoalSerializer
+from .tree import aload_goal_forest
+from .views import GoalPagination, GoalViewSet
+
+
+def _whole_tree(request) -> bool:
+    """Cursor pages and sparse fieldsets are left to the sync views"""
+    return (
+        GoalPagination.cursor_query_param not in request.GET
+        and GoalViewSet.fields_query_param not in request.GET
+    )
+
+
+@async_reads(serves=_whole_tree)
+async def user_goals(request, user_id):
+    goals = await aload_goal_forest(Goal.objects.filter(user_id=user_id).order_by('id'))
+    return json_response(GoalSerializer(goals, many=True).data)
+
+
+@async_reads(serves=_whole_tree)
+async def goal_tree(request, user_id, pk):
+    goals = await aload_goal_forest(Goal.objects.filter(pk=pk))
+    if not goals:
+        return json_response({'detail': "Not found."}, status=404)
+    return json_response(GoalSerializer(goals[0]).data)
@@ -0,0 +1,115 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Goal, GoalClosure
+
+BULK_BATCH_SIZE = 500
+
+
+def closure_rows(parents: Dict[int, Optional[int]]) -> List[Tuple[int, int, int]]:
+    """
+    (ancestor_id, descendant_id, depth) rows for a {goal_id: parent_id} map
+
+    Parent links that leave the map end the walk, and so does a cycle, so
+    corrupt hierarchies still produce a finite index.
+    """
+    rows = []
+    for goal_id in parents:
+        rows.append((goal_id, goal_id, 0))
+        seen = {goal_id}
+        ancestor_id, depth = parents[goal_id], 1
+        while ancestor_id is not None and ancestor_id in parents and ancestor_id not in seen:
+            rows.append((ancestor_id, goal_id, depth))
+            seen.add(ancestor_id)
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+def _create_links(rows: Iterable[Tuple[int, int, int]]):
+    GoalClosure.objects.bulk_create([
+        GoalClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+        for ancestor_id, descendant_id, depth in rows
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def check_move(goal: Goal, new_parent_id: Optional[int]):
+    """Refuse to put a goal under itself or under one of its own subgoals"""
+    if new_parent_id is None or goal.pk is None:
+        return
+    if GoalClosure.objects.filter(ancestor_id=goal.pk, descendant_id=new_parent_id).exists():
+        raise ValidationError("A goal cannot be moved under itself or one of its subgoals")
+
+
+def insert_goal(goal: Goal):
+    """Link a new goal to itself and to every ancestor of its parent"""
+    rows = [(goal.pk, goal.pk, 0)]
+    if goal.parent_id is not None:
+        rows.extend(
+            (ancestor_id, goal.pk, depth + 1)
+            for ancestor_id, depth in GoalClosure.objects.filter(
+                descendant_id=goal.parent_id
+            ).values_list('ancestor_id', 'depth')
+        )
+    _create_links(rows)
+
+
+def insert_goals(parents: Dict[int, Optional[int]]):
+    """
+    Link a batch of new goals, given as {goal_id: parent_id}
+
+    Parents outside the batch must be existing goals; their ancestors are
+    read in one query, so a whole new tree is linked in two queries.
+    """
+    rows = closure_rows(parents)
+    outside = {parent_id for parent_id in parents.values() if parent_id is not None and parent_id not in parents}
+    above = defaultdict(list)
+    for ancestor_id, descendant_id, depth in GoalClosure.objects.filter(
+        descendant_id__in=outside
+    ).values_list('ancestor_id', 'descendant_id', 'depth'):
+        above[descendant_id].append((ancestor_id, depth))
+
+    # Every goal also sits below whatever is above the top of its batch chain
+    for ancestor_id, goal_id, depth in list(rows):
+        rows.extend(
+            (outer_id, goal_id, depth + 1 + outer_depth)
+            for outer_id, outer_depth in above.get(parents[ancestor_id], ())
+        )
+    _create_links(rows)
+
+
+def move_goal(goal: Goal):
+    """
+    Re-link a goal's whole subtree under its current parent
+
+    Links inside the subtree are kept; links from the old ancestors are
+    replaced by links from the new parent's ancestors.
+    """
+    with transaction.atomic():
+        subtree = list(GoalClosure.objects.filter(ancestor_id=goal.pk).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        GoalClosure.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+
+        if goal.parent_id is not None:
+            new_ancestors = list(GoalClosure.objects.filter(
+                descendant_id=goal.parent_id
+            ).values_list('ancestor_id', 'depth'))
+            _create_links(
+                (ancestor_id, descendant_id, ancestor_depth + 1 + descendant_depth)
+                for ancestor_id, ancestor_depth in new_ancestors
+                for descendant_id, descendant_depth in subtree
+            )
+
+
+def rebuild_goal_closure() -> int:
+    """Recompute the whole index from Goal.parent"""
+    parents = dict(Goal.objects.values_list('id', 'parent_id'))
+    rows = closure_rows(parents)
+    with transaction.atomic():
+        GoalClosure.objects.all().delete()
+        _create_links(rows)
+    return len(rows)
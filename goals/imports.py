@@ -0,0 +1,82 @@
+from django.db import transaction
+from typing import Dict, List, NamedTuple
+
+from scheduler.cache import bump_data_version
+
+from .hierarchy import BULK_BATCH_SIZE, insert_goals
+from .models import Goal, Task
+
+MAX_TREE_SIZE = 5000
+
+
+class CreatedTree(NamedTuple):
+    """Ids of the created rows by the request's temporary keys"""
+    goals: Dict[str, int]
+    tasks: Dict[str, int]
+
+
+def goal_levels(goals: List[Dict]) -> List[List[Dict]]:
+    """Goals grouped by their depth in the tree, in input order within a level"""
+    by_key = {goal['key']: goal for goal in goals}
+    depths = {}
+    for goal in goals:
+        # Walk up to the nearest goal with a known depth, then back down
+        chain = []
+        node = goal
+        while node is not None and node['key'] not in depths:
+            chain.append(node)
+            node = by_key.get(node.get('parent_key'))
+        depth = -1 if node is None else depths[node['key']]
+        for node in reversed(chain):
+            depth += 1
+            depths[node['key']] = depth
+
+    levels = []
+    for goal in goals:
+        level = depths[goal['key']]
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(goal)
+    return levels
+
+
+def create_goal_tree(user, goals: List[Dict]) -> CreatedTree:
+    """
+    Create goals and their tasks from GoalTreeCreateSerializer data in one transaction
+
+    Each level of the tree is one bulk insert, since a goal needs its
+    parent's id, and all tasks go in with one more. bulk_create skips the
+    save signals, so the closure index is linked with insert_goals and the
+    user's cached scheduler data is invalidated here.
+    """
+    goal_ids = {}
+    task_ids = {}
+    with transaction.atomic():
+        for level in goal_levels(goals):
+            created = Goal.objects.bulk_create([
+                Goal(
+                    user=user,
+                    parent_id=goal_ids[goal['parent_key']] if goal.get('parent_key') else goal.get('parent'),
+                    **{name: value for name, value in goal.items() if name not in ('key', 'parent', 'parent_key', 'tasks')}
+                )
+                for goal in level
+            ], batch_size=BULK_BATCH_SIZE)
+            for goal, instance in zip(level, created):
+                goal_ids[goal['key']] = instance.pk
+        insert_goals({goal_ids[goal['key']]: goal_ids.get(goal.get('parent_key'), goal.get('parent')) for goal in goals})
+
+        tasks = [
+            (task.get('key'), Task(
+                goal_id=goal_ids[goal['key']],
+                category_id=task.get('category'),
+                **{name: value for name, value in task.items() if name not in ('key', 'category')}
+            ))
+            for goal in goals for task in goal.get('tasks', [])
+        ]
+        Task.objects.bulk_create([task for _, task in tasks], batch_size=BULK_BATCH_SIZE)
+        for key, task in tasks:
+            if key is not None:
+                task_ids[key] = task.pk
+
+    bump_data_version(user.pk)
+    return CreatedTree(goal_ids, task_ids)
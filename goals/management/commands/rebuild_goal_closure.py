@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from goals.hierarchy import rebuild_goal_closure
+
+
+class Command(BaseCommand):
+    help = 'Recompute the goal ancestor/descendant index from Goal.parent'
+
+    def handle(self, *args, **options):
+        count = rebuild_goal_closure()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} goal closure row(s)'))
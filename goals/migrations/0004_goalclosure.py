@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_closure(apps, schema_editor):
+    """Index the existing hierarchy, stopping at any parent cycle"""
+    Goal = apps.get_model('goals', 'Goal')
+    GoalClosure = apps.get_model('goals', 'GoalClosure')
+    parents = dict(Goal.objects.values_list('id', 'parent_id'))
+
+    links = []
+    for goal_id in parents:
+        links.append(GoalClosure(ancestor_id=goal_id, descendant_id=goal_id, depth=0))
+        seen = {goal_id}
+        ancestor_id, depth = parents[goal_id], 1
+        while ancestor_id is not None and ancestor_id in parents and ancestor_id not in seen:
+            links.append(GoalClosure(ancestor_id=ancestor_id, descendant_id=goal_id, depth=depth))
+            seen.add(ancestor_id)
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    GoalClosure.objects.bulk_create(links, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0003_alter_goal_options_alter_task_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='goals.goal')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='goals.goal')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='goals_goalc_descend_4136b2_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(backfill_closure, migrations.RunPython.noop),
+    ]
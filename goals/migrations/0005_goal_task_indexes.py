@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0004_goalclosure'),
+        ('time_tracking', '0006_timeentry_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'parent'], name='goals_goal_user_id_1ea3fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['goal', 'status'], name='goals_task_goal_id_00de33_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -31,6 +33,11 @@ class Goal(models.Model):
     
     progress = models.FloatField(default=0.0)  # 0.0 to 100.0
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'parent']),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.user.username}"
     
@@ -42,20 +49,76 @@ class Goal(models.Model):
         children.extend(self.tasks.all())
         return children
     
+    def ancestors(self, include_self=False):
+        """Goals above this one, root first, in one query"""
+        return Goal.objects.filter(
+            descendant_links__descendant=self,
+            descendant_links__depth__gte=0 if include_self else 1
+        ).order_by('-descendant_links__depth')
+    
+    def descendants(self, include_self=False, max_depth=None):
+        """Goals below this one, nearest levels first, in one query"""
+        filters = {
+            'ancestor_links__ancestor': self,
+            'ancestor_links__depth__gte': 0 if include_self else 1,
+        }
+        if max_depth is not None:
+            filters['ancestor_links__depth__lte'] = max_depth
+        return Goal.objects.filter(**filters).order_by('ancestor_links__depth', 'id')
+    
+    def subtree_tasks(self):
+        """Tasks of this goal and all goals below it, in one query"""
+        return Task.objects.filter(goal__ancestor_links__ancestor=self)
+    
     @property
     def total_time_spent_recursive(self):
         """Calculate total time spent recursively on all tasks under this goal"""
-        total_time = 0
-        
-        # Add time from direct tasks
-        for task in self.tasks.all():
-            total_time += task.actual_time_spent
+        from .tree import subtree_time_totals
         
-        # Add time from subgoals recursively
-        for subgoal in self.subgoals.all():
-            total_time += subgoal.total_time_spent_recursive
-        
-        return total_time
+        # One recursive query over the whole subtree
+        return subtree_time_totals(self).total
+
+class GoalClosure(models.Model):
+    """
+    Ancestor/descendant index of the goal hierarchy
+    
+    There is one row for every goal and each goal above it, plus one row
+    pairing each goal with itself at depth 0. Rows are kept in step with
+    Goal.parent by the signals in goals.signals; see goals.hierarchy.
+    """
+    ancestor = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+    
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+def tracked_minutes(category: str, user: str):
+    """
+    Minutes `user` tracked in `category`, both paths from the outer query, as
+    an aggregate subquery; 0 when there are none
+    """
+    from time_tracking.models import DailyTimeRollup
+    
+    minutes = DailyTimeRollup.objects.filter(
+        category=OuterRef(category),
+        user=OuterRef(user)
+    ).order_by().values('category').annotate(total=Sum('minutes')).values('total')
+    return Coalesce(Subquery(minutes, output_field=FloatField()), Value(0.0))
+
+class TaskQuerySet(models.QuerySet):
+    def with_actual_time_spent(self):
+        """
+        Annotate time_spent_minutes, the minutes the task's owner tracked in
+        the task's category, as one aggregate subquery for the whole list
+        """
+        return self.annotate(time_spent_minutes=tracked_minutes('category', 'goal__user'))
 
 class Task(models.Model):
     TASK_STATUS_CHOICES = [
@@ -80,24 +143,32 @@ class Task(models.Model):
     
     estimated_time = models.IntegerField(default=0)  # in minutes
     
+    objects = TaskQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['goal', 'status']),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.goal.name}"
     
     @property
     def actual_time_spent(self):
         """Calculate actual time spent on this task based on time entries in the category"""
+        if hasattr(self, 'time_spent_minutes'):
+            # Annotated by TaskQuerySet.with_actual_time_spent
+            return self.time_spent_minutes or 0
+        
         if not self.category:
             return 0
         
-        from time_tracking.models import TimeEntry
-        
-        # Get all time entries for this category
-        time_entries = TimeEntry.objects.filter(category=self.category)
+        from time_tracking.models import DailyTimeRollup
         
-        total_minutes = 0
-        for entry in time_entries:
-            if entry.start_time and entry.end_time:
-                duration = entry.end_time - entry.start_time
-                total_minutes += duration.total_seconds() / 60
+        # Minutes the task's owner tracked in this category, from the daily rollups
+        total_minutes = DailyTimeRollup.objects.filter(
+            category=self.category,
+            user_id=self.goal.user_id
+        ).aggregate(total=Sum('minutes'))['total']
         
-        return total_minutes
\ No newline at end of file
+        return total_minutes or 0
\ No newline at end of file
@@ -1,7 +1,20 @@
 from rest_framework import serializers
+from typing import Optional
+from django.db.models import Prefetch
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .hierarchy import check_move
 from .models import Goal, Task
+from .tree import subtree_time_totals
+from backend.fieldsets import SparseFieldsetMixin
 from django.contrib.auth.models import User
 
+def prefetch_tasks():
+    """Prefetch a goal's tasks with actual time spent annotated in the same query"""
+    return Prefetch(
+        'tasks',
+        queryset=Task.objects.with_actual_time_spent().select_related('category')
+    )
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -20,7 +33,7 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'completed_at', 'actual_time_spent']
 
-class GoalSerializer(serializers.ModelSerializer):
+class GoalSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     subgoals = serializers.SerializerMethodField()
     tasks = TaskSerializer(many=True, read_only=True)
     parent_name = serializers.CharField(source='parent.name', read_only=True)
@@ -34,10 +47,24 @@ class GoalSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'completed_at', 'progress']
     
+    def validate_parent(self, value):
+        """Refuse to move a goal under itself or under one of its own subgoals"""
+        if self.instance is not None and value is not None:
+            try:
+                check_move(self.instance, value.pk)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        return value
+    
     def get_subgoals(self, obj):
         """Get immediate subgoals only (1 level deep)"""
         subgoals = obj.subgoals.all()
-        return GoalSerializer(subgoals, many=True, context=self.context).data
+        if 'subgoals' not in getattr(obj, '_prefetched_objects_cache', {}):
+            # Not loaded with goals.tree.load_goal_forest, so fetch this level
+            subgoals = subgoals.prefetch_related(prefetch_tasks())
+        return GoalSerializer(
+            subgoals, many=True, context=self.context, fields=self.requested_fields
+        ).data
     
 
 class GoalCreateSerializer(serializers.ModelSerializer):
@@ -59,19 +86,6 @@ class GoalCreateSerializer(serializers.ModelSerializer):
         """Use GoalSerializer for response representation"""
         return GoalSerializer(instance, context=self.context).data
 
-class GoalTreeSerializer(serializers.ModelSerializer):
-    """Serializer for tree visualization"""
-    children = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Goal
-        fields = ['id', 'name', 'children']
-    
-    def get_children(self, obj):
-        """Get immediate children for tree structure"""
-        children = obj.subgoals.all()
-        return [{'subgoal_name': child.name, 'goal_id': child.id} for child in children]
-
 class GoalAnalyticsSerializer(serializers.ModelSerializer):
     """Serializer for goal analytics"""
     immediate_children = serializers.SerializerMethodField()
@@ -83,21 +97,30 @@ class GoalAnalyticsSerializer(serializers.ModelSerializer):
     
     def get_immediate_children(self, obj):
         """Get 1-level breakdown of immediate children with time spent"""
+        totals = self._subtree_totals(obj)
         result = {}
         
-        # Add subgoals with recursive time calculation
+        # Add subgoals with the time of their whole subtree
         for subgoal in obj.subgoals.all():
-            result[subgoal.name] = subgoal.total_time_spent_recursive
+            result[subgoal.name] = totals.subgoals.get(subgoal.id, 0)
         
         # Add direct tasks with their time spent
         for task in obj.tasks.all():
-            result[task.title] = task.actual_time_spent
+            result[task.title] = totals.tasks.get(task.id, 0)
         
         return result
     
     def get_total_time_spent(self, obj):
         """Calculate total time spent on this goal and all its children"""
-        return obj.total_time_spent_recursive
+        return self._subtree_totals(obj).total
+    
+    def _subtree_totals(self, obj):
+        # Both fields come from the same recursive query
+        if not hasattr(self, '_totals_by_goal'):
+            self._totals_by_goal = {}
+        if obj.pk not in self._totals_by_goal:
+            self._totals_by_goal[obj.pk] = subtree_time_totals(obj)
+        return self._totals_by_goal[obj.pk]
 
 class TaskCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -112,3 +135,128 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         if value.user != self.context['request'].user:
             raise serializers.ValidationError("Task must belong to a goal owned by you")
         return value
+
+class TaskTreeSerializer(serializers.ModelSerializer):
+    """A task inside a goal tree; categories are checked in bulk by GoalTreeCreateSerializer"""
+    key = serializers.CharField(max_length=100, required=False)
+    category = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['key', 'title', 'description', 'category', 'status', 'is_recurring', 'due_date', 'estimated_time']
+
+class GoalNodeSerializer(serializers.ModelSerializer):
+    """
+    One goal of a tree, placed under an existing goal (parent) or under
+    another goal of the same request (parent_key)
+    """
+    key = serializers.CharField(max_length=100)
+    parent = serializers.IntegerField(required=False, allow_null=True)
+    parent_key = serializers.CharField(max_length=100, required=False, allow_null=True)
+    tasks = TaskTreeSerializer(many=True, required=False)
+
+    class Meta:
+        model = Goal
+        fields = ['key', 'parent', 'parent_key', 'name', 'description', 'status', 'priority', 'deadline', 'tasks']
+
+def flatten_goal_tree(nodes, parent_key=None):
+    """Nested `subgoals` as a pre-order list of goals linked by parent_key"""
+    flat = []
+    for node in nodes:
+        if not isinstance(node, dict):
+            flat.append(node)
+            continue
+        node = dict(node)
+        subgoals = node.pop('subgoals', None) or []
+        if parent_key is not None:
+            node['parent_key'] = parent_key
+        flat.append(node)
+        if isinstance(subgoals, list):
+            flat.extend(flatten_goal_tree(subgoals, node.get('key')))
+    return flat
+
+def goal_tree_size(data, limit: Optional[int] = None) -> int:
+    """
+    Goals and tasks in raw tree request data, nested or flat, counted before
+    any validation; counting stops once it passes limit
+    """
+    goals = data.get('goals') if isinstance(data, dict) else None
+    stack = list(goals) if isinstance(goals, list) else []
+    size = 0
+    while stack and (limit is None or size <= limit):
+        node = stack.pop()
+        size += 1
+        if isinstance(node, dict):
+            if isinstance(node.get('tasks'), list):
+                size += len(node['tasks'])
+            if isinstance(node.get('subgoals'), list):
+                stack.extend(node['subgoals'])
+    return size
+
+class GoalTreeCreateSerializer(serializers.Serializer):
+    """
+    Goals and tasks to create for the user in context, as nested `subgoals`
+    or as a flat list linked by `parent_key`
+
+    Nested goals are validated as the pre-order list they flatten to, so
+    per-goal errors are indexed in that order. Parent goals and task
+    categories must belong to the user; each is checked with one query.
+    """
+    goals = GoalNodeSerializer(many=True, allow_empty=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('goals'), list):
+            data = {**data, 'goals': flatten_goal_tree(data['goals'])}
+        return super().to_internal_value(data)
+
+    def validate_goals(self, goals):
+        from time_tracking.models import Category
+
+        user = self.context['user']
+        errors = {}
+        by_key = {}
+        for goal in goals:
+            if goal['key'] in by_key:
+                errors[goal['key']] = "Duplicate key"
+            by_key[goal['key']] = goal
+
+        for goal in goals:
+            parent_key = goal.get('parent_key')
+            if parent_key is not None and goal.get('parent') is not None:
+                errors[goal['key']] = "Give either parent or parent_key, not both"
+            elif parent_key is not None and parent_key not in by_key:
+                errors[goal['key']] = f"Unknown parent_key: {parent_key}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        for goal in goals:
+            seen = {goal['key']}
+            parent_key = goal.get('parent_key')
+            while parent_key is not None:
+                if parent_key in seen:
+                    raise serializers.ValidationError({goal['key']: "parent_key links form a cycle"})
+                seen.add(parent_key)
+                parent_key = by_key[parent_key].get('parent_key')
+
+        parents = {goal['parent'] for goal in goals if goal.get('parent') is not None}
+        owned = set(Goal.objects.filter(user=user, pk__in=parents).values_list('pk', flat=True))
+        for goal in goals:
+            if goal.get('parent') is not None and goal['parent'] not in owned:
+                errors[goal['key']] = f"Unknown parent goal: {goal['parent']}"
+
+        categories = {
+            task['category'] for goal in goals for task in goal.get('tasks', [])
+            if task.get('category') is not None
+        }
+        owned = set(Category.objects.filter(user=user, pk__in=categories).values_list('pk', flat=True))
+        for goal in goals:
+            for task in goal.get('tasks', []):
+                if task.get('category') is not None and task['category'] not in owned:
+                    errors[goal['key']] = f"Unknown category: {task['category']}"
+
+        task_keys = [task['key'] for goal in goals for task in goal.get('tasks', []) if 'key' in task]
+        if len(task_keys) != len(set(task_keys)):
+            raise serializers.ValidationError("Task keys must be unique")
+        if errors:
+            raise serializers.ValidationError(errors)
+        return goals
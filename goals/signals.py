@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from .hierarchy import check_move, insert_goal, move_goal
+from .models import Goal
+
+
+@receiver(pre_save, sender=Goal)
+def remember_previous_parent(sender, instance, **kwargs):
+    """Keep the stored parent so post_save can tell a reparent apart"""
+    instance._previous_parent_id = None
+    if instance.pk is not None:
+        instance._previous_parent_id = Goal.objects.filter(pk=instance.pk).values_list(
+            'parent_id', flat=True
+        ).first()
+        if instance.parent_id != instance._previous_parent_id:
+            # Backstop for saves outside the API; GoalSerializer.validate_parent
+            # turns the same check into a 400
+            check_move(instance, instance.parent_id)
+
+
+@receiver(post_save, sender=Goal)
+def goal_saved(sender, instance, created, **kwargs):
+    """Keep the closure index in step; deletes cascade to it on their own"""
+    with transaction.atomic():
+        if created:
+            insert_goal(instance)
+        elif instance.parent_id != getattr(instance, '_previous_parent_id', instance.parent_id):
+            move_goal(instance)
@@ -1,9 +1,16 @@
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Goal, Task
+from django.core.exceptions import ValidationError
+from .hierarchy import rebuild_goal_closure
+from .imports import MAX_TREE_SIZE
+from .models import Goal, GoalClosure, Task
+from .serializers import GoalSerializer
+from .tree import subtree_time_totals
 from time_tracking.models import Category, TimeEntry
+from scheduler.models import DataVersion
 from django.utils import timezone
 from datetime import timedelta
 
@@ -45,6 +52,27 @@ class GoalAPITests(APITestCase):
             estimated_time=120
         )
 
+    def test_moving_a_goal_under_its_own_subgoal_is_rejected(self):
+        url = f'/api/users/{self.user_id}/goals/{self.goal_a.id}/'
+        response = self.client.patch(url, {'parent': self.goal_b.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.data)
+        self.goal_a.refresh_from_db()
+        self.assertIsNone(self.goal_a.parent_id)
+
+    def test_moving_a_goal_updates_the_closure_table(self):
+        goal_d = Goal.objects.create(user=self.user, name="Goal D", parent=self.goal_b)
+        url = f'/api/users/{self.user_id}/goals/{self.goal_b.id}/'
+        response = self.client.patch(url, {'parent': self.goal_c.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(goal_d.ancestors().values_list('id', flat=True)),
+            [self.goal_a.id, self.goal_c.id, self.goal_b.id]
+        )
+        expected = set(GoalClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        rebuild_goal_closure()
+        self.assertEqual(set(GoalClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected)
+
     def test_create_goal_for_user(self):
         url = f'/api/users/{self.user_id}/goals/'
         data = {
@@ -110,3 +138,267 @@ class GoalAPITests(APITestCase):
         
         # Task 2 should have 0 time (no time entries)
         self.assertEqual(children['Task 2'], 0)
+
+    def test_task_list_annotates_time_spent_in_one_query(self):
+        start_time = timezone.now() - timedelta(hours=2)
+        TimeEntry.objects.create(
+            user=self.user, category=self.category1, description="Study session",
+            start_time=start_time, end_time=start_time + timedelta(hours=1)
+        )
+        # Another user's time in the same category is not counted
+        other = User.objects.create_user(username='other', password='testpass123')
+        TimeEntry.objects.create(
+            user=other, category=self.category1, description="Study session",
+            start_time=start_time, end_time=start_time + timedelta(hours=1)
+        )
+
+        url = f'/api/users/{self.user_id}/goals/{self.goal_a.id}/tasks/'
+        # Page count plus one query for the tasks and their time
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        time_spent = {task['title']: task['actual_time_spent'] for task in response.data['results']}
+        self.assertEqual(time_spent, {'Task 1': 60.0, 'Task 2': 0})
+
+    def test_goal_forest_is_serialized_in_constant_queries(self):
+        url = f'/api/users/{self.user_id}/goals/'
+        # Requested goals, their descendants and the annotated tasks
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        expected = GoalSerializer(Goal.objects.filter(user=self.user).order_by('id'), many=True).data
+        self.assertEqual(response.data, expected)
+
+        # A deeper and wider forest costs the same
+        parent = self.goal_c
+        for depth in range(5):
+            parent = Goal.objects.create(user=self.user, name=f"Level {depth}", parent=parent)
+            Task.objects.create(goal=parent, title=f"Task at {depth}", category=self.category1)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(
+            response.data[0]['subgoals'][1]['subgoals'][0]['tasks'][0]['title'], "Task at 0"
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'{url}{self.goal_a.id}/')
+        self.assertEqual(response.data, GoalSerializer(Goal.objects.get(pk=self.goal_a.id)).data)
+        self.assertEqual(self.client.get(f'{url}0/').status_code, 404)
+
+    def test_by_user_pages_goals_with_a_cursor(self):
+        url = f'/api/users/{self.user_id}/goals/'
+        first = self.client.get(url, {'cursor': '', 'limit': 2}).data
+        self.assertEqual([goal['id'] for goal in first['results']], [self.goal_a.id, self.goal_b.id])
+        self.assertEqual(
+            first['results'][0],
+            GoalSerializer(Goal.objects.get(pk=self.goal_a.id)).data
+        )
+        second = self.client.get(url, {'cursor': first['next_cursor'], 'limit': 2}).data
+        self.assertEqual([goal['id'] for goal in second['results']], [self.goal_c.id])
+        self.assertIsNone(second['next_cursor'])
+
+        # Sparse fieldsets apply to nested subgoals as well
+        response = self.client.get(url, {'cursor': '', 'limit': 1, 'fields': 'id,subgoals'})
+        self.assertEqual(response.data['results'], [{
+            'id': self.goal_a.id,
+            'subgoals': [{'id': self.goal_b.id, 'subgoals': []}, {'id': self.goal_c.id, 'subgoals': []}],
+        }])
+
+    def test_async_goal_trees_match_the_sync_views(self):
+        url = f'/api/users/{self.user_id}/goals/'
+        # Cursor pages are handed on to the sync view
+        for path in [url, f'{url}{self.goal_b.id}/', f'{url}0/', f'{url}?cursor=&limit=1']:
+            expected = self.client.get(path)
+            with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+                response = async_to_sync(self.async_client.get)(path)
+                self.assertEqual(response.resolver_match.func.__module__, 'goals.async_views')
+            self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()), path)
+
+        # Writes on the same path go to the sync view
+        with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+            response = async_to_sync(self.async_client.post)(
+                url, {'name': "Goal D"}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Goal.objects.filter(user=self.user, name="Goal D").exists())
+
+    def test_tree_widget_returns_the_full_subtree_with_etag(self):
+        goal_d = Goal.objects.create(user=self.user, name="Goal D", parent=self.goal_b)
+        start_time = timezone.now() - timedelta(hours=3)
+        TimeEntry.objects.create(
+            user=self.user, category=self.category1, description="Session",
+            start_time=start_time, end_time=start_time + timedelta(minutes=60)
+        )
+
+        url = f'/api/users/{self.user_id}/goals/{self.goal_a.id}/tree_widget/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['children'], [
+            {'subgoal_name': 'Goal B', 'goal_id': self.goal_b.id},
+            {'subgoal_name': 'Goal C', 'goal_id': self.goal_c.id},
+        ])
+        nodes = {node['goal_id']: node for node in response.data['nodes']}
+        self.assertEqual(nodes[goal_d.id]['parent_id'], self.goal_b.id)
+        self.assertEqual(nodes[goal_d.id]['depth'], 2)
+        self.assertEqual(nodes[self.goal_a.id]['task_count'], 2)
+        # Task 1 and Task 3 both track the Study category
+        self.assertAlmostEqual(nodes[self.goal_b.id]['time_spent'], 60.0)
+        self.assertAlmostEqual(nodes[self.goal_a.id]['time_spent'], 120.0)
+
+        # Only the owner lookup, with its data stamp, runs for an unchanged tree
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        Task.objects.create(goal=goal_d, title="Task 4")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        # The stamp is shared, so a write made by another process, such as the
+        # scheduler worker, is seen without touching this process's cache
+        etag = self.client.get(url)['ETag']
+        DataVersion.objects.filter(user=self.user).update(version='0' * 32)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        first = self.client.get(url + '?depth=1&limit=2').data
+        self.assertEqual([node['goal_id'] for node in first['nodes']], [self.goal_a.id, self.goal_b.id])
+        second = self.client.get(url + f"?depth=1&limit=2&cursor={first['next_cursor']}").data
+        self.assertEqual([node['goal_id'] for node in second['nodes']], [self.goal_c.id])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_subtree_totals_come_from_one_closure_query(self):
+        # Goal D sits two levels below Goal A, under Goal B
+        goal_d = Goal.objects.create(user=self.user, name="Goal D", parent=self.goal_b)
+        Task.objects.create(goal=goal_d, title="Task 4", category=self.category2, estimated_time=30)
+        start_time = timezone.now() - timedelta(hours=3)
+        for category, minutes in [(self.category1, 60), (self.category2, 45)]:
+            TimeEntry.objects.create(
+                user=self.user, category=category, description="Session",
+                start_time=start_time, end_time=start_time + timedelta(minutes=minutes)
+            )
+
+        with self.assertNumQueries(1):
+            totals = subtree_time_totals(self.goal_a)
+
+        # Task 1 (Study) 60 + Task 2 (Work) 45, Goal B: Task 3 (Study) 60 + Task 4 (Work) 45
+        self.assertAlmostEqual(totals.tasks[self.task1.id], 60.0)
+        self.assertAlmostEqual(totals.tasks[self.task2.id], 45.0)
+        self.assertAlmostEqual(totals.subgoals[self.goal_b.id], 105.0)
+        self.assertEqual(totals.subgoals[self.goal_c.id], 0)
+        self.assertAlmostEqual(totals.total, 210.0)
+        self.assertAlmostEqual(self.goal_b.total_time_spent_recursive, 105.0)
+
+        url = f'/api/users/{self.user_id}/goals/{self.goal_a.id}/analytics/'
+        response = self.client.get(url)
+        self.assertAlmostEqual(response.data['immediate_children']['Goal B'], 105.0)
+        self.assertAlmostEqual(response.data['total_time_spent'], 210.0)
+
+
+class GoalHierarchyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.root = Goal.objects.create(user=self.user, name="Degree")
+        self.year = Goal.objects.create(user=self.user, name="Year 1", parent=self.root)
+        self.course = Goal.objects.create(user=self.user, name="Algebra", parent=self.year)
+        self.other = Goal.objects.create(user=self.user, name="Side project")
+
+    def links(self):
+        return set(GoalClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_ancestors_descendants_and_tasks_are_single_queries(self):
+        task = Task.objects.create(goal=self.course, title="Homework")
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.course.ancestors()), [self.root, self.year])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.root.descendants()), [self.year, self.course])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.root.subtree_tasks()), [task])
+        self.assertEqual(list(self.root.descendants(max_depth=1)), [self.year])
+
+    def test_reparent_and_delete_keep_the_index_in_step(self):
+        self.year.parent = self.other
+        self.year.save()
+        self.assertEqual(list(self.course.ancestors()), [self.other, self.year])
+        self.assertEqual(list(self.root.descendants()), [])
+
+        expected = self.links()
+        self.assertEqual(rebuild_goal_closure(), len(expected))
+        self.assertEqual(self.links(), expected)
+
+        self.other.delete()
+        self.assertEqual(self.links(), {(self.root.id, self.root.id, 0)})
+
+    def test_goal_cannot_move_under_its_own_subgoal(self):
+        self.root.parent = self.course
+        with self.assertRaises(ValidationError):
+            self.root.save()
+
+class GoalTreeCreateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        self.degree = Goal.objects.create(user=self.user, name="Degree")
+        self.url = f'/api/users/{self.user.id}/goals/tree/'
+
+    def links(self):
+        return set(GoalClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_creates_nested_and_keyed_goals_level_by_level(self):
+        payload = {'goals': [
+            {'key': 'year', 'name': "Year 1", 'parent': self.degree.id, 'subgoals': [
+                {'key': 'algebra', 'name': "Algebra", 'tasks': [
+                    {'key': 'homework', 'title': "Homework", 'category': self.category.id, 'estimated_time': 30},
+                    {'title': "Revision"},
+                ]},
+            ]},
+            {'key': 'exam', 'name': "Final exam", 'parent_key': 'algebra', 'priority': 'high'},
+            {'key': 'side', 'name': "Side project"},
+        ]}
+        # User, parent and category checks, one insert per level, closure read and
+        # insert, tasks, the data stamp, plus the savepoint pair
+        with self.assertNumQueries(12):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        ids = response.data['goals']
+        self.assertEqual(set(ids), {'year', 'algebra', 'exam', 'side'})
+        exam = Goal.objects.get(pk=ids['exam'])
+        self.assertEqual((exam.name, exam.priority, exam.user), ("Final exam", 'high', self.user))
+        self.assertEqual(
+            list(exam.ancestors().values_list('id', flat=True)),
+            [self.degree.id, ids['year'], ids['algebra']]
+        )
+        self.assertIsNone(Goal.objects.get(pk=ids['side']).parent_id)
+
+        homework = Task.objects.get(pk=response.data['tasks']['homework'])
+        self.assertEqual((homework.goal_id, homework.category, homework.estimated_time), (ids['algebra'], self.category, 30))
+        self.assertEqual(Task.objects.filter(goal_id=ids['algebra']).count(), 2)
+
+        expected = self.links()
+        rebuild_goal_closure()
+        self.assertEqual(self.links(), expected)
+
+    def test_rejects_bad_keys_and_foreign_parents(self):
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        foreign = Goal.objects.create(user=other, name="Not yours")
+        for goals in [
+            [{'key': 'a', 'name': "A"}, {'key': 'a', 'name': "B"}],
+            [{'key': 'a', 'name': "A", 'parent_key': 'missing'}],
+            [{'key': 'a', 'name': "A", 'parent_key': 'b'}, {'key': 'b', 'name': "B", 'parent_key': 'a'}],
+            [{'key': 'a', 'name': "A", 'parent': foreign.id}],
+            [{'key': 'a', 'name': "A", 'tasks': [{'title': "T", 'category': 999}]}],
+            [{'name': "No key"}],
+        ]:
+            response = self.client.post(self.url, {'goals': goals}, format='json')
+            self.assertEqual(response.status_code, 400, goals)
+            self.assertIn('goals', response.data)
+        self.assertEqual(Goal.objects.filter(user=self.user).count(), 1)
+
+    def test_oversized_trees_are_rejected_before_validation(self):
+        # One goal with MAX_TREE_SIZE tasks, none of which is valid
+        goals = [{'key': 'a', 'name': "A", 'tasks': [{'category': 999}] * MAX_TREE_SIZE}]
+        # Only the user lookup runs
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'goals': goals}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
@@ -0,0 +1,143 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+from .models import Goal, GoalClosure, Task, tracked_minutes
+
+
+class SubtreeTotals(NamedTuple):
+    """Minutes tracked under a goal, broken down by its immediate children"""
+    subgoals: Dict[int, float]  # immediate subgoal id -> minutes in its whole subtree
+    tasks: Dict[int, float]     # direct task id -> minutes
+    total: float
+
+
+def subtree_time_totals(goal: Goal) -> SubtreeTotals:
+    """
+    Per-child and total minutes for a goal's subtree, in one query
+
+    The subtree is read from the closure table, one row per goal and task,
+    with each goal tagged by the immediate child of the root it sits under
+    (None for the root itself) and each task with its owner's minutes.
+    """
+    branch = GoalClosure.objects.filter(
+        descendant=OuterRef('id'), ancestor__parent_id=goal.pk
+    ).values('ancestor_id')[:1]
+    rows = Goal.objects.filter(ancestor_links__ancestor_id=goal.pk).annotate(
+        branch_id=Subquery(branch), minutes=tracked_minutes('tasks__category', 'user')
+    ).values_list('branch_id', 'tasks__id', 'minutes')
+
+    subgoals = {}
+    tasks = {}
+    total = 0
+    for branch_id, task_id, minutes in rows:
+        if branch_id is None:
+            if task_id is not None:
+                tasks[task_id] = minutes
+        else:
+            subgoals[branch_id] = subgoals.get(branch_id, 0) + minutes
+        total += minutes
+    return SubtreeTotals(subgoals, tasks, total)
+
+
+def _attach_prefetched(instance, related_name: str, objects: List):
+    """Fill a reverse relation's prefetch cache, as prefetch_related would"""
+    queryset = getattr(instance, related_name).all()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[related_name] = queryset
+
+
+def load_goal_forest(goals) -> List[Goal]:
+    """
+    Load goals with their whole subtrees and tasks in three queries
+
+    Every loaded goal gets its subgoals and tasks attached as prefetched
+    relations, with tasks annotated with their time spent, so GoalSerializer
+    walks the nested structure in memory. Returns the requested goals in
+    queryset order.
+    """
+    requested = list(goals.select_related('parent'))
+    by_id = {goal.id: goal for goal in requested}
+    for goal in _forest_descendants(by_id):
+        by_id.setdefault(goal.id, goal)
+    _attach_forest(by_id, list(_forest_tasks(by_id)))
+    return requested
+
+
+async def aload_goal_forest(goals) -> List[Goal]:
+    """load_goal_forest through the async ORM"""
+    requested = [goal async for goal in goals.select_related('parent')]
+    by_id = {goal.id: goal for goal in requested}
+    async for goal in _forest_descendants(by_id):
+        by_id.setdefault(goal.id, goal)
+    _attach_forest(by_id, [task async for task in _forest_tasks(by_id)])
+    return requested
+
+
+def _forest_descendants(by_id: Dict[int, Goal]):
+    return Goal.objects.filter(
+        ancestor_links__ancestor__in=list(by_id),
+        ancestor_links__depth__gt=0
+    ).select_related('parent').distinct().order_by('id')
+
+
+def _forest_tasks(by_id: Dict[int, Goal]):
+    return Task.objects.filter(goal_id__in=list(by_id)).with_actual_time_spent().select_related(
+        'category'
+    ).order_by('id')
+
+
+def _attach_forest(by_id: Dict[int, Goal], tasks: List[Task]):
+    tasks_by_goal = defaultdict(list)
+    for task in tasks:
+        tasks_by_goal[task.goal_id].append(task)
+
+    subgoals_by_goal = defaultdict(list)
+    for goal in sorted(by_id.values(), key=lambda goal: goal.id):
+        if goal.parent_id in by_id:
+            subgoals_by_goal[goal.parent_id].append(goal)
+
+    for goal_id, goal in by_id.items():
+        _attach_prefetched(goal, 'subgoals', subgoals_by_goal[goal_id])
+        _attach_prefetched(goal, 'tasks', tasks_by_goal[goal_id])
+
+
+def subtree_nodes(goal_id: int) -> List[Dict]:
+    """
+    Every goal in a subtree as a flat adjacency list, in two queries
+
+    Each node carries its parent id, its depth below the root, its number of
+    direct tasks and the minutes tracked in its whole subtree. Nodes are
+    ordered by (depth, id); an unknown goal gives an empty list.
+    """
+    nodes = list(
+        Goal.objects.filter(ancestor_links__ancestor_id=goal_id).values(
+            'id', 'name', 'parent_id', 'status', 'progress', depth=F('ancestor_links__depth')
+        ).order_by('depth', 'id')
+    )
+
+    own_tasks = {
+        row['goal_id']: row
+        for row in Task.objects.filter(
+            goal__ancestor_links__ancestor_id=goal_id
+        ).with_actual_time_spent().order_by().values('goal_id').annotate(
+            task_count=Count('id'), minutes=Sum('time_spent_minutes')
+        )
+    }
+
+    # Children sit deeper than their parents, so one bottom-up pass rolls
+    # every subtree total into its parent
+    time_spent = {}
+    for node in nodes:
+        row = own_tasks.get(node['id'])
+        node['task_count'] = row['task_count'] if row else 0
+        time_spent[node['id']] = row['minutes'] if row else 0
+    for node in reversed(nodes):
+        if node['depth'] > 0 and node['parent_id'] in time_spent:
+            time_spent[node['parent_id']] += time_spent[node['id']]
+    for node in nodes:
+        node['time_spent'] = time_spent[node['id']]
+    return nodes
@@ -15,6 +15,7 @@ urlpatterns = [
     path('users/<int:user_id>/', include([
         path('goals/', views.GoalViewSet.as_view({'post': 'by_user', 'get': 'by_user',})),
         path('goals/root/', views.GoalViewSet.as_view({'get': 'root_goals'})),
+        path('goals/tree/', views.GoalViewSet.as_view({'post': 'create_tree'})),
         path('goals/<int:pk>/', views.GoalViewSet.as_view({
             'get': 'retrieve',
             'put': 'update',
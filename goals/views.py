@@ -2,27 +2,50 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.http import Http404
+from django.utils.http import parse_etags
+from hashlib import md5
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
 from .models import Goal, Task
 from .serializers import (
-    GoalSerializer, GoalCreateSerializer, GoalTreeSerializer, GoalAnalyticsSerializer,
-    TaskSerializer, TaskCreateSerializer
+    GoalSerializer, GoalCreateSerializer, GoalAnalyticsSerializer,
+    GoalTreeCreateSerializer, TaskSerializer, TaskCreateSerializer, goal_tree_size, prefetch_tasks
 )
+from .tree import load_goal_forest, subtree_nodes
+from .imports import MAX_TREE_SIZE, create_goal_tree
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.pagination import InvalidCursor, KeysetPagination, decode_values, encode_cursor
+from scheduler.cache import data_version, data_version_subquery
 
-class GoalViewSet(viewsets.ModelViewSet):
+# Nodes returned per page by GoalViewSet.tree_widget
+TREE_PAGE_SIZE = 200
+MAX_TREE_PAGE_SIZE = 1000
+
+class GoalPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+class GoalViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = GoalSerializer
     permission_classes = [AllowAny]
     lookup_field = 'pk'
+    pagination_class = GoalPagination
     
     def get_queryset(self):
-        return Goal.objects.all()
+        return Goal.objects.prefetch_related(prefetch_tasks())
     
     def get_serializer_class(self):
         if self.action == 'create':
             return GoalCreateSerializer
         return GoalSerializer
     
+    def retrieve(self, request, *args, **kwargs):
+        goals = load_goal_forest(Goal.objects.filter(pk=kwargs[self.lookup_field]))
+        if not goals:
+            raise Http404("No Goal matches the given query.")
+        serializer = self.get_serializer(goals[0])
+        return Response(serializer.data)
+    
     def perform_create(self, serializer):
         serializer.save()
     
@@ -32,7 +55,7 @@ class GoalViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='root_goals/(?P<user_id>[^/.]+)')
     def root_goals(self, request, user_id=None):
         """Get all root goals (parent=null) for a user"""
-        goals = Goal.objects.filter(user_id=user_id, parent__isnull=True)
+        goals = load_goal_forest(Goal.objects.filter(user_id=user_id, parent__isnull=True).order_by('id'))
         serializer = self.get_serializer(goals, many=True)
         return Response(serializer.data)
     
@@ -45,15 +68,111 @@ class GoalViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'], url_path='tree_widget')
     def tree_widget(self, request, pk=None, user_id=None):
-        """Returns adjacency list for tree visualization"""
-        goal = self.get_object()
-        serializer = GoalTreeSerializer(goal)
-        return Response(serializer.data)
+        """
+        Returns adjacency list for tree visualization
+        
+        The whole subtree comes back as a flat list of nodes with parent ids,
+        task counts and the time tracked under each node.
+        
+        Query parameters:
+        - depth: only include goals up to this many levels below (default: all)
+        - limit: nodes per page (default: 200, max: 1000)
+        - cursor: next_cursor of the previous page
+        
+        Responses carry an ETag that changes with the owner's data, so an
+        unchanged tree revalidated with If-None-Match costs a 304.
+        """
+        # The owner and their stored data version, so the ETag moves with any
+        # write committed by any web or worker process
+        owner = Goal.objects.filter(pk=pk).annotate(
+            version=data_version_subquery()
+        ).values_list('user_id', 'version').first()
+        if owner is None:
+            raise Http404("No Goal matches the given query.")
+        owner_id, version = owner
+        if version is None:
+            version = data_version(owner_id)
+        
+        try:
+            depth = request.query_params.get('depth')
+            depth = max(int(depth), 0) if depth is not None else None
+            limit = max(1, min(int(request.query_params.get('limit', TREE_PAGE_SIZE)), MAX_TREE_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {"error": "depth and limit must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cursor = request.query_params.get('cursor')
+        
+        etag = '"%s"' % md5(
+            f'{pk}:{version}:{depth}:{limit}:{cursor}'.encode(), usedforsecurity=False
+        ).hexdigest()
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        nodes = subtree_nodes(pk)
+        if not nodes:
+            raise Http404("No Goal matches the given query.")
+        root = nodes[0]
+        
+        visible = [node for node in nodes if depth is None or node['depth'] <= depth]
+        if cursor:
+            try:
+                after = decode_values(cursor, 2)
+                if not all(isinstance(value, int) for value in after):
+                    raise InvalidCursor("Invalid cursor")
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            visible = [node for node in visible if (node['depth'], node['id']) > tuple(after)]
+        
+        page = visible[:limit]
+        next_cursor = None
+        if len(visible) > limit:
+            next_cursor = encode_cursor([page[-1]['depth'], page[-1]['id']])
+        
+        response = Response({
+            'id': root['id'],
+            'name': root['name'],
+            'children': [
+                {'subgoal_name': node['name'], 'goal_id': node['id']}
+                for node in nodes if node['depth'] == 1
+            ],
+            'depth': depth,
+            'nodes': [
+                {
+                    'goal_id': node['id'],
+                    'name': node['name'],
+                    'parent_id': node['parent_id'] if node['depth'] > 0 else None,
+                    'depth': node['depth'],
+                    'status': node['status'],
+                    'progress': node['progress'],
+                    'task_count': node['task_count'],
+                    'time_spent': node['time_spent'],
+                }
+                for node in page
+            ],
+            'next_cursor': next_cursor,
+        })
+        response['ETag'] = etag
+        return response
 
     @action(detail=False, methods=['get', 'post'], url_path='user/(?P<user_id>[^/.]+)')
     def by_user(self, request, user_id=None):
         if request.method == 'GET':
-            goals = Goal.objects.filter(user_id=user_id)
+            # With a cursor only one page of goals is loaded, by (created_at, id)
+            page = self.paginator.paginate_keyset(
+                Goal.objects.filter(user_id=user_id).only('id', 'created_at'), request
+            )
+            if page is not None:
+                goals = load_goal_forest(
+                    Goal.objects.filter(pk__in=[goal.pk for goal in page]).order_by('created_at', 'id')
+                )
+                serializer = self.get_serializer(goals, many=True)
+                return self.get_paginated_response(serializer.data)
+            
+            # The whole forest is loaded up front and nested in memory
+            goals = load_goal_forest(Goal.objects.filter(user_id=user_id).order_by('id'))
             serializer = self.get_serializer(goals, many=True)
             return Response(serializer.data)
         elif request.method == 'POST':
@@ -68,6 +187,30 @@ class GoalViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='tree')
+    def create_tree(self, request, user_id=None):
+        """
+        Create a whole tree of goals and tasks in one transaction
+
+        Goals carry a temporary `key` and either nested `subgoals` or a
+        `parent_key`; the response maps those keys (and any task keys) to
+        the ids created.
+        """
+        user = get_object_or_404(User, id=user_id)
+        # Checked on the raw data, before any node is validated or queried for
+        if goal_tree_size(request.data, limit=MAX_TREE_SIZE) > MAX_TREE_SIZE:
+            return Response(
+                {"error": f"At most {MAX_TREE_SIZE} goals and tasks can be created at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = GoalTreeCreateSerializer(data=request.data, context={'user': user, 'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        created = create_goal_tree(user, serializer.validated_data['goals'])
+        return Response({'goals': created.goals, 'tasks': created.tasks}, status=status.HTTP_201_CREATED)
+
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [AllowAny]
@@ -76,15 +219,21 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Use 'goal_id' from URL kwargs instead of 'goal_pk'
         goal_id = self.kwargs.get('goal_id')
+        tasks = Task.objects.with_actual_time_spent().select_related('category')
         if goal_id:
-            return Task.objects.filter(goal_id=goal_id)
-        return Task.objects.all()
+            return tasks.filter(goal_id=goal_id)
+        return tasks
     
     def get_serializer_class(self):
         if self.action == 'create':
             return TaskCreateSerializer
         return TaskSerializer
     
+    def perform_update(self, serializer):
+        task = serializer.save()
+        # The category may have changed, so fall back to the property
+        task.__dict__.pop('time_spent_minutes', None)
+    
     def perform_create(self, serializer):
         # Capture 'goal_id' from URL
         goal_id = self.kwargs.get('goal_id')
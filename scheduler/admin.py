@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserAvailability, ScheduledTask, SchedulingSession
+from .models import UserAvailability, ScheduledTask, SchedulingSession, RescheduleRequest
 
 @admin.register(UserAvailability)
 class UserAvailabilityAdmin(admin.ModelAdmin):
@@ -32,3 +32,10 @@ class SchedulingSessionAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'session_notes']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+
+@admin.register(RescheduleRequest)
+class RescheduleRequestAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'requested_version', 'completed_version', 'attempts', 'requested_at', 'completed_at']
+    list_filter = ['status']
+    search_fields = ['user__username']
+    readonly_fields = ['requested_at', 'started_at', 'completed_at', 'moved_tasks', 'last_error', 'attempts', 'retry_at']
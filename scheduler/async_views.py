@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+
+from backend.async_views import async_reads, json_response
+
+from .cache import acached_for_user
+from .services import SchedulingService
+from .views import high_priority_response
+
+
+@async_reads()
+async def high_priority_tasks(request, user_id):
+    try:
+        user = await User.objects.filter(id=user_id).afirst()
+    except (TypeError, ValueError):
+        user = None
+    if user is None:
+        return json_response({'detail': "Not found."}, status=404)
+    limit = int(request.GET.get('limit', 10))
+
+    async def compute():
+        scheduler = SchedulingService(user)
+        return high_priority_response(await scheduler.aget_high_priority_tasks(limit=limit))
+
+    return json_response(await acached_for_user(user.pk, 'high-priority', (limit,), compute))
@@ -0,0 +1,72 @@
+from django.utils import timezone
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Tuple
+
+from .cache import bump_data_version, get_cache, stored_version
+from .intervals import FreeInterval
+from .models import DataVersion, UserAvailability
+
+# Expanded horizons are keyed by the user's availability stamp, which signals
+# move in the database, so the timeout only bounds how long unused entries stay.
+EXPANSION_CACHE_TIMEOUT = 60 * 10
+
+
+class WeeklyPattern:
+    """
+    Weekly availability template that expands into concrete time slots
+
+    The template is a set of (day_of_week, start_time, end_time) windows, with
+    Monday as day 0. Expansion happens in memory, so any horizon costs at most
+    the single query needed to load the template.
+    """
+
+    def __init__(self, windows: Iterable[Tuple[int, object, object]]):
+        self._windows_by_day = defaultdict(list)
+        for day_of_week, start_time, end_time in windows:
+            self._windows_by_day[day_of_week].append((start_time, end_time))
+        for windows_for_day in self._windows_by_day.values():
+            windows_for_day.sort()
+
+    @classmethod
+    def for_user(cls, user) -> 'WeeklyPattern':
+        """Load the user's active availability template in one query"""
+        return cls(
+            UserAvailability.objects.filter(user=user, is_active=True).values_list(
+                'day_of_week', 'start_time', 'end_time'
+            )
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._windows_by_day)
+
+    def expand(self, first_date: date, last_date: date) -> List[FreeInterval]:
+        """Concrete slots for every day from first_date to last_date inclusive"""
+        slots = []
+        current_date = first_date
+        while current_date <= last_date:
+            for start_time, end_time in self._windows_by_day.get(current_date.weekday(), ()):
+                slots.append(FreeInterval(
+                    timezone.make_aware(datetime.combine(current_date, start_time)),
+                    timezone.make_aware(datetime.combine(current_date, end_time))
+                ))
+            current_date += timedelta(days=1)
+        return slots
+
+
+def expand_user_availability(user, first_date: date, last_date: date) -> List[FreeInterval]:
+    """Expanded slots for a user's horizon, served from the cache when possible"""
+    cache = get_cache()
+    version = stored_version(user.pk, DataVersion.SCOPE_AVAILABILITY)
+    key = f'scheduler:availability:{user.pk}:{version}:{first_date.isoformat()}:{last_date.isoformat()}'
+
+    slots = cache.get(key)
+    if slots is None:
+        slots = WeeklyPattern.for_user(user).expand(first_date, last_date)
+        cache.set(key, slots, EXPANSION_CACHE_TIMEOUT)
+    return slots
+
+
+def invalidate_user_availability(user_id):
+    """Drop every cached horizon for the user by moving to a new stamp"""
+    return bump_data_version(user_id, DataVersion.SCOPE_AVAILABILITY)
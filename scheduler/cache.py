@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db.models import OuterRef, Subquery
+from hashlib import md5
+from typing import Any, Awaitable, Callable
+import os
+import uuid
+
+from .models import DataVersion
+
+# Cache alias for scheduler and analytics results, see CACHES in settings
+CACHE_ALIAS = 'scheduler'
+
+# Results are invalidated through the user's data version; the timeout bounds
+# how long time-dependent results (urgency, "last 7 days") may be served.
+RESULT_CACHE_TIMEOUT = 60 * 5
+
+_MISSING = object()
+
+
+def get_cache():
+    """The scheduler cache, falling back to the default cache when not configured"""
+    alias = CACHE_ALIAS if CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS
+    return caches[alias]
+
+
+def _set_new_version(user_id, scope: str = DataVersion.SCOPE_DATA) -> str:
+    version = uuid.uuid4().hex
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user_id, scope=scope, version=version)],
+        update_conflicts=True, unique_fields=['user', 'scope'], update_fields=['version'],
+    )
+    return version
+
+
+def stored_version(user_id, scope: str = DataVersion.SCOPE_DATA) -> str:
+    """The user's stamp for scope, created on first use"""
+    version = DataVersion.objects.filter(user_id=user_id, scope=scope).values_list('version', flat=True).first()
+    if version is None:
+        version = _set_new_version(user_id, scope)
+    return version
+
+
+def data_version(user_id) -> str:
+    """
+    Stamp that changes whenever any of the user's goals, tasks, availability,
+    scheduled tasks or time entries change
+    """
+    return stored_version(user_id)
+
+
+def data_version_subquery(user_field: str = 'user_id') -> Subquery:
+    """
+    The stored data version of the row's user, for annotating a query that
+    already has to run; None when the user has no stamp yet
+    """
+    return Subquery(DataVersion.objects.filter(
+        user_id=OuterRef(user_field), scope=DataVersion.SCOPE_DATA
+    ).values('version')[:1])
+
+
+async def adata_version(user_id) -> str:
+    """data_version for async views"""
+    version = await DataVersion.objects.filter(
+        user_id=user_id, scope=DataVersion.SCOPE_DATA
+    ).values_list('version', flat=True).afirst()
+    if version is None:
+        version = await sync_to_async(_set_new_version)(user_id)
+    return version
+
+
+def bump_data_version(user_id, scope: str = DataVersion.SCOPE_DATA) -> str:
+    """
+    Move the user to a new stamp so every cached result is missed
+
+    The stamp is written in the caller's transaction, so other processes
+    move to it when the change commits and never see it if it rolls back.
+    """
+    return _set_new_version(user_id, scope)
+
+
+def cached_for_user(user_id, namespace: str, params, compute: Callable[[], Any],
+                    timeout=DEFAULT_TIMEOUT) -> Any:
+    """
+    Return compute() for the user, cached under their current data version
+
+    params identifies the variant of the result (query parameters, limits)
+    and must have a stable repr.
+    """
+    key = _result_key(user_id, namespace, params, data_version(user_id))
+    cache = get_cache()
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, _result_timeout(timeout))
+    return value
+
+
+async def acached_for_user(user_id, namespace: str, params, compute: Callable[[], Awaitable[Any]],
+                           timeout=DEFAULT_TIMEOUT) -> Any:
+    """cached_for_user for async views; compute is a coroutine function"""
+    key = _result_key(user_id, namespace, params, await adata_version(user_id))
+    cache = get_cache()
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        value = await compute()
+        await cache.aset(key, value, _result_timeout(timeout))
+    return value
+
+
+def _result_key(user_id, namespace: str, params, version: str) -> str:
+    digest = md5(repr(params).encode(), usedforsecurity=False).hexdigest()
+    return f'scheduler:result:{namespace}:{user_id}:{version}:{digest}'
+
+
+def _result_timeout(timeout):
+    if timeout is DEFAULT_TIMEOUT:
+        return getattr(settings, 'SCHEDULER_CACHE_TIMEOUT', RESULT_CACHE_TIMEOUT)
+    return timeout
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    File-based cache that evicts the least recently used entries
+
+    Django's file cache culls a random sample once MAX_ENTRIES is reached.
+    Here every hit refreshes the file's modification time and culling removes
+    the entries that were read or written longest ago.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
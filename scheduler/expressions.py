@@ -0,0 +1,78 @@
+from django.db.models import Case, F, FloatField, Func, IntegerField, Value, When
+from django.db.models.functions import Cast, Greatest
+from datetime import datetime
+from typing import Dict, Optional
+
+from .scoring import (
+    DEFAULT_IMPORTANCE, IMPORTANCE_BY_PRIORITY, NO_DEADLINE_URGENCY, get_priority_weights
+)
+
+
+class DaysUntil(Func):
+    """
+    Whole days from a datetime value until a datetime column, like
+    ``(column - now).days`` in Python
+
+    SQLite has no interval type, so the difference is taken in Julian days and
+    rounded to the millisecond before the integer division.
+    """
+    arg_joiner = ' - '
+    template = 'CAST(FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400) AS integer)'
+    output_field = IntegerField()
+
+    def __init__(self, column, now: datetime, **extra):
+        super().__init__(column, Value(now), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='(CAST(ROUND((julianday(%(expressions)s)) * 86400000) AS integer) / 86400000)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+
+def _float(expression):
+    return Cast(expression, output_field=FloatField())
+
+
+def priority_annotations(now: datetime, weights: Optional[Dict[str, float]] = None,
+                         prefix: str = '') -> Dict[str, object]:
+    """
+    The scheduler priority formula as ORM expressions for a Task queryset
+
+    Returns annotations for urgency, importance, progress and priority_score
+    that match SchedulingService.calculate_task_priority, so the database can
+    ORDER BY and LIMIT on the score. Pass prefix='task__' to annotate querysets
+    of models that point at Task, such as ScheduledTask.
+    """
+    weights = weights or get_priority_weights()
+    due_date = F(f'{prefix}due_date')
+
+    urgency = Case(
+        When(**{f'{prefix}due_date__isnull': True}, then=_float(Value(NO_DEADLINE_URGENCY))),
+        default=_float(Value(1.0)) / _float(Greatest(DaysUntil(due_date, now), Value(0)) + Value(1)),
+        output_field=FloatField()
+    )
+    importance = Case(
+        *[
+            When(**{f'{prefix}goal__priority': priority}, then=_float(Value(score)))
+            for priority, score in IMPORTANCE_BY_PRIORITY.items()
+        ],
+        default=_float(Value(DEFAULT_IMPORTANCE)),
+        output_field=FloatField()
+    )
+    progress = _float(Value(1.0)) - (F(f'{prefix}goal__progress') / _float(Value(100.0)))
+
+    priority_score = (
+        (urgency * _float(Value(weights['urgency'])))
+        + (importance * _float(Value(weights['importance'])))
+        + (progress * _float(Value(weights['progress'])))
+    )
+
+    return {
+        'urgency': urgency,
+        'importance': importance,
+        'progress': progress,
+        'priority_score': priority_score,
+    }
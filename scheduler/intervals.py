@@ -0,0 +1,321 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import random
+
+
+class FreeInterval(NamedTuple):
+    """A half-open [start, end) block of free time"""
+    start: datetime
+    end: datetime
+
+    @property
+    def duration_minutes(self) -> float:
+        return (self.end - self.start).total_seconds() / 60
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'priority', 'left', 'right', 'max_length')
+
+    def __init__(self, start, end, priority):
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_length = end - start
+
+
+def _update(node):
+    length = node.end - node.start
+    if node.left is not None and node.left.max_length > length:
+        length = node.left.max_length
+    if node.right is not None and node.right.max_length > length:
+        length = node.right.max_length
+    node.max_length = length
+    return node
+
+
+def _split(node, key, inclusive=False):
+    """Split into (starts < key, starts >= key), or (<=, >) when inclusive"""
+    if node is None:
+        return None, None
+    goes_left = node.start <= key if inclusive else node.start < key
+    if goes_left:
+        left, right = _split(node.right, key, inclusive)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key, inclusive)
+    node.left = right
+    return left, _update(node)
+
+
+def _merge(left, right):
+    """Merge two treaps where every start in left precedes every start in right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _first(node):
+    while node is not None and node.left is not None:
+        node = node.left
+    return node
+
+
+def _last(node):
+    while node is not None and node.right is not None:
+        node = node.right
+    return node
+
+
+def _walk(node):
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+def _leftmost_fit(node, length):
+    """Earliest node whose own length is at least `length`"""
+    while node is not None and node.max_length >= length:
+        if node.left is not None and node.left.max_length >= length:
+            node = node.left
+        elif node.end - node.start >= length:
+            return node
+        else:
+            node = node.right
+    return None
+
+
+class _LengthNode:
+    __slots__ = ('key', 'priority', 'left', 'right', 'max_start')
+
+    def __init__(self, key, priority):
+        self.key = key
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_start = key[1]
+
+
+def _update_length(node):
+    start = node.key[1]
+    if node.left is not None and node.left.max_start > start:
+        start = node.left.max_start
+    if node.right is not None and node.right.max_start > start:
+        start = node.right.max_start
+    node.max_start = start
+    return node
+
+
+def _split_length(node, key, inclusive=False):
+    """Split into (keys < key, keys >= key), or (<=, >) when inclusive"""
+    if node is None:
+        return None, None
+    goes_left = node.key <= key if inclusive else node.key < key
+    if goes_left:
+        left, right = _split_length(node.right, key, inclusive)
+        node.right = left
+        return _update_length(node), right
+    left, right = _split_length(node.left, key, inclusive)
+    node.left = right
+    return left, _update_length(node)
+
+
+def _merge_length(left, right):
+    """Merge two treaps where every key in left precedes every key in right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge_length(left.right, right)
+        return _update_length(left)
+    right.left = _merge_length(left, right.left)
+    return _update_length(right)
+
+
+def _leftmost_from(node, not_before):
+    """Node with the smallest key whose start is at or after not_before"""
+    while node is not None and node.max_start >= not_before:
+        if node.left is not None and node.left.max_start >= not_before:
+            node = node.left
+        elif node.key[1] >= not_before:
+            return node
+        else:
+            node = node.right
+    return None
+
+
+class _LengthIndex:
+    """
+    The free intervals as (length, start) keys, in a treap augmented with the
+    latest start in each subtree, for best-fit lookups
+    """
+
+    def __init__(self, rng: random.Random):
+        self._root = None
+        self._random = rng
+
+    def add(self, length: timedelta, start: datetime):
+        left, right = _split_length(self._root, (length, start))
+        node = _LengthNode((length, start), self._random.random())
+        self._root = _merge_length(_merge_length(left, node), right)
+
+    def remove(self, length: timedelta, start: datetime):
+        left, right = _split_length(self._root, (length, start))
+        _, right = _split_length(right, (length, start), inclusive=True)
+        self._root = _merge_length(left, right)
+
+    def shortest(self, length: timedelta, not_before: Optional[datetime]) -> Optional[Tuple]:
+        """Smallest (length, start) key at least `length` long starting at or after not_before"""
+        # (length,) sorts before every key of that length
+        shorter, fitting = _split_length(self._root, (length,))
+        node = _first(fitting) if not_before is None else _leftmost_from(fitting, not_before)
+        self._root = _merge_length(shorter, fitting)
+        return node.key if node is not None else None
+
+
+class FreeTimeIndex:
+    """
+    Sorted, mergeable index of disjoint free-time intervals
+
+    Intervals are kept in a treap ordered by start time and augmented with the
+    longest interval in each subtree, which serves earliest-fit lookups by
+    duration. A second treap ordered by (length, start) and augmented with the
+    latest start in each subtree serves best-fit lookups. Both lookups run in
+    expected O(log n), as do add and reserve apart from visiting the intervals
+    they merge or split.
+
+    Overlapping and adjacent intervals are merged: back-to-back availability
+    windows (09:00-10:00 and 10:00-11:00) become one interval, so a task may be
+    placed across the boundary between them.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]] = ()):
+        self._root = None
+        self._size = 0
+        self._random = random.Random(0)
+        self._by_length = _LengthIndex(self._random)
+        for start, end in intervals:
+            self.add(start, end)
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[dict]) -> 'FreeTimeIndex':
+        """Build an index from availability slot dicts with 'start' and 'end' keys"""
+        return cls((slot['start'], slot['end']) for slot in slots)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._root is not None
+
+    def __iter__(self) -> Iterator[FreeInterval]:
+        for node in _walk(self._root):
+            yield FreeInterval(node.start, node.end)
+
+    def to_slots(self) -> List[dict]:
+        """Return the free intervals in the slot dict format used by the scheduler"""
+        return [
+            {
+                'start': interval.start,
+                'end': interval.end,
+                'duration_minutes': interval.duration_minutes
+            }
+            for interval in self
+        ]
+
+    def add(self, start: datetime, end: datetime):
+        """
+        Mark [start, end) as free, merging with overlapping or adjacent
+        intervals; an interval that ends where this one starts, or starts
+        where it ends, is joined into one
+        """
+        if end <= start:
+            return
+
+        left, right = _split(self._root, start)
+        previous = _last(left)
+        if previous is not None and previous.end >= start:
+            left, _ = _split(left, previous.start)
+            self._forget(previous)
+            start = previous.start
+            end = max(end, previous.end)
+
+        middle, right = _split(right, end, inclusive=True)
+        for node in _walk(middle):
+            self._forget(node)
+            end = max(end, node.end)
+
+        self._root = _merge(_merge(left, self._make_node(start, end)), right)
+
+    def reserve(self, start: datetime, end: datetime):
+        """Remove [start, end) from the free time, splitting intervals as needed"""
+        if end <= start:
+            return
+
+        left, right = _split(self._root, start)
+        remainders = []
+
+        previous = _last(left)
+        if previous is not None and previous.end > start:
+            left, _ = _split(left, previous.start)
+            self._forget(previous)
+            remainders.append((previous.start, start))
+            if previous.end > end:
+                remainders.append((end, previous.end))
+
+        middle, right = _split(right, end)
+        for node in _walk(middle):
+            self._forget(node)
+            if node.end > end:
+                remainders.append((end, node.end))
+
+        for remainder_start, remainder_end in sorted(remainders):
+            if remainder_end > remainder_start:
+                left = _merge(left, self._make_node(remainder_start, remainder_end))
+        self._root = _merge(left, right)
+
+    def earliest_fit(self, minutes: float,
+                     not_before: Optional[datetime] = None) -> Optional[FreeInterval]:
+        """Earliest interval starting at or after not_before that can hold `minutes`"""
+        length = timedelta(minutes=minutes)
+        if not_before is None:
+            node = _leftmost_fit(self._root, length)
+        else:
+            left, right = _split(self._root, not_before)
+            node = _leftmost_fit(right, length)
+            self._root = _merge(left, right)
+
+        if node is None:
+            return None
+        return FreeInterval(node.start, node.end)
+
+    def best_fit(self, minutes: float,
+                 not_before: Optional[datetime] = None) -> Optional[FreeInterval]:
+        """Shortest interval starting at or after not_before that can hold `minutes`"""
+        key = self._by_length.shortest(timedelta(minutes=minutes), not_before)
+        if key is None:
+            return None
+        length, start = key
+        return FreeInterval(start, start + length)
+
+    def _make_node(self, start, end):
+        self._size += 1
+        self._by_length.add(end - start, start)
+        return _Node(start, end, self._random.random())
+
+    def _forget(self, node):
+        self._size -= 1
+        self._by_length.remove(node.end - node.start, node.start)
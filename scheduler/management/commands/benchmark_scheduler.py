@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduler.intervals import FreeTimeIndex
+
+
+def _legacy_place(slots, durations):
+    """Baseline list-of-dicts placement that schedule_tasks used before FreeTimeIndex"""
+    current_time = slots[0]['start'] if slots else None
+    placed = 0
+    for duration in durations:
+        suitable = [
+            slot for slot in slots
+            if slot['duration_minutes'] >= duration and slot['start'] >= current_time
+        ]
+        if not suitable:
+            continue
+        best = min(suitable, key=lambda x: x['start'])
+        task_end = best['start'] + timedelta(minutes=duration)
+
+        new_slots = []
+        for slot in slots:
+            if slot['end'] <= best['start'] or slot['start'] >= task_end:
+                new_slots.append(slot)
+            else:
+                if slot['start'] < best['start']:
+                    new_slots.append({
+                        'start': slot['start'],
+                        'end': best['start'],
+                        'duration_minutes': (best['start'] - slot['start']).total_seconds() / 60
+                    })
+                if slot['end'] > task_end:
+                    new_slots.append({
+                        'start': task_end,
+                        'end': slot['end'],
+                        'duration_minutes': (slot['end'] - task_end).total_seconds() / 60
+                    })
+        slots = new_slots
+        current_time = task_end
+        placed += 1
+    return placed
+
+
+def _indexed_place(slots, durations, best_fit=False):
+    """Placement through FreeTimeIndex, by earliest fit or by best fit"""
+    free_time = FreeTimeIndex.from_slots(slots)
+    find = free_time.best_fit if best_fit else free_time.earliest_fit
+    current_time = slots[0]['start'] if slots else None
+    placed = 0
+    for duration in durations:
+        slot = find(duration, not_before=current_time)
+        if slot is None:
+            continue
+        task_end = slot.start + timedelta(minutes=duration)
+        free_time.reserve(slot.start, task_end)
+        current_time = task_end
+        placed += 1
+    return placed
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark slot placement in schedule_tasks: list scan versus FreeTimeIndex, '
+        'with best-fit placement through the index alongside'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+            help='Task counts to benchmark'
+        )
+        parser.add_argument(
+            '--legacy-max', type=int, default=2000,
+            help='Skip the list-scan baseline above this many tasks'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'tasks':>8} {'slots':>8} {'list scan (ms)':>16} {'index (ms)':>12} {'speedup':>9} "
+            f"{'best fit (ms)':>14}"
+        )
+        for size in options['sizes']:
+            slots, durations = self._build_workload(size, options['seed'])
+
+            started = time.perf_counter()
+            placed = _indexed_place(slots, durations)
+            indexed_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            _indexed_place(slots, durations, best_fit=True)
+            best_fit_ms = (time.perf_counter() - started) * 1000
+
+            if size <= options['legacy_max']:
+                started = time.perf_counter()
+                legacy_placed = _legacy_place(slots, durations)
+                legacy_ms = (time.perf_counter() - started) * 1000
+                if legacy_placed != placed:
+                    self.stderr.write(f"Placement mismatch at {size} tasks: {legacy_placed} != {placed}")
+                legacy = f"{legacy_ms:16.1f}"
+                speedup = f"{legacy_ms / indexed_ms:8.1f}x"
+            else:
+                legacy = f"{'skipped':>16}"
+                speedup = f"{'-':>9}"
+
+            self.stdout.write(
+                f"{size:>8} {len(slots):>8} {legacy} {indexed_ms:12.1f} {speedup} {best_fit_ms:14.1f}"
+            )
+
+    def _build_workload(self, size, seed):
+        """Three availability blocks a day over enough days to hold every task"""
+        rng = random.Random(seed)
+        durations = [rng.choice([15, 30, 45, 60, 90, 120]) for _ in range(size)]
+
+        day = timezone.make_aware(datetime(2025, 1, 6))
+        slots = []
+        days = max(7, sum(durations) // (8 * 60) + 1)
+        for offset in range(days):
+            base = day + timedelta(days=offset)
+            for start_hour, end_hour in ((8, 11), (13, 17), (19, 22)):
+                start = base + timedelta(hours=start_hour)
+                end = base + timedelta(hours=end_hour)
+                slots.append({
+                    'start': start,
+                    'end': end,
+                    'duration_minutes': (end - start).total_seconds() / 60
+                })
+        return slots, durations
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from scheduler.queue import process_pending, recover_stale_requests
+
+
+class Command(BaseCommand):
+    help = 'Run the background worker that applies queued reschedule requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the queue once and exit'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Scheduler worker started')
+        while True:
+            close_old_connections()
+            recover_stale_requests()
+            processed = process_pending()
+            if processed:
+                self.stdout.write(f'Processed {processed} reschedule request(s)')
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:35
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RescheduleRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('idle', 'Idle'), ('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='idle', max_length=20)),
+                ('anchor', models.DateTimeField(blank=True, null=True)),
+                ('requested_version', models.IntegerField(default=0)),
+                ('completed_version', models.IntegerField(default=0)),
+                ('moved_tasks', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('last_error', models.TextField(blank=True)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reschedule_request', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
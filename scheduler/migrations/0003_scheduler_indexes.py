@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0005_goal_task_indexes'),
+        ('scheduler', '0002_reschedulerequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduledtask',
+            index=models.Index(fields=['user', 'status'], name='scheduler_s_user_id_ab6d05_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useravailability',
+            index=models.Index(fields=['user', 'is_active', 'day_of_week'], name='scheduler_u_user_id_e39844_idx'),
+        ),
+    ]
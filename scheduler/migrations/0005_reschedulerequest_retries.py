@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reschedulerequest',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reschedulerequest',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,8 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from goals.models import Goal, Task
+from .scoring import (
+    get_priority_weights, urgency_score, importance_score,
+    progress_score, weighted_score
+)
 import math
 
 class UserAvailability(models.Model):
@@ -18,6 +23,9 @@ class UserAvailability(models.Model):
     
     class Meta:
         unique_together = ['user', 'day_of_week', 'start_time', 'end_time']
+        indexes = [
+            models.Index(fields=['user', 'is_active', 'day_of_week']),
+        ]
     
     def clean(self):
         if self.start_time >= self.end_time:
@@ -26,6 +34,24 @@ class UserAvailability(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
 
+# Task and goal columns ScheduledTaskSerializer reads, on top of the
+# scheduled task's own
+LISTING_RELATED_FIELDS = [
+    'task__title', 'task__description', 'task__estimated_time', 'task__due_date',
+    'task__goal__name', 'task__goal__priority',
+]
+
+class ScheduledTaskQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Scheduled tasks joined to their task and goal in the same query,
+        selecting only the related columns the serializer reads
+        """
+        own_fields = [field.name for field in ScheduledTask._meta.concrete_fields]
+        return self.select_related('task__goal').only(
+            *own_fields, 'task__goal', *LISTING_RELATED_FIELDS
+        )
+
 class ScheduledTask(models.Model):
     """Scheduled task with priority score and scheduling metadata"""
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='schedules')
@@ -58,28 +84,23 @@ class ScheduledTask(models.Model):
     skip_count = models.IntegerField(default=0)
     last_calculated = models.DateTimeField(auto_now=True)
     
+    objects = ScheduledTaskQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-final_priority_score', 'scheduled_start']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.task.title} - Priority: {self.final_priority_score:.2f}"
     
     def calculate_priority_score(self):
         """Calculate the weighted priority score based on the AI scheduling algorithm"""
-        # Calculate urgency (1 / (days_left_to_deadline + 1))
-        urgency = 0.0
-        if self.task.due_date:
-            days_left = (self.task.due_date - timezone.now()).days
-            urgency = 1.0 / (max(days_left, 0) + 1)
-        else:
-            urgency = 0.1  # Low urgency for tasks without deadline
-        
-        # Calculate importance (priority level)
-        priority_map = {'high': 3.0, 'medium': 2.0, 'low': 1.0}
-        importance = priority_map.get(self.task.goal.priority, 2.0)
-        
-        # Calculate progress (1 - progress_percentage)
-        progress = 1.0 - (self.task.goal.progress / 100.0)
+        # Calculate urgency, importance (priority level) and progress (1 - progress_percentage)
+        urgency = urgency_score(self.task.due_date, timezone.now())
+        importance = importance_score(self.task.goal.priority)
+        progress = progress_score(self.task.goal.progress)
         
         # Store individual scores
         self.urgency_score = urgency
@@ -88,38 +109,40 @@ class ScheduledTask(models.Model):
         
         # Calculate final weighted score
         # Priority = (Urgency * 0.4) + (Importance * 0.4) + (Progress * 0.2)
-        self.final_priority_score = (urgency * 0.4) + (importance * 0.4) + (progress * 0.2)
+        self.final_priority_score = weighted_score(urgency, importance, progress, get_priority_weights())
         
         self.last_calculated = timezone.now()
         return self.final_priority_score
     
     def mark_completed(self):
-        """Mark task as completed and trigger rescheduling"""
-        self.status = 'completed'
-        self.actual_end = timezone.now()
-        self.save()
+        """Mark task as completed and queue rescheduling of the tasks after it"""
+        from .queue import enqueue_reschedule
         
-        # Trigger rescheduling for remaining tasks
-        from .services import SchedulingService
-        scheduler = SchedulingService(self.user)
-        scheduler.reschedule_remaining_tasks()
+        with transaction.atomic():
+            self.status = 'completed'
+            self.actual_end = timezone.now()
+            self.save()
+            
+            # Queue rescheduling for remaining tasks
+            return enqueue_reschedule(self.user, anchor=self.scheduled_start)
     
     def mark_skipped(self):
-        """Mark task as skipped and increase urgency for next scheduling"""
-        self.status = 'skipped'
-        self.skip_count += 1
-        self.save()
-        
-        # Increase urgency for the task
-        if self.task.due_date:
-            # Move deadline closer by 1 day for each skip
-            self.task.due_date = self.task.due_date - timezone.timedelta(days=1)
-            self.task.save()
+        """Mark task as skipped, increase urgency and queue rescheduling"""
+        from .queue import enqueue_reschedule
         
-        # Trigger rescheduling
-        from .services import SchedulingService
-        scheduler = SchedulingService(self.user)
-        scheduler.reschedule_remaining_tasks()
+        with transaction.atomic():
+            self.status = 'skipped'
+            self.skip_count += 1
+            self.save()
+            
+            # Increase urgency for the task
+            if self.task.due_date:
+                # Move deadline closer by 1 day for each skip
+                self.task.due_date = self.task.due_date - timezone.timedelta(days=1)
+                self.task.save()
+            
+            # Queue rescheduling
+            return enqueue_reschedule(self.user, anchor=self.scheduled_start)
 
 class SchedulingSession(models.Model):
     """Tracks scheduling sessions and their results"""
@@ -133,3 +156,65 @@ class SchedulingSession(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.session_date} - {self.total_tasks_scheduled} tasks"
+
+class RescheduleRequest(models.Model):
+    """
+    Background rescheduling work for one user
+
+    There is one row per user, so rapid successive complete/skip actions
+    coalesce into a single pending replan. Clients poll the versions to see
+    when their last action has been applied.
+    """
+    STATUS_CHOICES = [
+        ('idle', 'Idle'),
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='reschedule_request')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='idle')
+    
+    # Earliest point of the timeline touched by the pending actions
+    anchor = models.DateTimeField(null=True, blank=True)
+    requested_version = models.IntegerField(default=0)
+    completed_version = models.IntegerField(default=0)
+    
+    # Result of the last completed replan
+    moved_tasks = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(blank=True)
+    
+    # Failed replans in a row, and when the failed one goes back in the queue
+    attempts = models.IntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    
+    requested_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.status} v{self.completed_version}/{self.requested_version}"
+
+class DataVersion(models.Model):
+    """
+    Stamp of one scope of a user's data, moved whenever that data changes
+
+    Cached results are keyed by the stamp. It lives in the database so every
+    web and worker process sees a change as soon as the write commits.
+    """
+    SCOPE_DATA = 'data'
+    SCOPE_AVAILABILITY = 'availability'
+    
+    # No database constraint: stamps may be moved while the user's rows are
+    # being deleted, and a stale stamp for a deleted user is harmless
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    scope = models.CharField(max_length=20)
+    version = models.CharField(max_length=32)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope'], name='unique_user_data_version'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.scope} - {self.version}"
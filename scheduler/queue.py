@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+
+from .models import RescheduleRequest
+
+logger = logging.getLogger(__name__)
+
+# Running requests older than this are assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=5)
+
+# A failed replan is retried after RETRY_BACKOFF, doubling with every failure
+# in a row, until MAX_ATTEMPTS have failed
+RETRY_BACKOFF = timedelta(seconds=30)
+MAX_ATTEMPTS = 5
+
+
+def enqueue_reschedule(user, anchor: Optional[datetime] = None) -> RescheduleRequest:
+    """
+    Request a background replan for the user from `anchor` (defaults to now)
+
+    Call this inside the transaction that commits the state change. Requests
+    made while a replan is pending or running coalesce into the next replan,
+    keeping the earliest anchor, and every request bumps requested_version.
+    """
+    anchor = anchor or timezone.now()
+
+    with transaction.atomic():
+        request, _ = RescheduleRequest.objects.select_for_update().get_or_create(user=user)
+        if request.anchor is not None:
+            anchor = min(anchor, request.anchor)
+        request.anchor = anchor
+        if request.status != 'running':
+            # A running replan re-queues itself when it sees the newer version
+            request.status = 'pending'
+        request.requested_version += 1
+        request.requested_at = timezone.now()
+        # A new action gets a fresh set of retries
+        request.attempts = 0
+        request.retry_at = None
+        request.save(update_fields=[
+            'anchor', 'status', 'requested_version', 'requested_at', 'attempts', 'retry_at'
+        ])
+
+    if not getattr(settings, 'SCHEDULER_ASYNC_RESCHEDULE', True):
+        transaction.on_commit(lambda: process_pending(user_id=user.pk))
+
+    return request
+
+
+def claim_next(user_id=None) -> Optional[RescheduleRequest]:
+    """Mark the oldest pending request as running and return it"""
+    with transaction.atomic():
+        pending = RescheduleRequest.objects.filter(status='pending').order_by('requested_at')
+        if user_id is not None:
+            pending = pending.filter(user_id=user_id)
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+
+        request = pending.first()
+        if request is None:
+            return None
+
+        # The claimed version stays on the instance; requests arriving while
+        # this one runs start a fresh pending replan. The anchor stays in the
+        # row until the replan succeeds, so a failed or abandoned run is
+        # retried from the same point.
+        request.status = 'running'
+        request.started_at = timezone.now()
+        RescheduleRequest.objects.filter(pk=request.pk).update(
+            status=request.status, started_at=request.started_at
+        )
+    return request
+
+
+def run_request(request: RescheduleRequest):
+    """Replan the claimed request and record the result"""
+    from .services import SchedulingService
+
+    version = request.requested_version
+    moved_tasks = []
+    error = ''
+    try:
+        moved_tasks = SchedulingService(request.user).reschedule_remaining_tasks(anchor=request.anchor)
+    except Exception as e:
+        logger.exception("Rescheduling failed for user %s", request.user_id)
+        error = str(e)
+
+    with transaction.atomic():
+        current = RescheduleRequest.objects.select_for_update().get(pk=request.pk)
+        current.completed_version = version
+        current.completed_at = timezone.now()
+        current.last_error = error
+        current.retry_at = None
+        if error:
+            current.attempts += 1
+        else:
+            current.moved_tasks = moved_tasks
+            current.attempts = 0
+        if current.requested_version > version:
+            current.status = 'pending'
+        elif error:
+            current.status = 'failed'
+            if current.attempts < MAX_ATTEMPTS:
+                current.retry_at = current.completed_at + RETRY_BACKOFF * 2 ** (current.attempts - 1)
+        else:
+            current.status = 'idle'
+            current.anchor = None
+        current.save()
+
+
+def process_pending(limit: Optional[int] = None, user_id=None) -> int:
+    """Run pending replans until the queue is empty or limit is reached"""
+    processed = 0
+    while limit is None or processed < limit:
+        request = claim_next(user_id=user_id)
+        if request is None:
+            break
+        run_request(request)
+        processed += 1
+    return processed
+
+
+def recover_stale_requests() -> int:
+    """
+    Put requests left running by a dead worker, and failed requests whose
+    retry is due, back in the queue
+    """
+    now = timezone.now()
+    stale = RescheduleRequest.objects.filter(
+        status='running',
+        started_at__lt=now - STALE_AFTER
+    ).update(status='pending')
+    retried = RescheduleRequest.objects.filter(
+        status='failed',
+        retry_at__lte=now
+    ).update(status='pending', retry_at=None)
+    return stale + retried
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db.models import QuerySet
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from goals.models import Goal, Task
+
+DEFAULT_PRIORITY_WEIGHTS = {'urgency': 0.4, 'importance': 0.4, 'progress': 0.2}
+
+# Importance by goal priority level
+IMPORTANCE_BY_PRIORITY = {'high': 3.0, 'medium': 2.0, 'low': 1.0}
+DEFAULT_IMPORTANCE = 2.0
+
+# Low urgency for tasks without deadline
+NO_DEADLINE_URGENCY = 0.1
+
+
+def get_priority_weights() -> Dict[str, float]:
+    """Priority weights, overridable per deployment with SCHEDULER_PRIORITY_WEIGHTS"""
+    weights = dict(DEFAULT_PRIORITY_WEIGHTS)
+    weights.update(getattr(settings, 'SCHEDULER_PRIORITY_WEIGHTS', {}))
+    return weights
+
+
+def urgency_score(due_date: Optional[datetime], now: datetime) -> float:
+    """Urgency = 1 / (days_left_to_deadline + 1)"""
+    if due_date is None:
+        return NO_DEADLINE_URGENCY
+    days_left = (due_date - now).days
+    return 1.0 / (max(days_left, 0) + 1)
+
+
+def importance_score(goal_priority: str) -> float:
+    return IMPORTANCE_BY_PRIORITY.get(goal_priority, DEFAULT_IMPORTANCE)
+
+
+def progress_score(goal_progress: float) -> float:
+    """Progress = 1 - progress_percentage"""
+    return 1.0 - (goal_progress / 100.0)
+
+
+def weighted_score(urgency: float, importance: float, progress: float,
+                   weights: Dict[str, float]) -> float:
+    """Priority = (Urgency * w_u) + (Importance * w_i) + (Progress * w_p)"""
+    return (urgency * weights['urgency']) + (importance * weights['importance']) + (progress * weights['progress'])
+
+
+class PriorityScores:
+    """Column-oriented priority scores for a set of tasks"""
+
+    def __init__(self, task_ids: List[int], urgency: List[float], importance: List[float],
+                 progress: List[float], final: List[float]):
+        self.task_ids = task_ids
+        self.urgency = urgency
+        self.importance = importance
+        self.progress = progress
+        self.final = final
+        self._positions = {task_id: position for position, task_id in enumerate(task_ids)}
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def __getitem__(self, task_id: int) -> float:
+        """Final priority score of a task"""
+        return self.final[self._positions[task_id]]
+
+
+def score_tasks(tasks, now: datetime, weights: Optional[Dict[str, float]] = None) -> PriorityScores:
+    """
+    Score a whole set of tasks in one columnar pass
+
+    A Task queryset is read with a single values query. A list of tasks costs at
+    most one query for the goals that are not already loaded on the tasks.
+    Every score is computed with the same arithmetic as the scalar path.
+    """
+    weights = weights or get_priority_weights()
+
+    if isinstance(tasks, QuerySet):
+        rows = list(tasks.values_list('id', 'due_date', 'goal__priority', 'goal__progress'))
+    else:
+        rows = _rows_for_tasks(tasks)
+
+    task_ids = [row[0] for row in rows]
+    urgency = [urgency_score(row[1], now) for row in rows]
+    importance = [importance_score(row[2]) for row in rows]
+    progress = [progress_score(row[3]) for row in rows]
+    final = [
+        weighted_score(u, i, p, weights)
+        for u, i, p in zip(urgency, importance, progress)
+    ]
+    return PriorityScores(task_ids, urgency, importance, progress, final)
+
+
+def _rows_for_tasks(tasks: Iterable[Task]) -> List[tuple]:
+    tasks = list(tasks)
+    missing_goal_ids = {task.goal_id for task in tasks if not Task.goal.is_cached(task)}
+    goals = {}
+    if missing_goal_ids:
+        goals = {
+            goal_id: (priority, progress)
+            for goal_id, priority, progress in Goal.objects.filter(
+                id__in=missing_goal_ids
+            ).values_list('id', 'priority', 'progress')
+        }
+
+    rows = []
+    for task in tasks:
+        if Task.goal.is_cached(task):
+            priority, progress = task.goal.priority, task.goal.progress
+        else:
+            priority, progress = goals[task.goal_id]
+        rows.append((task.id, task.due_date, priority, progress))
+    return rows
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserAvailability, ScheduledTask, SchedulingSession
+from .models import UserAvailability, ScheduledTask, SchedulingSession, RescheduleRequest
 from goals.models import Goal, Task
+from backend.fieldsets import SparseFieldsetMixin
 
-class UserAvailabilitySerializer(serializers.ModelSerializer):
+class UserAvailabilitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     day_name = serializers.CharField(source='get_day_of_week_display', read_only=True)
     
     class Meta:
@@ -14,7 +15,7 @@ class UserAvailabilitySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-class ScheduledTaskSerializer(serializers.ModelSerializer):
+class ScheduledTaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     task_title = serializers.CharField(source='task.title', read_only=True)
     task_description = serializers.CharField(source='task.description', read_only=True)
     goal_name = serializers.CharField(source='task.goal.name', read_only=True)
@@ -37,7 +38,7 @@ class ScheduledTaskSerializer(serializers.ModelSerializer):
             'final_priority_score', 'created_at', 'updated_at', 'last_calculated'
         ]
 
-class SchedulingSessionSerializer(serializers.ModelSerializer):
+class SchedulingSessionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = SchedulingSession
         fields = [
@@ -86,4 +87,14 @@ class HighPriorityTasksResponseSerializer(serializers.Serializer):
     """Serializer for high priority tasks response"""
     tasks = TaskPrioritySerializer(many=True)
     total_count = serializers.IntegerField()
-    generated_at = serializers.DateTimeField() 
\ No newline at end of file
+    generated_at = serializers.DateTimeField()
+
+class RescheduleRequestSerializer(serializers.ModelSerializer):
+    """Serializer for the background rescheduling status of a user"""
+    class Meta:
+        model = RescheduleRequest
+        fields = [
+            'status', 'requested_version', 'completed_version', 'moved_tasks',
+            'last_error', 'attempts', 'retry_at', 'requested_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = fields
@@ -1,14 +1,42 @@
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q, F
 from datetime import datetime, timedelta
+from collections import defaultdict, deque
 from typing import List, Dict, Optional, Tuple
 import logging
 
-from .models import ScheduledTask, UserAvailability, SchedulingSession
+from .models import ScheduledTask, UserAvailability, SchedulingSession, RescheduleRequest
+from .intervals import FreeTimeIndex, FreeInterval
+from .availability import expand_user_availability
+from .cache import bump_data_version
+from .expressions import priority_annotations
+from .queue import enqueue_reschedule
+from .scoring import (
+    get_priority_weights, score_tasks, urgency_score, importance_score,
+    progress_score, weighted_score
+)
 from goals.models import Goal, Task
 
 logger = logging.getLogger(__name__)
 
+BULK_BATCH_SIZE = 500
+
+# ScheduledTask fields rewritten by every scheduling run
+PERSISTED_FIELDS = [
+    'urgency_score', 'importance_score', 'progress_score', 'final_priority_score',
+    'scheduled_start', 'scheduled_end',
+]
+
+
+class DependencyCycleError(ValueError):
+    """Raised when the goal hierarchy contains a cycle"""
+    
+    def __init__(self, goal_ids: List[int]):
+        self.goal_ids = goal_ids
+        super().__init__(f"Circular dependency detected between goals {goal_ids}")
+
+
 class SchedulingService:
     """
     Deterministic, real-time, rule-based AI scheduling system
@@ -23,6 +51,9 @@ class SchedulingService:
     def __init__(self, user):
         self.user = user
         self.now = timezone.now()
+        self.weights = get_priority_weights()
+        # Session recorded by the last schedule_tasks call that placed tasks
+        self.last_session = None
     
     def get_all_tasks_for_user(self) -> List[Task]:
         """Get all tasks for the user, including those from goals and sub-goals"""
@@ -32,7 +63,7 @@ class SchedulingService:
         # Get all tasks from these goals
         tasks = Task.objects.filter(goal__in=user_goals).exclude(
             status__in=['completed', 'cancelled']
-        )
+        ).select_related('goal')
         
         return list(tasks)
     
@@ -40,113 +71,90 @@ class SchedulingService:
         """
         Calculate priority score using the AI algorithm:
         Priority = (Urgency * 0.4) + (Importance * 0.4) + (Progress * 0.2)
-        """
-        # Calculate urgency (1 / (days_left_to_deadline + 1))
-        urgency = 0.0
-        if task.due_date:
-            days_left = (task.due_date - self.now).days
-            urgency = 1.0 / (max(days_left, 0) + 1)
-        else:
-            urgency = 0.1  # Low urgency for tasks without deadline
         
-        # Calculate importance (priority level)
-        priority_map = {'high': 3.0, 'medium': 2.0, 'low': 1.0}
-        importance = priority_map.get(task.goal.priority, 2.0)
-        
-        # Calculate progress (1 - progress_percentage)
-        progress = 1.0 - (task.goal.progress / 100.0)
-        
-        # Calculate final weighted score
-        final_score = (urgency * 0.4) + (importance * 0.4) + (progress * 0.2)
+        The weights default to 0.4/0.4/0.2 and can be overridden with the
+        SCHEDULER_PRIORITY_WEIGHTS setting. Use score_tasks for whole task sets.
+        """
+        urgency = urgency_score(task.due_date, self.now)
+        importance = importance_score(task.goal.priority)
+        progress = progress_score(task.goal.progress)
         
-        return final_score
+        return weighted_score(urgency, importance, progress, self.weights)
     
     def get_dependency_order(self, tasks: List[Task]) -> List[Task]:
         """
-        Sort tasks by dependency order (sub-goals before parent goals)
-        Returns tasks in order where dependencies are satisfied
+        Sort tasks by dependency order (parent goals before their sub-goals)
+        
+        Loads the user's goal forest in one query and runs a single Kahn-style
+        topological pass over it, which is O(tasks + goals). Tasks of the same
+        goal keep their input order.
+        
+        Raises:
+            DependencyCycleError: if a task's goal sits on or below a cycle
+                in the goal hierarchy
         """
-        # Create a mapping of goal dependencies
-        goal_dependencies = {}
+        # Load the whole goal forest in one query
+        parents = dict(Goal.objects.filter(user=self.user).values_list('id', 'parent_id'))
+        
+        # Index tasks by goal, treating goals outside the forest as roots
+        tasks_by_goal = defaultdict(list)
         for task in tasks:
-            goal = task.goal
-            dependencies = []
-            
-            # Check if this goal has parent goals that need to be completed first
-            current_goal = goal
-            while current_goal.parent:
-                parent_goal = current_goal.parent
-                # If parent goal is not completed, it's a dependency
-                if parent_goal.status != 'completed':
-                    parent_tasks = [t for t in tasks if t.goal == parent_goal]
-                    dependencies.extend(parent_tasks)
-                current_goal = parent_goal
-            
-            goal_dependencies[task] = dependencies
+            tasks_by_goal[task.goal_id].append(task)
+            parents.setdefault(task.goal_id, None)
+        
+        children = defaultdict(list)
+        pending_parents = {}
+        queue = deque()
+        for goal_id, parent_id in parents.items():
+            if parent_id in parents:
+                children[parent_id].append(goal_id)
+                pending_parents[goal_id] = 1
+            else:
+                queue.append(goal_id)
         
-        # Topological sort to respect dependencies
+        # Kahn's algorithm: a goal is released once its parent has been emitted
         sorted_tasks = []
-        visited = set()
-        temp_visited = set()
-        
-        def visit(task):
-            if task in temp_visited:
-                raise ValueError("Circular dependency detected")
-            if task in visited:
-                return
-            
-            temp_visited.add(task)
-            
-            # Visit dependencies first
-            for dep in goal_dependencies[task]:
-                visit(dep)
-            
-            temp_visited.remove(task)
-            visited.add(task)
-            sorted_tasks.append(task)
-        
-        # Visit all tasks
-        for task in tasks:
-            if task not in visited:
-                visit(task)
+        while queue:
+            goal_id = queue.popleft()
+            sorted_tasks.extend(tasks_by_goal.get(goal_id, ()))
+            for child_id in children.get(goal_id, ()):
+                pending_parents[child_id] -= 1
+                if not pending_parents[child_id]:
+                    queue.append(child_id)
+        
+        if len(sorted_tasks) < len(tasks):
+            unreached = {goal_id for goal_id, count in pending_parents.items() if count}
+            blocked = next(goal_id for goal_id in tasks_by_goal if goal_id in unreached)
+            raise DependencyCycleError(self._find_goal_cycle(blocked, parents))
         
         return sorted_tasks
     
+    def _find_goal_cycle(self, goal_id: int, parents: Dict[int, Optional[int]]) -> List[int]:
+        """Follow parent links from goal_id until a goal repeats, returning the cycle"""
+        path = []
+        seen = {}
+        while goal_id not in seen:
+            seen[goal_id] = len(path)
+            path.append(goal_id)
+            goal_id = parents[goal_id]
+        return sorted(path[seen[goal_id]:])
+    
     def get_user_availability(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         """
         Get user's available time slots between start_date and end_date
         Returns list of available time slots
         """
-        availabilities = UserAvailability.objects.filter(
-            user=self.user,
-            is_active=True
-        )
-        
         available_slots = []
-        current_date = start_date.date()
-        end_date_only = end_date.date()
-        
-        while current_date <= end_date_only:
-            day_of_week = current_date.weekday()
-            day_availabilities = availabilities.filter(day_of_week=day_of_week)
-            
-            for availability in day_availabilities:
-                slot_start = datetime.combine(current_date, availability.start_time)
-                slot_end = datetime.combine(current_date, availability.end_time)
-                
-                # Adjust for timezone
-                slot_start = timezone.make_aware(slot_start)
-                slot_end = timezone.make_aware(slot_end)
-                
-                # Only include slots that overlap with our date range
-                if slot_start < end_date and slot_end > start_date:
-                    available_slots.append({
-                        'start': slot_start,
-                        'end': slot_end,
-                        'duration_minutes': (slot_end - slot_start).total_seconds() / 60
-                    })
-            
-            current_date += timedelta(days=1)
+        for slot_start, slot_end in expand_user_availability(
+            self.user, start_date.date(), end_date.date()
+        ):
+            # Only include slots that overlap with our date range
+            if slot_start < end_date and slot_end > start_date:
+                available_slots.append({
+                    'start': slot_start,
+                    'end': slot_end,
+                    'duration_minutes': (slot_end - slot_start).total_seconds() / 60
+                })
         
         return available_slots
     
@@ -172,170 +180,246 @@ class SchedulingService:
         if not end_date:
             end_date = self.now + timedelta(days=7)
         
+        # Index the available time slots by start and duration; back-to-back
+        # slots merge, so a task can run across the boundary between them
+        free_time = FreeTimeIndex.from_slots(self.get_user_availability(start_date, end_date))
+        
+        plan = self._plan_tasks(tasks, free_time, start_date)
+        
+        with transaction.atomic():
+            scheduled_tasks = self._persist_schedule(plan)
+            
+            # Create scheduling session record
+            self.last_session = self._create_scheduling_session(scheduled_tasks)
+        
+        return scheduled_tasks
+    
+    def _plan_tasks(self, tasks: List[Task], free_time: FreeTimeIndex,
+                    start_time: datetime) -> List[Tuple[Task, float, datetime, datetime]]:
+        """
+        Greedily place tasks into free time by dependency order and descending
+        priority, returning (task, priority_score, start, end) for placed tasks
+        """
         # Get dependency-ordered tasks
         ordered_tasks = self.get_dependency_order(tasks)
         
-        # Calculate priority scores and sort by descending priority
-        task_scores = []
-        for task in ordered_tasks:
-            priority_score = self.calculate_task_priority(task)
-            task_scores.append((task, priority_score))
+        # Calculate priority scores for the whole set and sort by descending priority
+        scores = score_tasks(ordered_tasks, self.now, self.weights)
+        task_scores = [(task, scores[task.id]) for task in ordered_tasks]
         
         # Sort by descending priority score
         task_scores.sort(key=lambda x: x[1], reverse=True)
-        sorted_tasks = [task for task, score in task_scores]
         
-        # Get available time slots
-        available_slots = self.get_user_availability(start_date, end_date)
+        # Place tasks greedily into the free time
+        plan = []
+        current_time = start_time
         
-        # Create or update ScheduledTask objects
-        scheduled_tasks = []
-        current_time = start_date
-        
-        for task in sorted_tasks:
+        for task, priority_score in task_scores:
             # Find the best available slot for this task
-            best_slot = self._find_best_slot_for_task(task, available_slots, current_time)
+            best_slot = self._find_best_slot_for_task(task, free_time, current_time)
             
             if best_slot:
-                # Create or update ScheduledTask
-                scheduled_task, created = ScheduledTask.objects.get_or_create(
-                    task=task,
-                    user=self.user,
-                    defaults={
-                        'urgency_score': 0.0,
-                        'importance_score': 0.0,
-                        'progress_score': 0.0,
-                        'final_priority_score': 0.0,
-                        'status': 'pending'
-                    }
-                )
-                
-                # Update priority scores
-                scheduled_task.urgency_score = task_scores[sorted_tasks.index(task)][1] * 0.4
-                scheduled_task.importance_score = task_scores[sorted_tasks.index(task)][1] * 0.4
-                scheduled_task.progress_score = task_scores[sorted_tasks.index(task)][1] * 0.2
-                scheduled_task.final_priority_score = task_scores[sorted_tasks.index(task)][1]
+                scheduled_start = best_slot.start
+                scheduled_end = best_slot.start + timedelta(minutes=task.estimated_time)
+                plan.append((task, priority_score, scheduled_start, scheduled_end))
                 
-                # Set scheduling times
-                scheduled_task.scheduled_start = best_slot['start']
-                scheduled_task.scheduled_end = best_slot['start'] + timedelta(minutes=task.estimated_time)
-                
-                scheduled_task.save()
-                scheduled_tasks.append(scheduled_task)
-                
-                # Update current time and available slots
-                current_time = scheduled_task.scheduled_end
-                self._update_available_slots(available_slots, best_slot, task.estimated_time)
-        
-        # Create scheduling session record
-        self._create_scheduling_session(scheduled_tasks)
+                # Update current time and remove the used time from the index
+                current_time = scheduled_end
+                free_time.reserve(scheduled_start, scheduled_end)
         
-        return scheduled_tasks
+        return plan
     
-    def _find_best_slot_for_task(self, task: Task, available_slots: List[Dict], 
-                                current_time: datetime) -> Optional[Dict]:
-        """Find the best available time slot for a task"""
-        task_duration = task.estimated_time
-        
-        # Filter slots that have enough time for the task
-        suitable_slots = [
-            slot for slot in available_slots 
-            if slot['duration_minutes'] >= task_duration and slot['start'] >= current_time
-        ]
-        
-        if not suitable_slots:
-            return None
-        
-        # Return the earliest suitable slot
-        return min(suitable_slots, key=lambda x: x['start'])
+    def _scheduled_values(self, priority_score: float, scheduled_start: datetime,
+                          scheduled_end: datetime) -> Dict:
+        """Field values a scheduling run writes to a ScheduledTask"""
+        return {
+            'urgency_score': priority_score * self.weights['urgency'],
+            'importance_score': priority_score * self.weights['importance'],
+            'progress_score': priority_score * self.weights['progress'],
+            'final_priority_score': priority_score,
+            'scheduled_start': scheduled_start,
+            'scheduled_end': scheduled_end,
+        }
     
-    def _update_available_slots(self, available_slots: List[Dict], used_slot: Dict, 
-                               task_duration: int):
-        """Update available slots after scheduling a task"""
-        task_end = used_slot['start'] + timedelta(minutes=task_duration)
-        
-        # Remove or split slots that overlap with the scheduled task
-        new_slots = []
-        for slot in available_slots:
-            if slot['end'] <= used_slot['start'] or slot['start'] >= task_end:
-                # No overlap, keep the slot
-                new_slots.append(slot)
+    def _persist_schedule(self, plan: List[Tuple[Task, float, datetime, datetime]]) -> List[ScheduledTask]:
+        """
+        Write a scheduling plan with one read and at most one bulk insert and
+        one bulk update, whatever the number of tasks
+        """
+        # Load the user's existing scheduled tasks in one query
+        existing = {}
+        for scheduled_task in ScheduledTask.objects.filter(user=self.user).order_by('id'):
+            existing.setdefault(scheduled_task.task_id, scheduled_task)
+        
+        now = timezone.now()
+        scheduled_tasks = []
+        to_create = []
+        to_update = []
+        
+        for task, priority_score, scheduled_start, scheduled_end in plan:
+            values = self._scheduled_values(priority_score, scheduled_start, scheduled_end)
+            
+            scheduled_task = existing.get(task.id)
+            if scheduled_task is None:
+                scheduled_task = ScheduledTask(task=task, user=self.user, status='pending', **values)
+                to_create.append(scheduled_task)
             else:
-                # Overlap detected, split or remove the slot
-                if slot['start'] < used_slot['start']:
-                    # Keep the part before the task
-                    new_slots.append({
-                        'start': slot['start'],
-                        'end': used_slot['start'],
-                        'duration_minutes': (used_slot['start'] - slot['start']).total_seconds() / 60
-                    })
-                
-                if slot['end'] > task_end:
-                    # Keep the part after the task
-                    new_slots.append({
-                        'start': task_end,
-                        'end': slot['end'],
-                        'duration_minutes': (slot['end'] - task_end).total_seconds() / 60
-                    })
+                # Reuse the loaded task so serializing the result does not refetch it
+                scheduled_task.task = task
+                if any(getattr(scheduled_task, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(scheduled_task, field, value)
+                    scheduled_task.updated_at = now
+                    scheduled_task.last_calculated = now
+                    to_update.append(scheduled_task)
+            
+            scheduled_tasks.append(scheduled_task)
+        
+        if to_create:
+            ScheduledTask.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        if to_update:
+            ScheduledTask.objects.bulk_update(
+                to_update, PERSISTED_FIELDS + ['updated_at', 'last_calculated'],
+                batch_size=BULK_BATCH_SIZE
+            )
+        if to_create or to_update:
+            # Bulk writes do not send post_save
+            bump_data_version(self.user.pk)
         
-        available_slots.clear()
-        available_slots.extend(new_slots)
+        return scheduled_tasks
     
-    def _create_scheduling_session(self, scheduled_tasks: List[ScheduledTask]):
+    def _find_best_slot_for_task(self, task: Task, free_time: FreeTimeIndex, 
+                                current_time: datetime) -> Optional[FreeInterval]:
+        """Find the earliest free interval after current_time that fits the task"""
+        return free_time.earliest_fit(task.estimated_time, not_before=current_time)
+    
+    def _create_scheduling_session(self, scheduled_tasks: List[ScheduledTask]) -> SchedulingSession:
         """Create a record of this scheduling session"""
         total_time = sum(task.task.estimated_time for task in scheduled_tasks)
         
-        SchedulingSession.objects.create(
+        return SchedulingSession.objects.create(
             user=self.user,
             total_tasks_scheduled=len(scheduled_tasks),
             total_time_scheduled=total_time,
             session_notes=f"AI scheduled {len(scheduled_tasks)} tasks with total time {total_time} minutes"
         )
     
-    def reschedule_remaining_tasks(self):
-        """Reschedule remaining tasks after a task completion or skip"""
-        # Get all pending and in-progress scheduled tasks
-        remaining_scheduled = ScheduledTask.objects.filter(
-            user=self.user,
-            status__in=['pending', 'in_progress']
-        )
+    def reschedule_remaining_tasks(self, anchor: datetime = None) -> List[Dict]:
+        """
+        Incrementally reschedule remaining tasks after a task completion or skip
         
-        # Get the underlying tasks
-        remaining_tasks = [scheduled.task for scheduled in remaining_scheduled]
+        Only the suffix of the timeline is re-placed: open scheduled tasks that
+        start at or after `anchor` (defaults to now), or have no slot yet.
+        Earlier open tasks keep their slots and their time stays reserved.
+        Only rows whose placement or scores change are written.
         
-        # Delete existing scheduled tasks
-        remaining_scheduled.delete()
+        Returns:
+            List of moves, one per scheduled task whose slot changed
+        """
+        anchor = anchor or self.now
+        start_time = max(anchor, self.now)
+        end_time = start_time + timedelta(days=7)
+        
+        with transaction.atomic():
+            open_scheduled = list(
+                ScheduledTask.objects.filter(
+                    user=self.user,
+                    status__in=['pending', 'in_progress']
+                ).select_related('task', 'task__goal').order_by('scheduled_start', 'id')
+            )
+            
+            fixed = [
+                scheduled for scheduled in open_scheduled
+                if scheduled.scheduled_start is not None and scheduled.scheduled_start < anchor
+            ]
+            affected = [
+                scheduled for scheduled in open_scheduled
+                if (scheduled.scheduled_start is None or scheduled.scheduled_start >= anchor)
+                and scheduled.task.status not in ('completed', 'cancelled')
+            ]
+            if not affected:
+                return []
+            
+            # Free time in the horizon, minus the slots of tasks that stay put
+            free_time = FreeTimeIndex.from_slots(self.get_user_availability(start_time, end_time))
+            for scheduled in fixed:
+                if scheduled.scheduled_end is not None:
+                    free_time.reserve(scheduled.scheduled_start, scheduled.scheduled_end)
+            
+            plan = self._plan_tasks([scheduled.task for scheduled in affected], free_time, start_time)
+            placements = {
+                task.id: self._scheduled_values(priority_score, scheduled_start, scheduled_end)
+                for task, priority_score, scheduled_start, scheduled_end in plan
+            }
+            
+            now = timezone.now()
+            moves = []
+            to_update = []
+            for scheduled in affected:
+                values = placements.get(scheduled.task_id)
+                if values is None:
+                    # No room left in the horizon: the task loses its slot
+                    values = {'scheduled_start': None, 'scheduled_end': None}
+                
+                if not any(getattr(scheduled, field) != value for field, value in values.items()):
+                    continue
+                
+                if (scheduled.scheduled_start, scheduled.scheduled_end) != (values['scheduled_start'], values['scheduled_end']):
+                    moves.append({
+                        'scheduled_task_id': scheduled.id,
+                        'task_id': scheduled.task_id,
+                        'previous_start': scheduled.scheduled_start,
+                        'previous_end': scheduled.scheduled_end,
+                        'scheduled_start': values['scheduled_start'],
+                        'scheduled_end': values['scheduled_end'],
+                    })
+                
+                for field, value in values.items():
+                    setattr(scheduled, field, value)
+                scheduled.updated_at = now
+                scheduled.last_calculated = now
+                to_update.append(scheduled)
+            
+            if to_update:
+                ScheduledTask.objects.bulk_update(
+                    to_update, PERSISTED_FIELDS + ['updated_at', 'last_calculated'],
+                    batch_size=BULK_BATCH_SIZE
+                )
+                bump_data_version(self.user.pk)
         
-        # Reschedule the remaining tasks
-        if remaining_tasks:
-            self.schedule_tasks(remaining_tasks)
+        return moves
     
     def get_high_priority_tasks(self, limit: int = 10) -> List[Dict]:
         """
         Get high priority tasks that are close to due date
         Returns list of task dictionaries with priority scores
         """
-        all_tasks = self.get_all_tasks_for_user()
-        
-        # Calculate priority scores for all tasks
-        task_priorities = []
-        for task in all_tasks:
-            priority_score = self.calculate_task_priority(task)
-            task_priorities.append({
-                'task': task,
-                'priority_score': priority_score,
-                'urgency_score': priority_score * 0.4,
-                'importance_score': priority_score * 0.4,
-                'progress_score': priority_score * 0.2,
-                'days_to_deadline': self._get_days_to_deadline(task),
-                'goal_name': task.goal.name,
-                'estimated_time': task.estimated_time
-            })
-        
-        # Sort by priority score (descending) and limit results
-        task_priorities.sort(key=lambda x: x['priority_score'], reverse=True)
-        
-        return task_priorities[:limit]
+        return [self._priority_info(task) for task in self._high_priority_query(limit)]
+    
+    async def aget_high_priority_tasks(self, limit: int = 10) -> List[Dict]:
+        """get_high_priority_tasks through the async ORM"""
+        return [self._priority_info(task) async for task in self._high_priority_query(limit)]
+    
+    def _high_priority_query(self, limit: int):
+        # Let the database score, sort and limit the open tasks
+        return Task.objects.filter(goal__user=self.user).exclude(
+            status__in=['completed', 'cancelled']
+        ).select_related('goal').annotate(
+            **priority_annotations(self.now, self.weights)
+        ).order_by('-priority_score', 'id')[:limit]
+    
+    def _priority_info(self, task: Task) -> Dict:
+        priority_score = task.priority_score
+        return {
+            'task': task,
+            'priority_score': priority_score,
+            'urgency_score': priority_score * self.weights['urgency'],
+            'importance_score': priority_score * self.weights['importance'],
+            'progress_score': priority_score * self.weights['progress'],
+            'days_to_deadline': self._get_days_to_deadline(task),
+            'goal_name': task.goal.name,
+            'estimated_time': task.estimated_time
+        }
     
     def _get_days_to_deadline(self, task: Task) -> Optional[int]:
         """Get days remaining until deadline"""
@@ -343,32 +427,47 @@ class SchedulingService:
             return (task.due_date - self.now).days
         return None
     
-    def handle_task_completion(self, task: Task):
-        """Handle task completion and trigger rescheduling"""
-        # Update task status
-        task.status = 'completed'
-        task.completed_at = self.now
-        task.save()
-        
-        # Update goal progress
-        self._update_goal_progress(task.goal)
-        
-        # Reschedule remaining tasks
-        self.reschedule_remaining_tasks()
+    def handle_task_completion(self, task: Task) -> RescheduleRequest:
+        """Handle task completion and queue rescheduling"""
+        anchor = self._get_reschedule_anchor(task)
+        
+        with transaction.atomic():
+            # Update task status
+            task.status = 'completed'
+            task.completed_at = self.now
+            task.save()
+            
+            # Update goal progress
+            self._update_goal_progress(task.goal)
+            
+            # Queue rescheduling of the tasks after the completed one
+            return enqueue_reschedule(self.user, anchor=anchor)
     
-    def handle_task_skip(self, task: Task):
-        """Handle task skip and increase urgency"""
-        # Update task status
-        task.status = 'skipped'
-        task.save()
+    def handle_task_skip(self, task: Task) -> RescheduleRequest:
+        """Handle task skip, increase urgency and queue rescheduling"""
+        anchor = self._get_reschedule_anchor(task)
         
-        # Increase urgency by moving deadline closer
-        if task.due_date:
-            task.due_date = task.due_date - timedelta(days=1)
+        with transaction.atomic():
+            # Update task status
+            task.status = 'skipped'
             task.save()
-        
-        # Reschedule remaining tasks
-        self.reschedule_remaining_tasks()
+            
+            # Increase urgency by moving deadline closer
+            if task.due_date:
+                task.due_date = task.due_date - timedelta(days=1)
+                task.save()
+            
+            # Queue rescheduling from the skipped task onwards
+            return enqueue_reschedule(self.user, anchor=anchor)
+    
+    def _get_reschedule_anchor(self, task: Task) -> Optional[datetime]:
+        """Earliest open slot of the task, where its rescheduled suffix begins"""
+        return ScheduledTask.objects.filter(
+            user=self.user,
+            task=task,
+            status__in=['pending', 'in_progress'],
+            scheduled_start__isnull=False
+        ).order_by('scheduled_start').values_list('scheduled_start', flat=True).first()
     
     def _update_goal_progress(self, goal: Goal):
         """Update goal progress based on completed tasks"""
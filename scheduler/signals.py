@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from goals.models import Goal, Task
+from time_tracking.models import Category, TimeEntry
+from .availability import invalidate_user_availability
+from .cache import bump_data_version
+from .models import ScheduledTask, UserAvailability
+
+
+@receiver([post_save, post_delete], sender=UserAvailability)
+def availability_changed(sender, instance, **kwargs):
+    """Expanded availability horizons are stale once the weekly template changes"""
+    invalidate_user_availability(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Goal)
+@receiver([post_save, post_delete], sender=UserAvailability)
+@receiver([post_save, post_delete], sender=ScheduledTask)
+@receiver([post_save, post_delete], sender=TimeEntry)
+@receiver([post_save, post_delete], sender=Category)
+def user_data_changed(sender, instance, **kwargs):
+    """Cached scheduler and analytics results are stale once the user's data changes"""
+    if instance.user_id is not None:
+        bump_data_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    """Tasks belong to the user through their goal"""
+    if Task.goal.is_cached(instance):
+        user_id = instance.goal.user_id
+    else:
+        user_id = Goal.objects.filter(pk=instance.goal_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        bump_data_version(user_id)
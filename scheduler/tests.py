@@ -1,3 +1,560 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.test import TestCase, SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, time, timedelta
+import os
+import random
+from unittest import mock
+import tempfile
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from goals.models import Goal, Task
+from time_tracking.models import TimeEntry
+from .availability import WeeklyPattern
+from .cache import LRUFileBasedCache, data_version, get_cache
+from .intervals import FreeTimeIndex
+from .models import DataVersion, RescheduleRequest, ScheduledTask, SchedulingSession, UserAvailability
+from .queue import MAX_ATTEMPTS, enqueue_reschedule, process_pending, recover_stale_requests
+from .scoring import score_tasks
+from .services import DependencyCycleError, SchedulingService
+
+User = get_user_model()
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime(2025, 1, day, hour, minute))
+
+
+class FreeTimeIndexTests(SimpleTestCase):
+    def test_add_merges_overlapping_and_adjacent_intervals(self):
+        index = FreeTimeIndex([
+            (at(6, 9), at(6, 10)),
+            (at(6, 10), at(6, 11)),
+            (at(6, 10, 30), at(6, 12)),
+            (at(6, 14), at(6, 15)),
+        ])
+        self.assertEqual(
+            [(interval.start, interval.end) for interval in index],
+            [(at(6, 9), at(6, 12)), (at(6, 14), at(6, 15))]
+        )
+
+    def test_tasks_can_span_back_to_back_windows(self):
+        index = FreeTimeIndex([(at(6, 9), at(6, 10)), (at(6, 10), at(6, 11))])
+        self.assertEqual(len(index), 1)
+        # A 90-minute task fits only across the boundary of the two windows
+        self.assertEqual(index.earliest_fit(90), (at(6, 9), at(6, 11)))
+
+    def test_reserve_splits_interval(self):
+        index = FreeTimeIndex([(at(6, 9), at(6, 17))])
+        index.reserve(at(6, 11), at(6, 12))
+        self.assertEqual(
+            [(interval.start, interval.end) for interval in index],
+            [(at(6, 9), at(6, 11)), (at(6, 12), at(6, 17))]
+        )
+
+    def test_earliest_fit(self):
+        index = FreeTimeIndex([
+            (at(6, 9), at(6, 10)),
+            (at(6, 11), at(6, 15)),
+            (at(6, 16), at(6, 18)),
+        ])
+        self.assertEqual(index.earliest_fit(90).start, at(6, 11))
+        self.assertEqual(index.earliest_fit(90, not_before=at(6, 12)).start, at(6, 16))
+        self.assertIsNone(index.earliest_fit(300))
+
+    def test_best_fit(self):
+        index = FreeTimeIndex([
+            (at(6, 9), at(6, 10)),
+            (at(6, 11), at(6, 15)),
+            (at(6, 16), at(6, 18)),
+            (at(7, 9), at(7, 11)),
+        ])
+        self.assertEqual(index.best_fit(90), (at(6, 16), at(6, 18)))
+        self.assertEqual(index.best_fit(90, not_before=at(6, 17)), (at(7, 9), at(7, 11)))
+        self.assertEqual(index.best_fit(60, not_before=at(6, 10)), (at(6, 16), at(6, 18)))
+        self.assertIsNone(index.best_fit(300))
+
+        # Reservations and merges move intervals between lengths
+        index.reserve(at(6, 16), at(6, 17))
+        index.add(at(7, 11), at(7, 14))
+        self.assertEqual(index.best_fit(150), (at(6, 11), at(6, 15)))
+        self.assertEqual(index.best_fit(150, not_before=at(6, 12)), (at(7, 9), at(7, 14)))
+
+    def test_best_fit_matches_a_scan(self):
+        rng = random.Random(7)
+        index = FreeTimeIndex()
+        for _ in range(300):
+            start = at(6, 0) + timedelta(minutes=15 * rng.randrange(2000))
+            end = start + timedelta(minutes=15 * rng.randrange(1, 12))
+            if rng.random() < 0.6:
+                index.add(start, end)
+            else:
+                index.reserve(start, end)
+            minutes = 15 * rng.randrange(1, 10)
+            not_before = rng.choice([None, at(6, 0) + timedelta(minutes=15 * rng.randrange(2000))])
+            fitting = [
+                interval for interval in index
+                if interval.duration_minutes >= minutes and (not_before is None or interval.start >= not_before)
+            ]
+            expected = min(fitting, key=lambda interval: (interval.end - interval.start, interval.start), default=None)
+            self.assertEqual(index.best_fit(minutes, not_before=not_before), expected)
+
+
+class WeeklyPatternTests(SimpleTestCase):
+    def test_expand_repeats_template_each_week(self):
+        pattern = WeeklyPattern([(0, time(9), time(12)), (0, time(14), time(15)), (2, time(18), time(20))])
+        slots = pattern.expand(at(6, 0).date(), at(19, 0).date())
+        self.assertEqual([slot.start for slot in slots], [
+            at(6, 9), at(6, 14), at(8, 18), at(13, 9), at(13, 14), at(15, 18)
+        ])
+        self.assertEqual(slots[0].end, at(6, 12))
+
+
+class SchedulingServiceTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.goal = Goal.objects.create(user=self.user, name="Exams", priority="high")
+        # Monday 6 January 2025, 09:00-12:00
+        UserAvailability.objects.create(
+            user=self.user, day_of_week=0, start_time=time(9), end_time=time(12)
+        )
+
+    def test_schedule_tasks_packs_slots_in_priority_order(self):
+        urgent = Task.objects.create(
+            goal=self.goal, title="Urgent", estimated_time=60, due_date=at(6, 18)
+        )
+        later = Task.objects.create(
+            goal=self.goal, title="Later", estimated_time=90, due_date=at(20, 18)
+        )
+        too_long = Task.objects.create(goal=self.goal, title="Too long", estimated_time=240)
+
+        scheduler = SchedulingService(self.user)
+        scheduler.now = at(6, 8)
+        scheduled = scheduler.schedule_tasks(
+            [later, too_long, urgent], start_date=at(6, 8), end_date=at(6, 23)
+        )
+
+        self.assertEqual([s.task for s in scheduled], [urgent, later])
+        self.assertEqual(scheduled[0].scheduled_start, at(6, 9))
+        self.assertEqual(scheduled[1].scheduled_start, at(6, 10))
+        self.assertEqual(scheduled[1].scheduled_end, at(6, 11, 30))
+        self.assertFalse(ScheduledTask.objects.filter(task=too_long).exists())
+
+    def test_availability_horizon_is_one_query_and_cached(self):
+        scheduler = SchedulingService(self.user)
+        # The availability stamp plus the template
+        with self.assertNumQueries(2):
+            slots = scheduler.get_user_availability(at(1, 0), at(1, 0) + timedelta(days=90))
+        self.assertEqual(len(slots), 13)
+        with self.assertNumQueries(1):
+            scheduler.get_user_availability(at(1, 0), at(1, 0) + timedelta(days=90))
+
+        UserAvailability.objects.create(
+            user=self.user, day_of_week=1, start_time=time(9), end_time=time(10)
+        )
+        slots = scheduler.get_user_availability(at(1, 0), at(1, 0) + timedelta(days=90))
+        self.assertEqual(len(slots), 25)
+
+    def test_persist_schedule_query_count_is_independent_of_task_count(self):
+        scheduler = SchedulingService(self.user)
+        for count in (2, 20):
+            tasks = [
+                Task.objects.create(goal=self.goal, title=f"Task {i}", estimated_time=30)
+                for i in range(count)
+            ]
+            plan = [
+                (task, 1.0, at(6, 9) + timedelta(minutes=30 * i), at(6, 9, 30) + timedelta(minutes=30 * i))
+                for i, task in enumerate(tasks)
+            ]
+            # One read of existing rows, one bulk insert and the data stamp
+            with self.assertNumQueries(3):
+                scheduler._persist_schedule(plan)
+
+            # Re-planning moves every row: one read, one bulk update and the stamp
+            moved = [(task, 2.0, start + timedelta(days=1), end + timedelta(days=1)) for task, _, start, end in plan]
+            with self.assertNumQueries(3):
+                scheduler._persist_schedule(moved)
+            self.assertEqual(
+                ScheduledTask.objects.get(task=tasks[-1]).scheduled_start,
+                moved[-1][2]
+            )
+            ScheduledTask.objects.all().delete()
+
+    def test_dependency_order_puts_parent_goal_tasks_first(self):
+        child = Goal.objects.create(user=self.user, name="Chapter 1", parent=self.goal)
+        grandchild = Goal.objects.create(user=self.user, name="Section 1.1", parent=child)
+        deep = Task.objects.create(goal=grandchild, title="Deep")
+        middle = Task.objects.create(goal=child, title="Middle")
+        top = Task.objects.create(goal=self.goal, title="Top")
+
+        scheduler = SchedulingService(self.user)
+        with self.assertNumQueries(1):
+            ordered = scheduler.get_dependency_order([deep, middle, top])
+        self.assertEqual(ordered, [top, middle, deep])
+
+    def test_dependency_cycle_reports_goal_ids(self):
+        first = Goal.objects.create(user=self.user, name="First")
+        second = Goal.objects.create(user=self.user, name="Second", parent=first)
+        Goal.objects.filter(pk=first.pk).update(parent=second)
+        task = Task.objects.create(goal=second, title="Stuck")
+
+        with self.assertRaises(DependencyCycleError) as raised:
+            SchedulingService(self.user).get_dependency_order([task])
+        self.assertEqual(raised.exception.goal_ids, sorted([first.id, second.id]))
+
+    def test_batch_scores_match_scalar_path(self):
+        low = Goal.objects.create(user=self.user, name="Hobby", priority="low", progress=40.0)
+        Task.objects.create(goal=self.goal, title="Overdue", due_date=at(2, 12))
+        Task.objects.create(goal=self.goal, title="Soon", due_date=at(9, 7))
+        Task.objects.create(goal=low, title="Someday")
+        Task.objects.create(goal=low, title="Next month", due_date=at(31, 23, 59))
+
+        scheduler = SchedulingService(self.user)
+        scheduler.now = at(6, 8)
+        tasks = Task.objects.filter(goal__user=self.user)
+        with self.assertNumQueries(1):
+            scores = score_tasks(tasks, scheduler.now)
+
+        self.assertEqual(len(scores), 4)
+        for task in tasks:
+            self.assertEqual(scores[task.id], scheduler.calculate_task_priority(task))
+
+    @override_settings(SCHEDULER_PRIORITY_WEIGHTS={'urgency': 1.0, 'importance': 0.0, 'progress': 0.0})
+    def test_priority_weights_are_configurable(self):
+        task = Task.objects.create(goal=self.goal, title="Tomorrow", due_date=at(7, 9))
+        scheduler = SchedulingService(self.user)
+        scheduler.now = at(6, 8)
+        self.assertEqual(scheduler.calculate_task_priority(task), 0.5)
+        self.assertEqual(score_tasks([task], scheduler.now)[task.id], 0.5)
+
+    def test_high_priority_tasks_are_ranked_in_the_database(self):
+        low = Goal.objects.create(user=self.user, name="Hobby", priority="low", progress=50.0)
+        Task.objects.create(goal=self.goal, title="Overdue", due_date=at(2, 12))
+        Task.objects.create(goal=self.goal, title="Tomorrow", due_date=at(7, 8))
+        Task.objects.create(goal=self.goal, title="Next week", due_date=at(13, 9))
+        Task.objects.create(goal=low, title="Someday")
+        Task.objects.create(goal=low, title="Done", status="completed", due_date=at(6, 9))
+
+        scheduler = SchedulingService(self.user)
+        scheduler.now = at(6, 8)
+        with self.assertNumQueries(1):
+            top = scheduler.get_high_priority_tasks(limit=3)
+
+        self.assertEqual([info['task'].title for info in top], ["Overdue", "Tomorrow", "Next week"])
+        for info in top:
+            self.assertAlmostEqual(
+                info['priority_score'], scheduler.calculate_task_priority(info['task']), places=12
+            )
+
+    def test_completion_reschedules_only_the_suffix(self):
+        first = Task.objects.create(goal=self.goal, title="First", estimated_time=60, due_date=at(6, 12))
+        second = Task.objects.create(goal=self.goal, title="Second", estimated_time=30, due_date=at(7, 12))
+        third = Task.objects.create(goal=self.goal, title="Third", estimated_time=60, due_date=at(8, 12))
+
+        scheduler = SchedulingService(self.user)
+        scheduler.now = at(6, 8)
+        scheduled = scheduler.schedule_tasks([first, second, third], start_date=at(6, 8), end_date=at(6, 23))
+        self.assertEqual([s.scheduled_start for s in scheduled], [at(6, 9), at(6, 10), at(6, 10, 30)])
+        ids_before = set(ScheduledTask.objects.values_list('id', flat=True))
+
+        reschedule_request = scheduler.handle_task_completion(first)
+        self.assertEqual(reschedule_request.anchor, at(6, 9))
+        moves = scheduler.reschedule_remaining_tasks(anchor=reschedule_request.anchor)
+
+        self.assertEqual(
+            [(move['task_id'], move['previous_start'], move['scheduled_start']) for move in moves],
+            [(second.id, at(6, 10), at(6, 9)), (third.id, at(6, 10, 30), at(6, 9, 30))]
+        )
+        self.assertEqual(set(ScheduledTask.objects.values_list('id', flat=True)), ids_before)
+        self.assertEqual(ScheduledTask.objects.get(task=third).scheduled_end, at(6, 10, 30))
+
+        # Nothing left to move: no rows are written
+        with self.assertNumQueries(5):
+            self.assertEqual(scheduler.reschedule_remaining_tasks(anchor=at(6, 9)), [])
+
+
+class RescheduleQueueTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.goal = Goal.objects.create(user=self.user, name="Exams", priority="high")
+        self.task = Task.objects.create(goal=self.goal, title="Revise", estimated_time=30)
+        self.scheduled_task = ScheduledTask.objects.create(
+            task=self.task, user=self.user, scheduled_start=at(6, 9), scheduled_end=at(6, 9, 30)
+        )
+
+    def test_complete_returns_before_replanning(self):
+        url = f'/api/scheduled-tasks/{self.scheduled_task.id}/complete/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['reschedule']['status'], 'pending')
+        self.assertEqual(response.data['reschedule']['requested_version'], 1)
+        self.assertEqual(response.data['reschedule']['completed_version'], 0)
+
+    def test_rapid_actions_coalesce_into_one_replan(self):
+        enqueue_reschedule(self.user, anchor=at(8, 9))
+        enqueue_reschedule(self.user, anchor=at(7, 9))
+        enqueue_reschedule(self.user)
+        self.assertEqual(RescheduleRequest.objects.get(user=self.user).anchor, at(7, 9))
+
+        self.assertEqual(process_pending(), 1)
+        self.assertEqual(process_pending(), 0)
+
+        response = self.client.get(f'/api/scheduling/reschedule-status/{self.user.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'idle')
+        self.assertEqual(response.data['requested_version'], 3)
+        self.assertEqual(response.data['completed_version'], 3)
+
+    def test_failed_replan_is_retried_from_the_same_anchor(self):
+        original = SchedulingService.reschedule_remaining_tasks
+        anchors = []
+
+        def flaky(service, anchor=None):
+            anchors.append(anchor)
+            if len(anchors) == 1:
+                raise RuntimeError("connection lost")
+            return original(service, anchor=anchor)
+
+        enqueue_reschedule(self.user, anchor=at(6, 9))
+        with mock.patch.object(SchedulingService, 'reschedule_remaining_tasks', flaky):
+            with self.assertLogs('scheduler.queue', 'ERROR'):
+                self.assertEqual(process_pending(), 1)
+            request = RescheduleRequest.objects.get(user=self.user)
+            self.assertEqual((request.status, request.attempts, request.anchor), ('failed', 1, at(6, 9)))
+            self.assertEqual(request.last_error, "connection lost")
+
+            # Not due yet, then picked up by the first worker pass after the backoff
+            recover_stale_requests()
+            self.assertEqual(process_pending(), 0)
+            RescheduleRequest.objects.filter(pk=request.pk).update(retry_at=timezone.now())
+            recover_stale_requests()
+            self.assertEqual(process_pending(), 1)
+
+        request.refresh_from_db()
+        self.assertEqual(anchors, [at(6, 9), at(6, 9)])
+        self.assertEqual((request.status, request.attempts, request.anchor, request.last_error), ('idle', 0, None, ''))
+
+    def test_retries_stop_after_max_attempts(self):
+        enqueue_reschedule(self.user, anchor=at(6, 9))
+        with mock.patch.object(SchedulingService, 'reschedule_remaining_tasks', side_effect=RuntimeError("broken")), \
+                self.assertLogs('scheduler.queue', 'ERROR'):
+            for _ in range(MAX_ATTEMPTS):
+                RescheduleRequest.objects.filter(user=self.user).update(retry_at=timezone.now())
+                recover_stale_requests()
+                self.assertEqual(process_pending(), 1)
+        request = RescheduleRequest.objects.get(user=self.user)
+        self.assertEqual((request.status, request.attempts, request.retry_at), ('failed', MAX_ATTEMPTS, None))
+        recover_stale_requests()
+        self.assertEqual(process_pending(), 0)
+
+    def test_worker_replan_invalidates_the_web_cache(self):
+        for day_of_week in range(7):
+            UserAvailability.objects.create(
+                user=self.user, day_of_week=day_of_week, start_time=time(9), end_time=time(17)
+            )
+        later = ScheduledTask.objects.create(
+            task=Task.objects.create(goal=self.goal, title="Practice paper", estimated_time=30),
+            user=self.user, scheduled_start=at(6, 10), scheduled_end=at(6, 10, 30)
+        )
+        get_cache().clear()
+        url = f'/api/scheduled-tasks/user/{self.user.id}/'
+        self.client.post(f'/api/scheduled-tasks/{self.scheduled_task.id}/complete/')
+        before = {task['id']: task['scheduled_start'] for task in self.client.get(url).data}
+
+        # The worker is another process with a cache of its own
+        worker_caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'},
+            'scheduler': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-scheduler'},
+        }
+        with self.settings(CACHES=worker_caches):
+            self.assertEqual(process_pending(), 1)
+
+        after = {task['id']: task['scheduled_start'] for task in self.client.get(url).data}
+        later.refresh_from_db()
+        self.assertNotEqual(after[later.id], before[later.id])
+        self.assertEqual(parse_datetime(after[later.id]), later.scheduled_start)
+
+
+class ResultCacheTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.goal = Goal.objects.create(user=self.user, name="Exams", priority="high")
+        Task.objects.create(goal=self.goal, title="Revise", estimated_time=30)
+
+    def test_high_priority_is_served_from_cache_until_tasks_change(self):
+        url = f'/api/scheduling/high-priority/{self.user.id}/'
+        self.assertEqual(self.client.get(url).data['total_count'], 1)
+        # Only the user lookup and the data stamp reach the database
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).data['total_count'], 1)
+
+        Task.objects.create(goal=self.goal, title="Practice paper", estimated_time=60)
+        self.assertEqual(self.client.get(url).data['total_count'], 2)
+
+    def test_async_high_priority_matches_the_sync_view(self):
+        url = f'/api/scheduling/high-priority/{self.user.id}/'
+        expected = self.client.get(url).json()
+        get_cache().clear()
+        with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+            response = async_to_sync(self.async_client.get)(url)
+            self.assertEqual(response.resolver_match.func.__module__, 'scheduler.async_views')
+            missing = async_to_sync(self.async_client.get)('/api/scheduling/high-priority/0/')
+        data = response.json()
+        self.assertNotEqual(data.pop('generated_at'), None)
+        expected.pop('generated_at')
+        self.assertEqual(data, expected)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_data_version_is_stored_in_the_database(self):
+        version = data_version(self.user.id)
+        # Another process starts with an empty cache but reads the same stamp
+        get_cache().clear()
+        self.assertEqual(data_version(self.user.id), version)
+
+        Task.objects.create(goal=self.goal, title="Practice paper", estimated_time=60)
+        self.assertEqual(
+            DataVersion.objects.get(user=self.user, scope=DataVersion.SCOPE_DATA).version,
+            data_version(self.user.id)
+        )
+        self.assertNotEqual(data_version(self.user.id), version)
+
+    def test_analytics_are_invalidated_by_time_entries(self):
+        url = f'/api/users/{self.user.id}/time-entries/analytics/?_startTime=2025-01-01&_endTime=2025-01-31'
+        self.assertEqual(self.client.get(url).data['total_duration'], '0:00:00')
+        # Only the data stamp is read
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        TimeEntry.objects.create(
+            user=self.user, description="Revise", start_time=at(6, 9), end_time=at(6, 10)
+        )
+        self.assertEqual(self.client.get(url).data['total_duration'], '1:00:00')
+
+
+class ListPaginationTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        goal = Goal.objects.create(user=self.user, name="Exams", priority="high")
+        for index in range(3):
+            task = Task.objects.create(goal=goal, title=f"Task {index}", estimated_time=30)
+            ScheduledTask.objects.create(task=task, user=self.user)
+            SchedulingSession.objects.create(user=self.user, total_tasks_scheduled=index)
+
+    def test_by_user_actions_page_only_with_a_cursor(self):
+        url = f'/api/sessions/user/{self.user.id}/'
+        self.assertEqual(len(self.client.get(url).data), 3)
+
+        first = self.client.get(url, {'cursor': '', 'limit': 2}).data
+        second = self.client.get(url, {'cursor': first['next_cursor'], 'limit': 2}).data
+        self.assertIsNone(second['next_cursor'])
+        # Newest sessions first
+        self.assertEqual(
+            [session['total_tasks_scheduled'] for session in first['results'] + second['results']],
+            [2, 1, 0]
+        )
+
+    def test_fields_narrow_scheduled_task_columns(self):
+        url = f'/api/scheduled-tasks/user/{self.user.id}/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'cursor': '', 'fields': 'id,task_title,status'})
+        self.assertEqual(
+            [task['task_title'] for task in response.data['results']], ["Task 0", "Task 1", "Task 2"]
+        )
+        self.assertEqual(set(response.data['results'][0]), {'id', 'task_title', 'status'})
+        # The data stamp, then the task title is joined rather than fetched per row
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"urgency_score"', queries[1]['sql'])
+
+
+class SchedulerQueryCountTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def _build(self, count):
+        """A fresh user with `count` tasks, scheduled rows, sessions and slots"""
+        user = User.objects.create_user(username=f'user{count}', password='testpass123')
+        root = Goal.objects.create(user=user, name="Exams", priority="high")
+        tasks = []
+        for index in range(count):
+            goal = Goal.objects.create(user=user, name=f"Goal {index}", parent=root)
+            task = Task.objects.create(
+                goal=goal, title=f"Task {index}", estimated_time=30,
+                due_date=timezone.now() + timedelta(days=index + 1)
+            )
+            ScheduledTask.objects.create(task=task, user=user)
+            SchedulingSession.objects.create(user=user, total_tasks_scheduled=index)
+            UserAvailability.objects.create(
+                user=user, day_of_week=index % 7,
+                start_time=time(6 + index // 7), end_time=time(7 + index // 7)
+            )
+            tasks.append(task)
+        return user, tasks
+
+    def _query_counts(self, count):
+        user, tasks = self._build(count)
+        scheduled = ScheduledTask.objects.get(task=tasks[-1])
+        requests = [
+            ('get', '/api/scheduled-tasks/', None),
+            ('get', '/api/scheduled-tasks/user/{user}/', None),
+            ('get', '/api/scheduled-tasks/{scheduled}/', None),
+            ('get', '/api/scheduling/high-priority/{user}/', None),
+            ('get', '/api/scheduling/reschedule/{user}/', None),
+            ('get', '/api/scheduling/reschedule-status/{user}/', None),
+            ('get', '/api/sessions/', None),
+            ('get', '/api/sessions/user/{user}/', None),
+            ('get', '/api/availability/user/{user}/', None),
+            ('post', '/api/scheduling/schedule/{user}/', {}),
+            ('post', '/api/scheduled-tasks/{scheduled}/skip/', None),
+            ('post', '/api/scheduled-tasks/{scheduled}/complete/', None),
+            ('post', '/api/scheduling/task-action/{user}/', {'task_id': tasks[-2].id, 'action': 'complete'}),
+        ]
+        counts = {}
+        for method, url, data in requests:
+            get_cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(
+                    url.format(user=user.id, scheduled=scheduled.id), data, format='json'
+                )
+            self.assertEqual(response.status_code, 200, url)
+            counts[f'{method} {url}'] = len(queries)
+        return counts
+
+    def test_every_endpoint_runs_a_constant_number_of_queries(self):
+        self.assertEqual(self._query_counts(3), self._query_counts(25))
+
+    def test_schedule_response_reuses_the_session_totals(self):
+        user, _ = self._build(4)
+        response = self.client.post(f'/api/scheduling/schedule/{user.id}/', {}, format='json')
+        self.assertEqual(response.data['total_tasks_scheduled'], 4)
+        self.assertEqual(
+            response.data['total_time_scheduled'],
+            response.data['scheduling_session']['total_time_scheduled']
+        )
+        self.assertEqual(
+            response.data['total_time_scheduled'],
+            sum(task['estimated_time'] for task in response.data['scheduled_tasks'])
+        )
+
+
+class LRUFileBasedCacheTests(SimpleTestCase):
+    def test_cull_evicts_least_recently_used_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LRUFileBasedCache(directory, {'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+            for age, key in enumerate(['a', 'b', 'c']):
+                cache.set(key, key)
+                os.utime(cache._key_to_file(key), (1000 + age, 1000 + age))
+
+            self.assertEqual(cache.get('a'), 'a')
+            cache.set('d', 'd')
+
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual([cache.get(key) for key in 'acd'], ['a', 'c', 'd'])
@@ -8,19 +8,30 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import datetime, timedelta
 
-from .models import UserAvailability, ScheduledTask, SchedulingSession
+from .models import UserAvailability, ScheduledTask, SchedulingSession, RescheduleRequest
 from .serializers import (
     UserAvailabilitySerializer, ScheduledTaskSerializer, SchedulingSessionSerializer,
     TaskPrioritySerializer, SchedulingRequestSerializer, SchedulingResponseSerializer,
-    TaskActionSerializer, HighPriorityTasksResponseSerializer
+    TaskActionSerializer, HighPriorityTasksResponseSerializer, RescheduleRequestSerializer
 )
 from .services import SchedulingService
+from .cache import cached_for_user
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.pagination import KeysetPagination
 from goals.models import Goal, Task
 
-class UserAvailabilityViewSet(viewsets.ModelViewSet):
+class AvailabilityPagination(KeysetPagination):
+    # Slots have no creation time; they page in weekly order
+    ordering = ('day_of_week', 'start_time', 'id')
+
+class ScheduledTaskPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+class UserAvailabilityViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for managing user availability"""
     serializer_class = UserAvailabilitySerializer
     permission_classes = [AllowAny]
+    pagination_class = AvailabilityPagination
     
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
@@ -30,44 +41,85 @@ class UserAvailabilityViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def by_user(self, request, user_id=None):
-        """Get all availability slots for a specific user"""
-        availabilities = self.get_queryset()
+        """Get all availability slots for a specific user, or one page with a cursor"""
+        availabilities = self.filter_queryset(self.get_queryset())
+        page = self.paginator.paginate_keyset(availabilities, request)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(availabilities, many=True)
         return Response(serializer.data)
 
-class ScheduledTaskViewSet(viewsets.ModelViewSet):
+class ScheduledTaskViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for managing scheduled tasks"""
     serializer_class = ScheduledTaskSerializer
     permission_classes = [AllowAny]
+    pagination_class = ScheduledTaskPagination
     
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
+        scheduled_tasks = ScheduledTask.objects.for_listing()
         if user_id:
-            return ScheduledTask.objects.filter(user_id=user_id)
-        return ScheduledTask.objects.all()
+            return scheduled_tasks.filter(user_id=user_id)
+        return scheduled_tasks
     
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def by_user(self, request, user_id=None):
-        """Get all scheduled tasks for a specific user"""
-        scheduled_tasks = self.get_queryset()
-        serializer = self.get_serializer(scheduled_tasks, many=True)
-        return Response(serializer.data)
+        """Get all scheduled tasks for a specific user, or one page with a cursor"""
+        params = tuple(
+            request.query_params.get(name)
+            for name in (self.paginator.cursor_query_param, self.paginator.limit_query_param,
+                         self.fields_query_param)
+        )
+        data = cached_for_user(user_id, 'scheduled-tasks', params, self._by_user_data)
+        return Response(data)
+    
+    def _by_user_data(self):
+        scheduled_tasks = self.filter_queryset(self.get_queryset())
+        page = self.paginator.paginate_keyset(scheduled_tasks, self.request)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data).data
+        return self.get_serializer(scheduled_tasks, many=True).data
     
     @action(detail=True, methods=['post'], url_path='complete')
     def complete_task(self, request, pk=None):
         """Mark a scheduled task as completed"""
         scheduled_task = self.get_object()
-        scheduled_task.mark_completed()
-        serializer = self.get_serializer(scheduled_task)
-        return Response(serializer.data)
+        reschedule_request = scheduled_task.mark_completed()
+        data = self.get_serializer(scheduled_task).data
+        data['reschedule'] = RescheduleRequestSerializer(reschedule_request).data
+        return Response(data)
     
     @action(detail=True, methods=['post'], url_path='skip')
     def skip_task(self, request, pk=None):
         """Mark a scheduled task as skipped"""
         scheduled_task = self.get_object()
-        scheduled_task.mark_skipped()
-        serializer = self.get_serializer(scheduled_task)
-        return Response(serializer.data)
+        reschedule_request = scheduled_task.mark_skipped()
+        data = self.get_serializer(scheduled_task).data
+        data['reschedule'] = RescheduleRequestSerializer(reschedule_request).data
+        return Response(data)
+
+def high_priority_response(high_priority_tasks):
+    """The high-priority payload for SchedulingService.get_high_priority_tasks results"""
+    task_data = []
+    for task_info in high_priority_tasks:
+        task_data.append({
+            'task_id': task_info['task'].id,
+            'task_title': task_info['task'].title,
+            'goal_name': task_info['goal_name'],
+            'priority_score': task_info['priority_score'],
+            'urgency_score': task_info['urgency_score'],
+            'importance_score': task_info['importance_score'],
+            'progress_score': task_info['progress_score'],
+            'days_to_deadline': task_info['days_to_deadline'],
+            'estimated_time': task_info['estimated_time'],
+            'due_date': task_info['task'].due_date
+        })
+    
+    return {
+        'tasks': task_data,
+        'total_count': len(task_data),
+        'generated_at': timezone.now()
+    }
 
 class SchedulingViewSet(viewsets.ViewSet):
     """ViewSet for AI scheduling operations"""
@@ -104,7 +156,7 @@ class SchedulingViewSet(viewsets.ViewSet):
             tasks = Task.objects.filter(
                 id__in=data['task_ids'],
                 goal__user=user
-            )
+            ).select_related('goal')
         elif data.get('include_all_tasks', True):
             # Schedule all user's tasks
             tasks = scheduler.get_all_tasks_for_user()
@@ -122,17 +174,22 @@ class SchedulingViewSet(viewsets.ViewSet):
                 end_date=data.get('end_date')
             )
             
-            # Get the latest scheduling session
-            latest_session = SchedulingSession.objects.filter(
-                user=user
-            ).order_by('-created_at').first()
+            # The session this run recorded already holds the totals
+            session = scheduler.last_session
+            total_time = session.total_time_scheduled if session else 0
+            if session is None:
+                # Nothing was placed, so report the previous run
+                session = SchedulingSession.objects.filter(
+                    user=user
+                ).order_by('-created_at').first()
             
-            # Prepare response
+            # Prepare response; the scheduled tasks carry the tasks and
+            # goals they were planned from, so serializing them is free
             response_data = {
                 'scheduled_tasks': ScheduledTaskSerializer(scheduled_tasks, many=True).data,
                 'total_tasks_scheduled': len(scheduled_tasks),
-                'total_time_scheduled': sum(task.task.estimated_time for task in scheduled_tasks),
-                'scheduling_session': SchedulingSessionSerializer(latest_session).data if latest_session else None
+                'total_time_scheduled': total_time,
+                'scheduling_session': SchedulingSessionSerializer(session).data if session else None
             }
             
             return Response(response_data, status=status.HTTP_200_OK)
@@ -154,33 +211,16 @@ class SchedulingViewSet(viewsets.ViewSet):
         user = get_object_or_404(User, id=user_id)
         limit = int(request.query_params.get('limit', 10))
         
-        scheduler = SchedulingService(user)
-        high_priority_tasks = scheduler.get_high_priority_tasks(limit=limit)
-        
-        # Convert to serializer format
-        task_data = []
-        for task_info in high_priority_tasks:
-            task_data.append({
-                'task_id': task_info['task'].id,
-                'task_title': task_info['task'].title,
-                'goal_name': task_info['goal_name'],
-                'priority_score': task_info['priority_score'],
-                'urgency_score': task_info['urgency_score'],
-                'importance_score': task_info['importance_score'],
-                'progress_score': task_info['progress_score'],
-                'days_to_deadline': task_info['days_to_deadline'],
-                'estimated_time': task_info['estimated_time'],
-                'due_date': task_info['task'].due_date
-            })
-        
-        response_data = {
-            'tasks': task_data,
-            'total_count': len(task_data),
-            'generated_at': timezone.now()
-        }
-        
+        response_data = cached_for_user(
+            user.pk, 'high-priority', (limit,),
+            lambda: self._high_priority_response(user, limit)
+        )
         return Response(response_data, status=status.HTTP_200_OK)
     
+    def _high_priority_response(self, user, limit):
+        scheduler = SchedulingService(user)
+        return high_priority_response(scheduler.get_high_priority_tasks(limit=limit))
+    
     @action(detail=False, methods=['post'], url_path='task-action/(?P<user_id>[^/.]+)')
     def perform_task_action(self, request, user_id=None):
         """
@@ -210,10 +250,10 @@ class SchedulingViewSet(viewsets.ViewSet):
         
         try:
             if data['action'] == 'complete':
-                scheduler.handle_task_completion(task)
+                reschedule_request = scheduler.handle_task_completion(task)
                 message = "Task completed successfully"
             elif data['action'] == 'skip':
-                scheduler.handle_task_skip(task)
+                reschedule_request = scheduler.handle_task_skip(task)
                 message = "Task skipped successfully"
             else:
                 return Response(
@@ -224,7 +264,8 @@ class SchedulingViewSet(viewsets.ViewSet):
             return Response({
                 "message": message,
                 "task_id": task.id,
-                "action": data['action']
+                "action": data['action'],
+                "reschedule": RescheduleRequestSerializer(reschedule_request).data
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -241,17 +282,18 @@ class SchedulingViewSet(viewsets.ViewSet):
         scheduler = SchedulingService(user)
         
         try:
-            scheduler.reschedule_remaining_tasks()
+            moved_tasks = scheduler.reschedule_remaining_tasks()
             
             # Get updated scheduled tasks
-            scheduled_tasks = ScheduledTask.objects.filter(
+            scheduled_tasks = ScheduledTask.objects.for_listing().filter(
                 user=user,
                 status__in=['pending', 'in_progress']
             )
             
             return Response({
                 "message": "Tasks rescheduled successfully",
-                "scheduled_tasks": ScheduledTaskSerializer(scheduled_tasks, many=True).data
+                "scheduled_tasks": ScheduledTaskSerializer(scheduled_tasks, many=True).data,
+                "moved_tasks": moved_tasks
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -260,10 +302,26 @@ class SchedulingViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class SchedulingSessionViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['get'], url_path='reschedule-status/(?P<user_id>[^/.]+)')
+    def reschedule_status(self, request, user_id=None):
+        """
+        Status of the user's background rescheduling
+        
+        Complete and skip actions return a requested_version; the replan that
+        includes them is applied once completed_version reaches it.
+        """
+        user = get_object_or_404(User, id=user_id)
+        reschedule_request = RescheduleRequest.objects.filter(user=user).first()
+        if reschedule_request is None:
+            reschedule_request = RescheduleRequest(user=user)
+        return Response(RescheduleRequestSerializer(reschedule_request).data, status=status.HTTP_200_OK)
+
+class SchedulingSessionViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing scheduling sessions"""
     serializer_class = SchedulingSessionSerializer
     permission_classes = [AllowAny]
+    # Newest first, the KeysetPagination default of (-created_at, -id)
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
@@ -273,7 +331,10 @@ class SchedulingSessionViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def by_user(self, request, user_id=None):
-        """Get all scheduling sessions for a specific user"""
-        sessions = self.get_queryset()
+        """Get all scheduling sessions for a specific user, or one page with a cursor"""
+        sessions = self.filter_queryset(self.get_queryset())
+        page = self.paginator.paginate_keyset(sessions, request)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(sessions, many=True)
         return Response(serializer.data)
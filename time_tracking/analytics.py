@@ -0,0 +1,190 @@
+from django.db.models import Case, F, Max, Q, Sum, TextField, Value, When
+from django.db.models.functions import Coalesce
+from datetime import datetime, time, timedelta
+
+from .models import DailyTimeRollup, TimeEntry
+from .rollups import minutes_to_duration
+
+UNCATEGORIZED = "Uncategorized"
+NO_DESCRIPTION = "No description"
+
+
+def rollups_between(start_date, end_date, **filters):
+    """
+    Rollup rows for the local days from start_date up to end_date
+
+    The end day is excluded, matching the raw-entry filter it replaces,
+    start_time <= end_date at midnight.
+    """
+    return DailyTimeRollup.objects.filter(
+        date__gte=start_date.date(), date__lt=end_date.date(), **filters
+    )
+
+
+def category_label():
+    return Coalesce(F('category__name'), Value(UNCATEGORIZED))
+
+
+def description_label():
+    return Case(
+        When(Q(description__isnull=True) | Q(description=''), then=Value(NO_DESCRIPTION)),
+        default=F('description'),
+        output_field=TextField()
+    )
+
+
+def aggregate_by(rollups, **group_by):
+    """
+    Total duration of the rollups per group, one GROUP BY query
+
+    Groups come back most recently tracked first.
+    """
+    return (
+        rollups.order_by()
+        .annotate(**group_by)
+        .values(*group_by)
+        .annotate(minutes=Sum('minutes'), last_day=Max('date'))
+        .order_by('-last_day', *group_by)
+    )
+
+
+def _time_analytics_queries(user_id, start_date, end_date, category_id=None):
+    rollups = rollups_between(start_date, end_date, user_id=user_id)
+    if category_id:
+        rollups = rollups.filter(category_id=category_id)
+    return (
+        aggregate_by(rollups, category_name=category_label()),
+        aggregate_by(rollups, day=F('date'), category_name=category_label()),
+        aggregate_by(rollups, category_name=category_label(), description_text=description_label()),
+    )
+
+
+def _fold_time_analytics(category_rows, daily_rows, description_rows):
+    category_totals = {
+        row['category_name']: minutes_to_duration(row['minutes'])
+        for row in category_rows
+    }
+
+    daily_stats = {}
+    for row in daily_rows:
+        daily_stats.setdefault(row['day'].isoformat(), {})[row['category_name']] = minutes_to_duration(row['minutes'])
+
+    grouped_entries = {category: {} for category in category_totals}
+    for row in description_rows:
+        grouped_entries[row['category_name']][row['description_text']] = minutes_to_duration(row['minutes'])
+
+    return category_totals, daily_stats, grouped_entries
+
+
+def time_analytics(user_id, start_date, end_date, category_id=None):
+    """Category, day x category and category x description totals for a user"""
+    return _fold_time_analytics(*(
+        list(rows) for rows in _time_analytics_queries(user_id, start_date, end_date, category_id)
+    ))
+
+
+async def atime_analytics(user_id, start_date, end_date, category_id=None):
+    """time_analytics through the async ORM"""
+    return _fold_time_analytics(*[
+        [row async for row in rows]
+        for rows in _time_analytics_queries(user_id, start_date, end_date, category_id)
+    ])
+
+
+def time_analytics_response(user_id, category_stats, daily_stats, grouped_entries):
+    """The time-entry analytics payload for time_analytics results"""
+    return {
+        'user_id': user_id,
+        'total_duration': str(sum(category_stats.values(), timedelta())),
+        'category_totals': {
+            category: str(duration)
+            for category, duration in category_stats.items()
+        },
+        'daily_stats': {
+            date: {
+                category: str(duration)
+                for category, duration in categories.items()
+            }
+            for date, categories in daily_stats.items()
+        },
+        'grouped_entries': {
+            category: [
+                {
+                    '_description': description,
+                    '_duration': str(duration)
+                }
+                for description, duration in descriptions.items()
+            ]
+            for category, descriptions in grouped_entries.items()
+        }
+    }
+
+
+def recent_entries_query(user_id, end_date):
+    """
+    A user's entries started on the 7 calendar days up to end_date, newest first
+
+    The window starts at midnight of the oldest day listed by
+    recent_entries_by_day, so every entry has a day to go under.
+    """
+    first_day = datetime.combine(end_date.date() - timedelta(days=6), time.min, tzinfo=end_date.tzinfo)
+    return TimeEntry.objects.filter(
+        user_id=user_id,
+        start_time__gte=first_day,
+        start_time__lte=end_date
+    ).select_related('category').order_by('-start_time')
+
+
+def recent_entries_by_day(user_id, entries, end_date):
+    """Entries grouped under each of the 7 days up to end_date, newest day first"""
+    response_data = {}
+    current_date = end_date.date()
+    for _ in range(7):
+        response_data[current_date.isoformat()] = []
+        current_date -= timedelta(days=1)
+
+    for entry in entries:
+        date_str = entry.start_time.date().isoformat()
+        response_data[date_str].append({
+            "id": entry.id,
+            "description": entry.description,
+            "start_time": entry.start_time.isoformat(),
+            "end_time": entry.end_time.isoformat() if entry.end_time else None,
+            "category": entry.category.name if entry.category else UNCATEGORIZED,
+            "is_active": entry.is_active,
+            "duration": str(entry.duration),
+            "created_at": entry.created_at.isoformat(),
+            "updated_at": entry.updated_at.isoformat(),
+            "user_id": user_id
+        })
+    return response_data
+
+
+def category_analytics(category, user_id, start_date, end_date):
+    """
+    Per-description and per-day totals for one category, in one query
+
+    Rows are grouped by (day, description) and folded here. Days come in
+    date order; descriptions by the first day they appear on, then by text.
+    """
+    rows = (
+        rollups_between(start_date, end_date, category=category, user_id=user_id)
+        .order_by()
+        .values('date', 'description_hash', 'description')
+        .annotate(minutes=Sum('minutes'))
+        .order_by('date', 'description')
+    )
+
+    grouped_minutes = {}
+    daily_minutes = {}
+    for row in rows:
+        description = row['description']
+        grouped_minutes[description] = grouped_minutes.get(description, 0.0) + row['minutes']
+        day = row['date'].isoformat()
+        daily_minutes[day] = daily_minutes.get(day, 0.0) + row['minutes']
+
+    grouped_entries = {
+        description: minutes_to_duration(minutes) for description, minutes in grouped_minutes.items()
+    }
+    daily_stats = {day: minutes_to_duration(minutes) for day, minutes in daily_minutes.items()}
+    return grouped_entries, daily_stats
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TimeTrackingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'time_tracking'
+
+    def ready(self):
+        from . import signals  # noqa: F401
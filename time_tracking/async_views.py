@@ -0,0 +1,60 @@
+from django.utils import timezone
+from rest_framework import exceptions
+
+from backend.async_views import async_reads, json_response
+from backend.fieldsets import parse_fields
+from scheduler.cache import acached_for_user
+
+from .analytics import atime_analytics, recent_entries_by_day, recent_entries_query, time_analytics_response
+from .models import TimeEntry
+from .serializers import TimeEntrySerializer
+from .views import TimeEntryViewSet
+
+
+@async_reads()
+async def current_time_entry(request, user_id):
+    entry = await TimeEntry.objects.select_related('category').filter(
+        user_id=user_id, is_active=True
+    ).afirst()
+    if entry is None:
+        return json_response(None)
+    try:
+        serializer = TimeEntrySerializer(
+            entry, fields=parse_fields(request.GET.get(TimeEntryViewSet.fields_query_param))
+        )
+    except exceptions.ValidationError as e:
+        return json_response(e.detail, status=400)
+    return json_response(serializer.data)
+
+
+@async_reads()
+async def recent_entries(request, user_id):
+    end_date = timezone.now()
+    entries = [entry async for entry in recent_entries_query(user_id, end_date)]
+    return json_response(recent_entries_by_day(user_id, entries, end_date))
+
+
+@async_reads()
+async def analytics(request, user_id):
+    start_date = request.GET.get('_startTime')
+    end_date = request.GET.get('_endTime')
+    category_id = request.GET.get('_categoryId')
+
+    if not start_date or not end_date:
+        return json_response({"error": "_startTime and _endTime are required"}, status=400)
+
+    try:
+        start_date = timezone.datetime.strptime(start_date, '%Y-%m-%d')
+        end_date = timezone.datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        return json_response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=400)
+
+    async def compute():
+        return time_analytics_response(
+            user_id, *await atime_analytics(user_id, start_date, end_date, category_id)
+        )
+
+    # Shares the sync view's cache entries
+    return json_response(await acached_for_user(
+        user_id, 'time-analytics', (start_date, end_date, category_id), compute
+    ))
@@ -0,0 +1,66 @@
+import csv
+import json
+import zlib
+from typing import Iterable, Iterator, List
+
+from backend.pagination import keyset_chunks
+
+from .serializers import TimeEntrySerializer
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_chunks(entries, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    """
+    Serialized time entries, one chunk of rows at a time
+
+    Entries without a start time come first by id, then the rest by
+    (start_time, id), each read with keyset_chunks.
+    """
+    entries = entries.select_related('category')
+    for part, ordering in (
+        (entries.filter(start_time__isnull=True), ('id',)),
+        (entries.filter(start_time__isnull=False), ('start_time', 'id')),
+    ):
+        for chunk in keyset_chunks(part, ordering, chunk_size):
+            yield TimeEntrySerializer(chunk, many=True).data
+
+
+def ndjson_lines(chunks: Iterable[List[dict]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield ''.join(json.dumps(row) + '\n' for row in rows).encode()
+
+
+class _Echo:
+    """File-like object that hands back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(chunks: Iterable[List[dict]]) -> Iterator[bytes]:
+    writer = csv.DictWriter(_Echo(), fieldnames=list(TimeEntrySerializer.output_names.values()))
+    yield writer.writeheader().encode()
+    for rows in chunks:
+        yield ''.join(writer.writerow(row) for row in rows).encode()
+
+
+def gzipped(content: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for data in content:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_entries(entries, export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """The entries as a stream of NDJSON or CSV bytes, optionally gzipped"""
+    writers = {'ndjson': ndjson_lines, 'csv': csv_lines}
+    content = writers[export_format](export_chunks(entries))
+    return gzipped(content) if compress else content
@@ -0,0 +1,198 @@
+import csv
+import io
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from scheduler.cache import bump_data_version
+
+from .models import Category, TimeEntry
+from .rollups import add_rollups, entry_contributions, entry_values
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 20000
+
+
+class ImportResult(NamedTuple):
+    """Outcome of an import; rows are numbered from 1 in input order"""
+    created: int
+    errors: List[Dict]  # {'row': n, 'errors': {field: [messages]}}
+
+
+def parse_csv(text: str) -> List[Dict]:
+    """Rows of a CSV export, keyed by its header"""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(str(value))
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _resolve_category(row: Dict, by_id: Dict, by_name: Dict):
+    """
+    (category, error) for a row's _categoryId or _categoryName
+
+    The id wins when it is one of the user's categories, otherwise the name
+    is tried, so an export from one user imports into another by name. Ids
+    must be integers or digit strings; JSON true or 1.9 is an error rather
+    than category 1.
+    """
+    category_id = row.get('_categoryId')
+    category_name = row.get('_categoryName')
+    if category_id in (None, '') and not category_name:
+        return None, None
+    category = None
+    if isinstance(category_id, str) and category_id.isascii() and category_id.isdigit():
+        category_id = int(category_id)
+    if type(category_id) is int:
+        category = by_id.get(category_id)
+    elif category_id not in (None, ''):
+        return None, "Category id must be an integer"
+    if category is None and category_name:
+        category = by_name.get(category_name)
+    if category is None:
+        return None, "Unknown category"
+    return category, None
+
+
+def _build_entry(user_id, row, by_id, by_name) -> Tuple[Optional[TimeEntry], Dict]:
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ["Expected an object"]}
+
+    errors = {}
+    start_time = _parse_time(row.get('_startTime'))
+    end_time = _parse_time(row.get('_endTime'))
+    if start_time is None:
+        errors['_startTime'] = ["A valid start time is required"]
+    if end_time is None:
+        errors['_endTime'] = ["A valid end time is required"]
+    elif start_time is not None and end_time <= start_time:
+        errors['_endTime'] = ["End time must be after start time"]
+
+    description = row.get('_description')
+    if description is not None and not isinstance(description, str):
+        errors['_description'] = ["Must be a string"]
+
+    category, category_error = _resolve_category(row, by_id, by_name)
+    if category_error:
+        errors['_categoryId'] = [category_error]
+
+    if errors:
+        return None, errors
+    return TimeEntry(
+        user_id=user_id, category=category, description=description or None,
+        start_time=start_time, end_time=end_time, is_active=False
+    ), {}
+
+
+def _busy_intervals(user_id, start, end) -> List[List[datetime]]:
+    """
+    The user's tracked time between start and end as disjoint, sorted
+    [start, end] intervals, from one range query; a running entry lasts
+    until now
+    """
+    now = timezone.now()
+    rows = TimeEntry.objects.filter(
+        Q(end_time__gt=start) | Q(end_time__isnull=True),
+        user_id=user_id, start_time__lt=end,
+    ).order_by('start_time').values_list('start_time', 'end_time')
+
+    merged = []
+    for entry_start, entry_end in rows:
+        entry_end = entry_end or now
+        if merged and entry_start < merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], entry_end)
+        else:
+            merged.append([entry_start, entry_end])
+    return merged
+
+
+def _overlap_errors(user_id, entries: List[Tuple[int, TimeEntry]]) -> Dict[int, Dict]:
+    """Rows overlapping the user's existing entries or an earlier row of the import"""
+    if not entries:
+        return {}
+    errors = {}
+    busy = _busy_intervals(
+        user_id,
+        min(entry.start_time for _, entry in entries),
+        max(entry.end_time for _, entry in entries),
+    )
+    starts = [interval[0] for interval in busy]
+    accepted = []
+    for row, entry in entries:
+        index = bisect_right(starts, entry.start_time) - 1
+        if (index >= 0 and busy[index][1] > entry.start_time) or (
+            index + 1 < len(busy) and busy[index + 1][0] < entry.end_time
+        ):
+            errors[row] = {'_startTime': ["Overlaps an existing time entry"]}
+        else:
+            accepted.append((row, entry))
+
+    # Sweep the remaining rows by start time; a row starting before the
+    # latest end seen so far overlaps a row already kept
+    latest = None
+    for row, entry in sorted(accepted, key=lambda item: (item[1].start_time, item[0])):
+        if latest is not None and entry.start_time < latest[1]:
+            errors[row] = {'_startTime': [f"Overlaps row {latest[0]}"]}
+        elif latest is None or entry.end_time > latest[1]:
+            latest = (row, entry.end_time)
+    return errors
+
+
+def import_entries(user_id, rows: List) -> ImportResult:
+    """
+    Validate and insert completed time entries for a user in bulk
+
+    Rows use the export's keys (_description, _startTime, _endTime and
+    _categoryId or _categoryName). The user's categories are read once and
+    overlaps are checked against one range query, then the valid rows are
+    inserted with bulk_create in batches. Invalid rows are reported and
+    skipped; the rest are imported.
+
+    bulk_create skips the TimeEntry signals, so the rollups and the cached
+    scheduler data are brought up to date here.
+    """
+    categories = list(Category.objects.filter(user_id=user_id))
+    by_id = {category.pk: category for category in categories}
+    by_name = {category.name: category for category in categories}
+
+    errors = {}
+    entries = []
+    for row, data in enumerate(rows, start=1):
+        entry, row_errors = _build_entry(user_id, data, by_id, by_name)
+        if row_errors:
+            errors[row] = row_errors
+        else:
+            entries.append((row, entry))
+
+    overlaps = _overlap_errors(user_id, entries)
+    errors.update(overlaps)
+    entries = [entry for row, entry in entries if row not in overlaps]
+
+    if entries:
+        deltas = defaultdict(float)
+        for entry in entries:
+            for key, minutes in entry_contributions(entry_values(entry)).items():
+                deltas[key] += minutes
+        with transaction.atomic():
+            TimeEntry.objects.bulk_create(entries, batch_size=IMPORT_BATCH_SIZE)
+            add_rollups(deltas)
+        bump_data_version(user_id)
+
+    return ImportResult(
+        len(entries),
+        [{'row': row, 'errors': errors[row]} for row in sorted(errors)]
+    )
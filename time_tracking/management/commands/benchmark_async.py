@@ -0,0 +1,187 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from backend.async_views import SYNC_URLCONF
+from goals.imports import create_goal_tree
+from goals.serializers import flatten_goal_tree
+from time_tracking.models import Category, TimeEntry
+from time_tracking.rollups import rebuild_rollups
+
+BULK_BATCH_SIZE = 2000
+ASGI_URLCONF = 'backend.asgi_urls'
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the async read endpoints in one ASGI process against the same endpoints '
+        'on a pool of sync WSGI workers, with a fixed delay added to every query to '
+        'stand in for a remote database. Seeds a user and deletes it afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=50, help='Milliseconds added to every query')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint')
+        parser.add_argument('--workers', type=int, default=4, help='Sync workers, as WEB_CONCURRENCY')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight on the ASGI process')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        user = self._seed(options)
+        latency = options['latency'] / 1000
+
+        def delayed(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # Every thread opens its own connection, so each one is wrapped
+            connection.execute_wrappers.append(delayed)
+
+        connection_created.connect(add_latency)
+        try:
+            # Results must not be served from the cache between requests
+            with override_settings(SCHEDULER_CACHE_TIMEOUT=0):
+                for name, url in self._endpoints(user):
+                    with override_settings(ROOT_URLCONF=SYNC_URLCONF):
+                        sync_seconds = self._run_sync(url, options['requests'], options['workers'])
+                    with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+                        async_seconds = asyncio.run(
+                            self._run_async(url, options['requests'], options['concurrency'])
+                        )
+                    self.stdout.write(self.style.MIGRATE_HEADING(name))
+                    self.stdout.write(
+                        f"  {options['workers']} sync workers: {sync_seconds:.2f} s, "
+                        f"{options['requests'] / sync_seconds:.1f} req/s"
+                    )
+                    self.stdout.write(
+                        f"  1 ASGI process:  {async_seconds:.2f} s, "
+                        f"{options['requests'] / async_seconds:.1f} req/s "
+                        f"({sync_seconds / async_seconds:.1f}x)"
+                    )
+        finally:
+            connection_created.disconnect(add_latency)
+            connections.close_all()
+            user.delete()
+
+    def _endpoints(self, user):
+        today = timezone.localdate()
+        goal_id = user.goals.filter(parent__isnull=True).values_list('pk', flat=True).first()
+        return [
+            ('Time-entry analytics',
+             f'/api/users/{user.pk}/time-entries/analytics/'
+             f'?_startTime={today - timedelta(days=30):%Y-%m-%d}&_endTime={today + timedelta(days=1):%Y-%m-%d}'),
+            ('Recent entries', f'/api/users/{user.pk}/time-entries/recent_entries/'),
+            ('Current timer', f'/api/users/{user.pk}/time-entries/current_time_entry/'),
+            ('Goal forest', f'/api/users/{user.pk}/goals/'),
+            ('Goal tree', f'/api/users/{user.pk}/goals/{goal_id}/'),
+            ('High-priority tasks', f'/api/scheduling/high-priority/{user.pk}/'),
+        ]
+
+    def _run_sync(self, url, requests, workers):
+        """Each worker serves its share of the requests one at a time, as a WSGI worker does"""
+        def worker(count):
+            client = Client()
+            try:
+                for _ in range(count):
+                    self._check(url, client.get(url).status_code)
+            finally:
+                connections.close_all()
+
+        shares = [requests // workers + (index < requests % workers) for index in range(workers)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(worker, shares))
+        return time.perf_counter() - started
+
+    async def _run_async(self, url, requests, concurrency):
+        application = get_asgi_application()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with slots:
+                self._check(url, await self._asgi_get(application, url))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return time.perf_counter() - started
+
+    async def _asgi_get(self, application, url) -> int:
+        """Call the ASGI application in-process, as a server would, and return the status"""
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '', 'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        finished = asyncio.Event()
+        received = False
+        status = None
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        finished.set()
+        return status
+
+    def _check(self, url, status):
+        if status != 200:
+            raise RuntimeError(f"GET {url} returned {status}")
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        user = User.objects.create(username=f'benchmark-{rng.getrandbits(64):x}')
+        categories = Category.objects.bulk_create([
+            Category(user=user, name=f'Category {index}') for index in range(6)
+        ])
+
+        entries = []
+        for index in range(500):
+            start = now - timedelta(minutes=rng.randrange(60, 30 * 24 * 60))
+            entries.append(TimeEntry(
+                user=user, category=rng.choice(categories), description=f'Entry {index % 20}',
+                start_time=start, end_time=start + timedelta(minutes=rng.choice([15, 30, 45, 60]))
+            ))
+        entries.append(TimeEntry(user=user, description='Running', start_time=now, is_active=True))
+        TimeEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+        rebuild_rollups(user_id=user.pk)
+
+        create_goal_tree(user, flatten_goal_tree([
+            {
+                'key': f'goal-{root}', 'name': f'Goal {root}', 'priority': rng.choice(['low', 'medium', 'high']),
+                'tasks': [{'title': f'Task {root}.{index}', 'category': rng.choice(categories).pk,
+                           'due_date': now + timedelta(days=rng.randrange(1, 60)), 'estimated_time': 30}
+                          for index in range(5)],
+                'subgoals': [
+                    {'key': f'goal-{root}-{child}', 'name': f'Goal {root}.{child}',
+                     'tasks': [{'title': f'Task {root}.{child}.{index}', 'estimated_time': 45}
+                               for index in range(3)]}
+                    for child in range(4)
+                ],
+            }
+            for root in range(5)
+        ]))
+        return user
@@ -0,0 +1,183 @@
+import random
+import time
+from datetime import time as day_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from goals.models import Goal, Task
+from scheduler.models import ScheduledTask, UserAvailability
+from time_tracking.models import Category, TimeEntry
+
+BULK_BATCH_SIZE = 2000
+
+# Models whose composite and partial indexes are benchmarked; every entry
+# in their Meta.indexes and Meta.constraints is dropped for the "before" run
+INDEXED_MODELS = [TimeEntry, Task, Goal, ScheduledTask, UserAvailability]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and print EXPLAIN plans and timings for the hot '
+        'filters with and without their composite indexes. Everything is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--entries-per-user', type=int, default=2000)
+        parser.add_argument('--goals-per-user', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query when timing')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user_id, category_id, goal_id = self._seed(options)
+                self._analyze()
+                queries = self._queries(user_id, category_id, goal_id)
+
+                after = self._run(queries, options['repeat'])
+                with connection.cursor() as cursor:
+                    for statement in self._drop_statements():
+                        cursor.execute(statement)
+                self._analyze()
+                before = self._run(queries, options['repeat'])
+
+                for name, _ in queries:
+                    self.stdout.write(self.style.MIGRATE_HEADING(name))
+                    self.stdout.write(f"  without indexes: {before[name][1]:.2f} ms")
+                    self.stdout.write(self._indent(before[name][0]))
+                    self.stdout.write(f"  with indexes:    {after[name][1]:.2f} ms")
+                    self.stdout.write(self._indent(after[name][0]))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _drop_statements(self):
+        # Plain DROP INDEX statements rather than a schema editor context,
+        # which SQLite refuses inside a transaction. The partial unique
+        # constraint is a unique index too.
+        editor = connection.schema_editor()
+        for model in INDEXED_MODELS:
+            for index in [*model._meta.indexes, *model._meta.constraints]:
+                yield editor.sql_delete_index % {
+                    'name': editor.quote_name(index.name),
+                    'table': editor.quote_name(model._meta.db_table),
+                }
+
+    def _queries(self, user_id, category_id, goal_id):
+        since = timezone.now() - timedelta(days=30)
+        return [
+            ('TimeEntry(user_id, start_time)',
+             TimeEntry.objects.filter(user_id=user_id, start_time__gte=since).order_by('-start_time')),
+            ('TimeEntry(user_id, is_active)',
+             TimeEntry.objects.filter(user_id=user_id, is_active=True)),
+            ('TimeEntry(category_id, start_time)',
+             TimeEntry.objects.filter(category_id=category_id, start_time__gte=since)),
+            ('Task(goal_id, status)',
+             Task.objects.filter(goal_id=goal_id, status='completed')),
+            ('ScheduledTask(user_id, status)',
+             ScheduledTask.objects.filter(user_id=user_id, status='pending')),
+            ('Goal(user_id, parent_id)',
+             Goal.objects.filter(user_id=user_id, parent__isnull=True)),
+            ('UserAvailability(user_id, is_active, day_of_week)',
+             UserAvailability.objects.filter(user_id=user_id, is_active=True).order_by('day_of_week')),
+        ]
+
+    def _run(self, queries, repeat):
+        results = {}
+        for name, queryset in queries:
+            plan = queryset.explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = (plan, timings[len(timings) // 2])
+        return results
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _indent(self, text):
+        return '\n'.join(f"    {line}" for line in text.splitlines())
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        self.stdout.write(
+            f"Seeding {options['users']} users with {options['entries_per_user']} entries "
+            f"and {options['goals_per_user']} goals each..."
+        )
+
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-{rng.getrandbits(64):x}-{index}')
+            for index in range(options['users'])
+        ])
+        categories = Category.objects.bulk_create([
+            Category(user=user, name=f'Category {index}')
+            for user in users for index in range(8)
+        ], batch_size=BULK_BATCH_SIZE)
+        categories_by_user = {}
+        for category in categories:
+            categories_by_user.setdefault(category.user_id, []).append(category)
+
+        # bulk_create skips the rollup and closure signals, which the
+        # benchmarked queries do not read
+        entries = []
+        for user in users:
+            for index in range(options['entries_per_user']):
+                start = now - timedelta(minutes=rng.randrange(0, 365 * 24 * 60))
+                entries.append(TimeEntry(
+                    user=user,
+                    category=rng.choice(categories_by_user[user.pk]),
+                    description=f'Entry {index % 50}',
+                    start_time=start,
+                    end_time=start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90])),
+                    is_active=index == 0,
+                ))
+        TimeEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+
+        goals = Goal.objects.bulk_create([
+            Goal(user=user, name=f'Goal {index}')
+            for user in users for index in range(options['goals_per_user'])
+        ], batch_size=BULK_BATCH_SIZE)
+        # Half the goals become subgoals of another goal of the same user
+        children = []
+        for user_index in range(len(users)):
+            user_goals = goals[user_index * options['goals_per_user']:(user_index + 1) * options['goals_per_user']]
+            for goal in user_goals[len(user_goals) // 2:]:
+                goal.parent = rng.choice(user_goals[:len(user_goals) // 2])
+                children.append(goal)
+        Goal.objects.bulk_update(children, ['parent'], batch_size=BULK_BATCH_SIZE)
+
+        statuses = ['not_started', 'in_progress', 'completed']
+        tasks = Task.objects.bulk_create([
+            Task(goal=goal, title=f'Task {index}', status=rng.choice(statuses), estimated_time=30)
+            for goal in goals for index in range(5)
+        ], batch_size=BULK_BATCH_SIZE)
+        ScheduledTask.objects.bulk_create([
+            ScheduledTask(
+                task=task, user_id=task.goal.user_id,
+                status=rng.choice(['pending', 'in_progress', 'completed', 'skipped'])
+            )
+            for task in tasks
+        ], batch_size=BULK_BATCH_SIZE)
+        UserAvailability.objects.bulk_create([
+            UserAvailability(
+                user=user, day_of_week=day, start_time=day_time(hour),
+                end_time=day_time(hour + 2), is_active=hour != 20
+            )
+            for user in users for day in range(7) for hour in (8, 12, 16, 20)
+        ], batch_size=BULK_BATCH_SIZE)
+
+        user = users[len(users) // 2]
+        return user.pk, categories_by_user[user.pk][0].pk, goals[len(goals) // 2].pk
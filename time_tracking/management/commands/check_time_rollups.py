@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from time_tracking.rollups import check_rollups
+
+
+class Command(BaseCommand):
+    help = 'Compare the daily time rollups against the raw time entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='Only check the rollups of this user id'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.01,
+            help='Allowed difference in minutes per rollup row'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = check_rollups(user_id=options['user'], tolerance=options['tolerance'])
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"user={mismatch['user_id']} category={mismatch['category_id']} "
+                f"date={mismatch['date']} description={mismatch['description']!r}: "
+                f"expected {mismatch['expected_minutes']:.2f} min, "
+                f"stored {mismatch['stored_minutes']:.2f} min"
+            )
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} rollup row(s) differ from the raw entries; '
+                'run rebuild_time_rollups to repair them'
+            )
+        self.stdout.write(self.style.SUCCESS('Daily rollups match the raw entries'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from time_tracking.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily time rollups from the raw time entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='Only rebuild the rollups of this user id'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(user_id=options['user'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily rollup row(s)'))
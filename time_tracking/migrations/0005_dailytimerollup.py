@@ -0,0 +1,69 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:42
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from hashlib import sha1
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the rollups for existing entries, split at local midnight"""
+    TimeEntry = apps.get_model('time_tracking', 'TimeEntry')
+    DailyTimeRollup = apps.get_model('time_tracking', 'DailyTimeRollup')
+    tz = timezone.get_default_timezone()
+
+    totals = defaultdict(float)
+    entries = TimeEntry.objects.filter(start_time__isnull=False, end_time__isnull=False)
+    for user_id, category_id, description, start, end in entries.values_list(
+        'user_id', 'category_id', 'description', 'start_time', 'end_time'
+    ).iterator():
+        current = timezone.localtime(start, tz)
+        end = timezone.localtime(end, tz)
+        while current < end:
+            next_midnight = timezone.make_aware(
+                datetime.combine(current.date() + timedelta(days=1), time.min), tz
+            )
+            chunk_end = min(next_midnight, end)
+            key = (user_id, category_id, current.date(), description)
+            totals[key] += (chunk_end - current).total_seconds() / 60
+            current = chunk_end
+
+    DailyTimeRollup.objects.bulk_create([
+        DailyTimeRollup(
+            user_id=user_id, category_id=category_id, date=day,
+            description_hash='' if description is None else sha1(description.encode()).hexdigest(),
+            description=description, minutes=minutes
+        )
+        for (user_id, category_id, day, description), minutes in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracking', '0004_alter_category_color_alter_timeentry_category_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('description_hash', models.CharField(max_length=40)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('minutes', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rollups', to='time_tracking.category')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='time_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='time_tracki_user_id_1f947b_idx'), models.Index(fields=['category', 'date'], name='time_tracki_categor_9c17b0_idx'), models.Index(fields=['user', 'category', 'date', 'description_hash'], name='time_tracki_user_id_3dbdc5_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deactivate_duplicate_timers(apps, schema_editor):
+    """Keep only each user's latest active entry running, so the constraint can be added"""
+    TimeEntry = apps.get_model('time_tracking', 'TimeEntry')
+    duplicated = (
+        TimeEntry.objects.filter(is_active=True, user__isnull=False)
+        .values('user_id').annotate(active=Count('id')).filter(active__gt=1)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in list(duplicated):
+        active = TimeEntry.objects.filter(user_id=user_id, is_active=True)
+        latest = active.order_by('-start_time', '-id').values_list('id', flat=True).first()
+        active.exclude(pk=latest).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracking', '0005_dailytimerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(deactivate_duplicate_timers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'start_time'], name='time_tracki_user_id_196b65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['category', 'start_time'], name='time_tracki_categor_d96e76_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='one_active_time_entry_per_user'),
+        ),
+    ]
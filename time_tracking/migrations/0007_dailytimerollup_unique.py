@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-17 13:35
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rows sharing a key into the oldest one, so the constraint can be added"""
+    DailyTimeRollup = apps.get_model('time_tracking', 'DailyTimeRollup')
+    duplicated = (
+        DailyTimeRollup.objects.values('user_id', 'category_id', 'date', 'description_hash')
+        .annotate(rows=Count('id'), first=Min('id'), total=Sum('minutes')).filter(rows__gt=1)
+    )
+    for key in list(duplicated):
+        rollups = DailyTimeRollup.objects.filter(
+            user_id=key['user_id'], category_id=key['category_id'],
+            date=key['date'], description_hash=key['description_hash']
+        )
+        rollups.exclude(pk=key['first']).delete()
+        rollups.update(minutes=key['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('time_tracking', '0006_timeentry_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailytimerollup',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('user', 0), django.db.models.functions.comparison.Coalesce('category', 0), models.F('date'), models.F('description_hash'), name='unique_daily_time_rollup'),
+        ),
+    ]
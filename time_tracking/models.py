@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -31,6 +32,18 @@ class TimeEntry(models.Model):
     class Meta:
         verbose_name_plural = "Time Entries"
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user', 'start_time']),
+            models.Index(fields=['category', 'start_time']),
+        ]
+        constraints = [
+            # Also serves the (user, is_active=True) lookup for the running timer
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(is_active=True),
+                name='one_active_time_entry_per_user'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.start_time}"
@@ -40,16 +53,54 @@ class TimeEntry(models.Model):
             raise ValidationError("End time must be after start time")
 
     def save(self, *args, **kwargs):
-        if self.is_active:
-            # Deactivate other active entries
+        if not self.is_active:
+            super().save(*args, **kwargs)
+            return
+        # Stop this user's other running entry in the same transaction; the
+        # UPDATE only touches the row in one_active_time_entry_per_user, so
+        # users starting timers at the same time never wait on each other
+        with transaction.atomic():
             TimeEntry.objects.filter(
-                is_active=True
+                user_id=self.user_id, is_active=True
             ).exclude(pk=self.pk).update(is_active=False)
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
     @property
     def duration(self):
         if not self.end_time or not self.start_time:
             return None
         return self.end_time - self.start_time
-    
\ No newline at end of file
+    
+class DailyTimeRollup(models.Model):
+    """
+    Minutes tracked per user, category, local day and description
+
+    Rows are kept in step with TimeEntry by the signals in
+    time_tracking.signals; see time_tracking.rollups for the maintenance and
+    rebuild logic. Entries that cross midnight are split between days.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='time_rollups', null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, related_name='rollups', null=True, blank=True)
+    date = models.DateField()
+    description_hash = models.CharField(max_length=40)
+    description = models.TextField(null=True, blank=True)
+    minutes = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['category', 'date']),
+            models.Index(fields=['user', 'category', 'date', 'description_hash']),
+        ]
+        constraints = [
+            # One row per key, with a missing user or category counted as a
+            # single key, so concurrent writers add to the same row
+            models.UniqueConstraint(
+                Coalesce('user', 0), Coalesce('category', 0), 'date', 'description_hash',
+                name='unique_daily_time_rollup'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.description} - {self.minutes:.1f} min"
@@ -0,0 +1,255 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from hashlib import sha1
+from typing import Dict, List, Optional, Tuple
+
+from .models import DailyTimeRollup, TimeEntry
+
+BULK_BATCH_SIZE = 500
+
+# Rollup minutes closer to zero than this are treated as empty
+EPSILON = 1e-6
+
+# (user_id, category_id, local date, description)
+RollupKey = Tuple[Optional[int], Optional[int], date, Optional[str]]
+
+ENTRY_FIELDS = ['user_id', 'category_id', 'description', 'start_time', 'end_time']
+
+
+def description_hash(description: Optional[str]) -> str:
+    """Fixed-size key for a description; no description hashes to ''"""
+    if description is None:
+        return ''
+    return sha1(description.encode()).hexdigest()
+
+
+def minutes_to_duration(minutes: float) -> timedelta:
+    return timedelta(microseconds=round(minutes * 60_000_000))
+
+
+def split_by_local_day(start: datetime, end: datetime, tz=None) -> Dict[date, float]:
+    """Minutes between start and end falling on each local calendar day"""
+    tz = tz or timezone.get_default_timezone()
+    minutes = defaultdict(float)
+    current = timezone.localtime(start, tz)
+    end = timezone.localtime(end, tz)
+    while current < end:
+        next_midnight = timezone.make_aware(
+            datetime.combine(current.date() + timedelta(days=1), time.min), tz
+        )
+        chunk_end = min(next_midnight, end)
+        minutes[current.date()] += (chunk_end - current).total_seconds() / 60
+        current = chunk_end
+    return dict(minutes)
+
+
+def entry_values(entry: TimeEntry) -> Dict:
+    return {field: getattr(entry, field) for field in ENTRY_FIELDS}
+
+
+def entry_contributions(values: Optional[Dict]) -> Dict[RollupKey, float]:
+    """Rollup minutes contributed by one entry, given its ENTRY_FIELDS values"""
+    if not values or not values['start_time'] or not values['end_time']:
+        return {}
+    return {
+        (values['user_id'], values['category_id'], day, values['description']): minutes
+        for day, minutes in split_by_local_day(values['start_time'], values['end_time']).items()
+    }
+
+
+def apply_deltas(deltas: Dict[RollupKey, float]):
+    """
+    Add minutes to the rollup rows, creating and removing rows as needed
+
+    Each key is one atomic UPDATE. A missing row is created; if another
+    transaction creates it first, unique_daily_time_rollup rejects the insert
+    and the minutes are added to that row instead.
+    """
+    with transaction.atomic():
+        for (user_id, category_id, day, description), minutes in deltas.items():
+            if abs(minutes) < EPSILON:
+                continue
+
+            rollup = DailyTimeRollup.objects.filter(
+                user_id=user_id, category_id=category_id, date=day,
+                description_hash=description_hash(description)
+            )
+            if rollup.update(minutes=F('minutes') + minutes, updated_at=timezone.now()):
+                rollup.filter(minutes__lt=EPSILON, minutes__gt=-EPSILON).delete()
+                continue
+
+            # Nothing left to subtract from, e.g. the rows were deleted along
+            # with the user
+            if minutes > 0:
+                try:
+                    with transaction.atomic():
+                        DailyTimeRollup.objects.create(
+                            user_id=user_id, category_id=category_id, date=day,
+                            description_hash=description_hash(description),
+                            description=description, minutes=minutes
+                        )
+                except IntegrityError:
+                    rollup.update(minutes=F('minutes') + minutes, updated_at=timezone.now())
+
+
+def add_rollups(deltas: Dict[RollupKey, float]):
+    """
+    Add minutes for new entries to the rollups in bulk
+
+    apply_deltas costs a few queries per key, which is too slow for imports
+    touching thousands of keys. This locks and reads the affected rows in one
+    query, then writes one bulk update and one bulk insert. Only additions
+    are handled; changes to existing entries go through apply_deltas.
+    """
+    additions = {
+        (user_id, category_id, day, description_hash(description)): (description, minutes)
+        for (user_id, category_id, day, description), minutes in deltas.items()
+        if minutes >= EPSILON
+    }
+    if not additions:
+        return
+
+    user_ids = {key[0] for key in additions}
+    users = Q(user_id__in=[user_id for user_id in user_ids if user_id is not None])
+    if None in user_ids:
+        users |= Q(user__isnull=True)
+    days = [key[2] for key in additions]
+
+    with transaction.atomic():
+        existing = {}
+        for rollup in DailyTimeRollup.objects.select_for_update().filter(
+            users, date__gte=min(days), date__lte=max(days)
+        ).order_by('id'):
+            existing.setdefault(
+                (rollup.user_id, rollup.category_id, rollup.date, rollup.description_hash), rollup
+            )
+
+        now = timezone.now()
+        to_update = []
+        to_create = []
+        for key, (description, minutes) in additions.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                user_id, category_id, day, hashed = key
+                to_create.append(DailyTimeRollup(
+                    user_id=user_id, category_id=category_id, date=day,
+                    description_hash=hashed, description=description, minutes=minutes
+                ))
+            else:
+                rollup.minutes += minutes
+                rollup.updated_at = now
+                to_update.append(rollup)
+
+        DailyTimeRollup.objects.bulk_update(to_update, ['minutes', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+        try:
+            with transaction.atomic():
+                DailyTimeRollup.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        except IntegrityError:
+            # Another transaction created some of these rows after the read
+            apply_deltas({
+                (rollup.user_id, rollup.category_id, rollup.date, rollup.description): rollup.minutes
+                for rollup in to_create
+            })
+
+
+def uncategorize_rollups(categories):
+    """
+    Fold the rollups of categories about to be deleted into the uncategorized
+    rows, as the SET_NULL on their entries does
+
+    Left to SET_NULL, rows of two categories sharing a user, day and
+    description would collide on unique_daily_time_rollup.
+    """
+    rollups = DailyTimeRollup.objects.filter(category__in=categories)
+    deltas = defaultdict(float)
+    for row in rollups.values('user_id', 'date', 'description', 'minutes'):
+        deltas[(row['user_id'], None, row['date'], row['description'])] += row['minutes']
+    if not deltas:
+        return
+    with transaction.atomic():
+        rollups.delete()
+        add_rollups(deltas)
+
+
+def record_entry_change(previous: Optional[Dict], current: Optional[Dict]):
+    """Move the rollups from an entry's previous values to its current ones"""
+    deltas = defaultdict(float)
+    for key, minutes in entry_contributions(previous).items():
+        deltas[key] -= minutes
+    for key, minutes in entry_contributions(current).items():
+        deltas[key] += minutes
+    apply_deltas(deltas)
+
+
+def _expected_rollups(user_id=None) -> Dict[RollupKey, float]:
+    entries = TimeEntry.objects.filter(start_time__isnull=False, end_time__isnull=False)
+    if user_id is not None:
+        entries = entries.filter(user_id=user_id)
+
+    totals = defaultdict(float)
+    for values in entries.order_by().values(*ENTRY_FIELDS).iterator():
+        for key, minutes in entry_contributions(values).items():
+            totals[key] += minutes
+    return totals
+
+
+def rebuild_rollups(user_id=None) -> int:
+    """Recompute the rollups from the raw entries, for one user or everyone"""
+    totals = _expected_rollups(user_id)
+    rollups = [
+        DailyTimeRollup(
+            user_id=key_user_id, category_id=category_id, date=day,
+            description_hash=description_hash(description),
+            description=description, minutes=minutes
+        )
+        for (key_user_id, category_id, day, description), minutes in totals.items()
+    ]
+
+    with transaction.atomic():
+        existing = DailyTimeRollup.objects.all()
+        if user_id is not None:
+            existing = existing.filter(user_id=user_id)
+        existing.delete()
+        DailyTimeRollup.objects.bulk_create(rollups, batch_size=BULK_BATCH_SIZE)
+    return len(rollups)
+
+
+def check_rollups(user_id=None, tolerance: float = 0.01) -> List[Dict]:
+    """
+    Compare the rollups against the raw entries
+
+    Returns one dict per (user, category, day, description) whose minutes
+    differ by more than `tolerance`, with the expected and stored minutes.
+    """
+    expected = {
+        (key_user_id, category_id, day, description_hash(description)): (description, minutes)
+        for (key_user_id, category_id, day, description), minutes in _expected_rollups(user_id).items()
+    }
+
+    stored_rows = DailyTimeRollup.objects.all()
+    if user_id is not None:
+        stored_rows = stored_rows.filter(user_id=user_id)
+    stored = {}
+    for row in stored_rows.order_by().values(
+        'user_id', 'category_id', 'date', 'description_hash'
+    ).annotate(total=Sum('minutes')):
+        stored[(row['user_id'], row['category_id'], row['date'], row['description_hash'])] = row['total']
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        description, expected_minutes = expected.get(key, (None, 0.0))
+        stored_minutes = stored.get(key, 0.0)
+        if abs(expected_minutes - stored_minutes) > tolerance:
+            mismatches.append({
+                'user_id': key[0],
+                'category_id': key[1],
+                'date': key[2],
+                'description_hash': key[3],
+                'description': description,
+                'expected_minutes': expected_minutes,
+                'stored_minutes': stored_minutes,
+            })
+    return sorted(mismatches, key=lambda m: (m['date'], str(m['user_id']), str(m['category_id'])))
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from backend.fieldsets import SparseFieldsetMixin
 from .models import Category, TimeEntry
+from .timers import start_timer
 
 class CategorySerializer(serializers.ModelSerializer):
     category_id = serializers.IntegerField(source='id', read_only=True)
@@ -29,7 +31,7 @@ class CategorySerializer(serializers.ModelSerializer):
             color=validated_data['color'],
             user_id=validated_data.get('user_id')  # This should be set in the view
         )
-class TimeEntrySerializer(serializers.ModelSerializer):
+class TimeEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     time_entry_id = serializers.IntegerField(source='id', read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         source='category', 
@@ -54,15 +56,24 @@ class TimeEntrySerializer(serializers.ModelSerializer):
             'is_active'
         ]
     
+    output_names = {
+        'time_entry_id': '_timeEntryId',
+        'description': '_description',
+        'start_time': '_startTime',
+        'end_time': '_endTime',
+        'category_id': '_categoryId',
+        'category_name': '_categoryName'
+    }
+    
     def to_representation(self, instance):
         data = super().to_representation(instance)
+        if 'time_entry_id' in data:
+            data['time_entry_id'] = str(data['time_entry_id'])
+        # Only the fields kept by a sparse fieldset are in data
         return {
-            '_timeEntryId': str(data['time_entry_id']),
-            '_description': data['description'],
-            '_startTime': data['start_time'],
-            '_endTime': data['end_time'],
-            '_categoryId': data['category_id'],
-            '_categoryName': data['category_name']
+            output: data[name]
+            for name, output in self.output_names.items()
+            if name in data
         }
     
     def validate(self, data):
@@ -72,11 +83,12 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        return TimeEntry.objects.create(
-            description=validated_data.get('description'),
-            start_time=validated_data.get('start_time'),
-            end_time=validated_data.get('end_time'),
-            category=validated_data.get('category'),
-            user_id=validated_data.get('user_id'),  # Add this line
-            is_active=validated_data.get('is_active', True)
-    )
+        fields = {
+            'description': validated_data.get('description'),
+            'start_time': validated_data.get('start_time'),
+            'end_time': validated_data.get('end_time'),
+            'category': validated_data.get('category'),
+        }
+        if validated_data.get('is_active', True):
+            return start_timer(validated_data.get('user_id'), **fields)
+        return TimeEntry.objects.create(user_id=validated_data.get('user_id'), is_active=False, **fields)
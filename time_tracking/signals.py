@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Category, TimeEntry
+from .rollups import ENTRY_FIELDS, entry_values, record_entry_change, uncategorize_rollups
+
+
+@receiver(pre_save, sender=TimeEntry)
+def remember_previous_entry(sender, instance, **kwargs):
+    """Keep the stored values so post_save can move the rollups from them"""
+    instance._rollup_previous = None
+    if instance.pk is not None:
+        instance._rollup_previous = TimeEntry.objects.filter(pk=instance.pk).values(*ENTRY_FIELDS).first()
+
+
+@receiver(post_save, sender=TimeEntry)
+def entry_saved(sender, instance, **kwargs):
+    record_entry_change(getattr(instance, '_rollup_previous', None), entry_values(instance))
+
+
+@receiver(post_delete, sender=TimeEntry)
+def entry_deleted(sender, instance, **kwargs):
+    record_entry_change(entry_values(instance), None)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, origin=None, **kwargs):
+    """The category's entries become uncategorized, so its rollups move with them"""
+    # Deleting a user removes their rollups along with the categories
+    if getattr(origin, 'model', type(origin)) is User:
+        return
+    uncategorize_rollups([instance])
@@ -1,8 +1,22 @@
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Category, TimeEntry
-from datetime import datetime, timedelta
+from scheduler.cache import data_version, get_cache
+from goals.models import Goal, Task
+from .models import Category, DailyTimeRollup, TimeEntry
+from .export import export_chunks
+from .imports import import_entries
+from .rollups import check_rollups, rebuild_rollups
+from .timers import start_timer
+from datetime import datetime, timedelta, timezone as dt_timezone
+import csv
+import gzip
+import io
+import json
 from django.utils import timezone
 
 User = get_user_model()
@@ -124,5 +138,388 @@ class TimeTrackingAPITests(APITestCase):
         self.assertEqual(response.data['category_id'], self.category.id)
         self.assertTrue(response.data['is_active'])
 
+class TimeAnalyticsTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        day = timezone.make_aware(datetime(2025, 1, 6), dt_timezone.utc)
+        for start, minutes, category, description in [
+            (day + timedelta(hours=9), 60, self.category, "Revise"),
+            (day + timedelta(hours=11), 30, self.category, "Revise"),
+            (day + timedelta(days=1, hours=9), 45, None, ""),
+        ]:
+            TimeEntry.objects.create(
+                user=self.user, category=category, description=description,
+                start_time=start, end_time=start + timedelta(minutes=minutes)
+            )
+        # Still running, so it has no duration yet
+        TimeEntry.objects.create(user=self.user, description="Running", start_time=day + timedelta(hours=12))
+
+    def test_analytics_totals_are_aggregated_in_the_database(self):
+        url = f'/api/users/{self.user.id}/time-entries/analytics/?_startTime=2025-01-01&_endTime=2025-01-31'
+        # The data stamp plus one GROUP BY query per breakdown
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_duration'], '2:15:00')
+        self.assertEqual(response.data['category_totals'], {
+            'Uncategorized': '0:45:00', 'Study': '1:30:00'
+        })
+        self.assertEqual(list(response.data['daily_stats']), ['2025-01-07', '2025-01-06'])
+        self.assertEqual(response.data['daily_stats']['2025-01-06'], {'Study': '1:30:00'})
+        self.assertEqual(response.data['grouped_entries'], {
+            'Uncategorized': [{'_description': 'No description', '_duration': '0:45:00'}],
+            'Study': [{'_description': 'Revise', '_duration': '1:30:00'}],
+        })
+
+    def test_category_analytics_pages_entries_with_a_cursor(self):
+        url = f'/api/users/{self.user.id}/categories/{self.category.id}/analytics/?_startTime=2025-01-01&_endTime=2025-01-31'
+        # Category lookup, the data stamp and one aggregate query
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['grouped_entries'], [{'_description': 'Revise', '_duration': '1:30:00'}])
+        self.assertEqual(response.data['daily_stats'], {'2025-01-06': '1:30:00'})
+        self.assertNotIn('time_entries', response.data)
+
+        first = self.client.get(url + '&_includeEntries=true&_limit=1').data
+        self.assertEqual(len(first['time_entries']), 1)
+        second = self.client.get(url + f"&_includeEntries=true&_limit=1&_cursor={first['next_cursor']}").data
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(
+            [first['time_entries'][0]['_timeEntryId'], second['time_entries'][0]['_timeEntryId']],
+            [str(pk) for pk in TimeEntry.objects.filter(category=self.category).order_by('start_time').values_list('id', flat=True)]
+        )
+
+        response = self.client.get(url + '&_includeEntries=true&_cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TimeEntryPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        start = timezone.make_aware(datetime(2025, 1, 6, 9), dt_timezone.utc)
+        # Two entries share a start time, so the id breaks the tie
+        for offset in [0, 1, 1, 2, 3]:
+            TimeEntry.objects.create(
+                user=self.user, category=self.category, description="Revise",
+                start_time=start + timedelta(hours=offset),
+                end_time=start + timedelta(hours=offset, minutes=30)
+            )
+        self.url = f'/api/users/{self.user.id}/time-entries/'
+
+    def test_cursor_pages_walk_every_entry_without_counting(self):
+        self.assertIn('count', self.client.get(self.url).data)
+
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            # One range query per page and no COUNT(*)
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, {'_cursor': cursor, '_limit': 2})
+            self.assertNotIn('count', response.data)
+            seen.extend(entry['_timeEntryId'] for entry in response.data['results'])
+            cursor = response.data['next_cursor']
+
+        expected = TimeEntry.objects.filter(user=self.user).order_by('-start_time', '-id')
+        self.assertEqual(seen, [str(pk) for pk in expected.values_list('id', flat=True)])
+
+        response = self.client.get(self.url, {'_cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_trim_output_and_selected_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'_cursor': '', '_fields': '_startTime,_categoryName'})
+        self.assertEqual(set(response.data['results'][0]), {'_startTime', '_categoryName'})
+        self.assertNotIn('"description"', queries[0]['sql'])
+
+        response = self.client.get(self.url, {'_fields': '_startTime,bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TimeEntryExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        start = timezone.make_aware(datetime(2025, 1, 6, 9), dt_timezone.utc)
+        for offset in [3, 0, 1, 1, 2]:
+            TimeEntry.objects.create(
+                user=self.user, category=self.category, description=f"Entry {offset}",
+                start_time=start + timedelta(hours=offset),
+                end_time=start + timedelta(hours=offset, minutes=30)
+            )
+        # No start time, so it is exported ahead of the timed entries
+        TimeEntry.objects.create(user=self.user, description="Draft")
+        self.url = f'/api/users/{self.user.id}/time-entries/export/'
+
+    def test_chunks_are_separate_bounded_queries(self):
+        entries = TimeEntry.objects.filter(user=self.user)
+        # One query for the undated part, three chunks of two for the rest
+        with self.assertNumQueries(4):
+            chunks = list(export_chunks(entries, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 2, 2, 1])
+        self.assertEqual(
+            [row['_timeEntryId'] for chunk in chunks for row in chunk],
+            [str(pk) for pk in entries.order_by('start_time', 'id').values_list('id', flat=True)]
+        )
+
+    def test_export_streams_ndjson_csv_and_gzip(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['_description'], "Draft")
+        self.assertEqual(rows[1]['_categoryName'], "Study")
+
+        response = self.client.get(self.url, {'_format': 'csv', '_gzip': 'true'})
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['_description'] for row in rows][-2:], ["Entry 2", "Entry 3"])
+
+        self.assertEqual(self.client.get(self.url, {'_format': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_streams_asynchronously_under_asgi(self):
+        async def export():
+            response = await self.async_client.get(self.url)
+            return response, b''.join([part async for part in response.streaming_content])
+
+        with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+            with self.assertNumQueries(2):
+                response, content = async_to_sync(export)()
+        # An async iterator is sent chunk by chunk instead of being read into a list
+        self.assertTrue(response.is_async)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['_description'] for row in rows][:2], ["Draft", "Entry 0"])
+
+class TimeEntryImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        self.url = f'/api/users/{self.user.id}/time-entries/import/'
+
+    def test_import_reports_row_errors(self):
+        TimeEntry.objects.create(
+            user=self.user, start_time=datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc),
+            end_time=datetime(2025, 1, 6, 10, tzinfo=dt_timezone.utc)
+        )
+        version = data_version(self.user.id)
+        rows = [
+            {'_startTime': '2025-01-06T10:00:00Z', '_endTime': '2025-01-06T10:30:00Z', '_categoryId': self.category.id},
+            {'_startTime': '2025-01-06T09:30:00Z', '_endTime': '2025-01-06T10:15:00Z'},
+            {'_startTime': '2025-01-06T11:00:00Z', '_endTime': '2025-01-06T12:00:00Z', '_categoryName': "Study"},
+            {'_startTime': '2025-01-06T11:30:00Z', '_endTime': '2025-01-06T11:45:00Z'},
+            {'_startTime': '2025-01-06T14:00:00Z', '_endTime': '2025-01-06T13:00:00Z'},
+            {'_startTime': '2025-01-06T15:00:00Z', '_endTime': '2025-01-06T16:00:00Z', '_categoryName': "Nope"},
+            "not an entry",
+            {'_description': "Late", '_startTime': '2025-01-07T23:00:00', '_endTime': '2025-01-08T01:00:00'},
+            {'_startTime': '2025-01-06T17:00:00Z', '_endTime': '2025-01-06T18:00:00Z', '_categoryId': True},
+        ]
+        response = self.client.post(self.url, {'entries': rows}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4, 5, 6, 7, 9])
+        self.assertEqual(response.data['errors'][1]['errors'], {'_startTime': ["Overlaps row 3"]})
+        self.assertEqual(response.data['errors'][5]['errors'], {'_categoryId': ["Category id must be an integer"]})
+        self.assertEqual(TimeEntry.objects.filter(user=self.user, category=self.category).count(), 2)
+        self.assertFalse(TimeEntry.objects.filter(description="Late", is_active=True).exists())
+        # bulk_create skips the signals, so the import keeps these itself
+        self.assertEqual(check_rollups(), [])
+        self.assertNotEqual(data_version(self.user.id), version)
+
+        response = self.client.post(self.url, [rows[1]], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_csv_export_imports_into_another_user(self):
+        start = datetime(2025, 1, 6, 9, tzinfo=dt_timezone.utc)
+        for hour in range(3):
+            TimeEntry.objects.create(
+                user=self.user, category=self.category, description=f"Entry {hour}",
+                start_time=start + timedelta(hours=hour), end_time=start + timedelta(hours=hour, minutes=45)
+            )
+        response = self.client.get(f'/api/users/{self.user.id}/time-entries/export/', {'_format': 'csv'})
+        content = b''.join(response.streaming_content)
+
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        Category.objects.create(user=other, name="Study", color="#FFFFFF")
+        response = self.client.generic(
+            'POST', f'/api/users/{other.id}/time-entries/import/', content, content_type='text/csv'
+        )
+        self.assertEqual(response.data, {'created': 3, 'errors': []})
+        self.assertEqual(
+            list(TimeEntry.objects.filter(user=other).order_by('start_time').values_list('description', 'category__name')),
+            [(f"Entry {hour}", "Study") for hour in range(3)]
+        )
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def query_count(day, count):
+            start = datetime(2025, 2, day, tzinfo=dt_timezone.utc)
+            rows = [{
+                '_description': f"Entry {index % 5}", '_categoryName': "Study",
+                '_startTime': (start + timedelta(minutes=10 * index)).isoformat(),
+                '_endTime': (start + timedelta(minutes=10 * index + 5)).isoformat(),
+            } for index in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(import_entries(self.user.id, rows).created, count)
+            return len(queries)
+
+        self.assertEqual(query_count(1, 10), query_count(10, 100))
+        self.assertEqual(check_rollups(), [])
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+        now = timezone.now()
+        for days in [0, 2, 6]:
+            start = now - timedelta(days=days, hours=1)
+            TimeEntry.objects.create(
+                user=self.user, category=self.category if days else None, description=f"Entry {days}",
+                start_time=start, end_time=start + timedelta(minutes=30)
+            )
+        TimeEntry.objects.create(user=self.user, category=self.category, description="Running", start_time=now, is_active=True)
+
+    def test_async_reads_match_the_sync_views(self):
+        base = f'/api/users/{self.user.id}/time-entries/'
+        today = timezone.localdate()
+        for url in [
+            f'{base}current_time_entry/',
+            f'{base}current_time_entry/?_fields=_description,_categoryName',
+            f'{base}recent_entries/',
+            f'{base}analytics/?_startTime={today - timedelta(days=7):%Y-%m-%d}&_endTime={today + timedelta(days=1):%Y-%m-%d}',
+            f'{base}analytics/?_startTime=2025-01-01',
+        ]:
+            expected = self.client.get(url)
+            get_cache().clear()
+            with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+                response = async_to_sync(self.async_client.get)(url)
+                self.assertEqual(response.resolver_match.func.__module__, 'time_tracking.async_views')
+            self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()), url)
+
+        # Other methods on the same paths are served by the sync views
+        with self.settings(ROOT_URLCONF='backend.asgi_urls'):
+            response = async_to_sync(self.async_client.post)(f'{base}analytics/')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+class ActiveTimerTests(APITestCase):
+    def test_one_active_entry_per_user(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        start = timezone.make_aware(datetime(2025, 1, 6, 9), dt_timezone.utc)
+        TimeEntry.objects.bulk_create([
+            TimeEntry(user=user, start_time=start, is_active=True),
+            TimeEntry(user=other, start_time=start, is_active=True),
+        ])
+        stopped = TimeEntry.objects.create(user=user, start_time=start, end_time=start + timedelta(hours=1))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TimeEntry.objects.filter(pk=stopped.pk).update(is_active=True)
+        self.assertEqual(TimeEntry.objects.filter(is_active=True).count(), 2)
+
+    def test_starting_a_timer_only_stops_the_users_own_entry(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        running = start_timer(user.pk, description="Revise")
+        others = start_timer(other.pk, description="Work")
+
+        with CaptureQueriesContext(connection) as queries:
+            switched = start_timer(user.pk, description="Practice paper")
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"user_id"', updates[0])
+
+        self.assertEqual(
+            set(TimeEntry.objects.filter(is_active=True).values_list('id', flat=True)),
+            {switched.pk, others.pk}
+        )
+        running.refresh_from_db()
+        self.assertFalse(running.is_active)
+
+        response = self.client.post(
+            f'/api/users/{user.pk}/time-entries/', {'description': "Mock exam"}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            TimeEntry.objects.get(user=user, is_active=True).pk, int(response.data['_timeEntryId'])
+        )
+
+class DailyTimeRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name="Study", color="#FFFFFF")
+
+    def minutes_by_day(self):
+        return {
+            rollup.date.isoformat(): rollup.minutes
+            for rollup in DailyTimeRollup.objects.filter(user=self.user)
+        }
+
+    def test_entries_crossing_local_midnight_are_split(self):
+        # 23:00-01:30 in Asia/Kolkata
+        start = timezone.make_aware(datetime(2025, 1, 6, 23))
+        entry = TimeEntry.objects.create(
+            user=self.user, category=self.category, description="Revise",
+            start_time=start, end_time=start + timedelta(hours=2, minutes=30)
+        )
+        self.assertEqual(self.minutes_by_day(), {'2025-01-06': 60.0, '2025-01-07': 90.0})
+
+        entry.end_time = start + timedelta(minutes=30)
+        entry.save()
+        self.assertEqual(self.minutes_by_day(), {'2025-01-06': 30.0})
+
+        entry.delete()
+        self.assertEqual(self.minutes_by_day(), {})
+
+    def test_check_and_rebuild_against_raw_entries(self):
+        start = timezone.make_aware(datetime(2025, 1, 6, 9))
+        TimeEntry.objects.create(
+            user=self.user, category=self.category, description="Revise",
+            start_time=start, end_time=start + timedelta(hours=1)
+        )
+        self.assertEqual(check_rollups(), [])
+
+        DailyTimeRollup.objects.update(minutes=10)
+        self.assertEqual(len(check_rollups()), 1)
+
+        rebuild_rollups(user_id=self.user.id)
+        self.assertEqual(check_rollups(), [])
+        goal = Goal.objects.create(user=self.user, name="Exams")
+        task = Task.objects.create(goal=goal, title="Revise", category=self.category)
+        self.assertEqual(task.actual_time_spent, 60.0)
+        self.assertEqual(Task.objects.with_actual_time_spent().get(pk=task.pk).actual_time_spent, 60.0)
+
+    def test_one_row_per_key_even_without_a_category(self):
+        start = timezone.make_aware(datetime(2025, 1, 6, 9))
+        for hour in range(2):
+            TimeEntry.objects.create(
+                user=self.user, description="Revise",
+                start_time=start + timedelta(hours=hour), end_time=start + timedelta(hours=hour, minutes=30)
+            )
+        rollup = DailyTimeRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.minutes, 60.0)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyTimeRollup.objects.create(
+                user=self.user, date=rollup.date, description_hash=rollup.description_hash, minutes=1
+            )
+
+    def test_deleting_categories_folds_their_rollups_into_uncategorized(self):
+        start = timezone.make_aware(datetime(2025, 1, 6, 9))
+        work = Category.objects.create(user=self.user, name="Work")
+        for hour, category in enumerate([self.category, work, None]):
+            TimeEntry.objects.create(
+                user=self.user, category=category, description="Revise",
+                start_time=start + timedelta(hours=hour), end_time=start + timedelta(hours=hour, minutes=30)
+            )
+
+        Category.objects.filter(user=self.user).delete()
+        self.assertEqual(self.minutes_by_day(), {'2025-01-06': 90.0})
+        self.assertEqual(check_rollups(), [])
+
+        self.user.delete()
+        self.assertFalse(DailyTimeRollup.objects.exists())
+
 # Run tests with:
 # python manage.py test time_tracking
@@ -0,0 +1,23 @@
+from django.db import IntegrityError, transaction
+
+from .models import TimeEntry
+
+START_ATTEMPTS = 3
+
+
+def start_timer(user_id, **fields) -> TimeEntry:
+    """
+    Start a running entry for a user, stopping the one already running
+
+    TimeEntry.save stops the running entry with one conditional UPDATE and
+    inserts the new one in the same transaction. Two starts for the same
+    user at once collide on the one_active_time_entry_per_user index; the
+    loser retries, stopping the winner's entry, so the last start wins.
+    """
+    for attempt in range(START_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return TimeEntry.objects.create(user_id=user_id, is_active=True, **fields)
+        except IntegrityError:
+            if attempt == START_ATTEMPTS - 1:
+                raise
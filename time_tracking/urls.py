@@ -27,5 +27,7 @@ urlpatterns = [
         path('time-entries/current_time_entry/', TimeEntryViewSet.as_view({'get': 'current_time_entry'})),
         path('time-entries/recent_entries/', TimeEntryViewSet.as_view({'get': 'recent_entries'})),
         path('time-entries/analytics/', TimeEntryViewSet.as_view({'get': 'analytics'})),
+        path('time-entries/export/', TimeEntryViewSet.as_view({'get': 'export'})),
+        path('time-entries/import/', TimeEntryViewSet.as_view({'post': 'import_entries'})),
     ])),
 ] 
\ No newline at end of file
@@ -2,13 +2,36 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db.models import Sum, Q, F, DurationField
 from datetime import timedelta, datetime
 from django.shortcuts import get_object_or_404
-from collections import defaultdict
+from django.contrib.auth.models import User
+import csv
+from scheduler.cache import cached_for_user
 from .models import Category, TimeEntry
 from .serializers import CategorySerializer, TimeEntrySerializer
+from .analytics import (
+    category_analytics, recent_entries_by_day, recent_entries_query, time_analytics,
+    time_analytics_response
+)
+from .export import EXPORT_CONTENT_TYPES, export_entries
+from .imports import MAX_IMPORT_ROWS, import_entries, parse_csv
+from backend.async_views import iterate_in_thread
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.pagination import InvalidCursor, KeysetPagination, keyset_page
+
+# Raw entries returned per page by CategoryViewSet.analytics
+ENTRY_PAGE_SIZE = 100
+MAX_ENTRY_PAGE_SIZE = 500
+
+class TimeEntryPagination(KeysetPagination):
+    ordering = ('-start_time', '-id')
+    cursor_query_param = '_cursor'
+    limit_query_param = '_limit'
+    max_limit = MAX_ENTRY_PAGE_SIZE
 
 class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
@@ -56,24 +79,31 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get all entries for this category
-        entries = TimeEntry.objects.filter(
-            category=category,
-            user_id=user_id,
-            start_time__gte=start_date,
-            start_time__lte=end_date
-        ).order_by('start_time')
-
-        # Group entries by description
-        grouped_entries = defaultdict(timedelta)
-        for entry in entries:
-            grouped_entries[entry.description] += entry.duration
-
-        # Calculate daily stats
-        daily_stats = defaultdict(timedelta)
-        for entry in entries:
-            date_str = entry.start_time.date().isoformat()
-            daily_stats[date_str] += entry.duration
+        include_entries = request.query_params.get('_includeEntries', '').lower() in ('1', 'true')
+        cursor = request.query_params.get('_cursor')
+        try:
+            limit = max(1, min(int(request.query_params.get('_limit', ENTRY_PAGE_SIZE)), MAX_ENTRY_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {"error": "_limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            response_data = cached_for_user(
+                user_id, 'category-analytics',
+                (category.pk, start_date, end_date, include_entries, cursor, limit),
+                lambda: self._analytics_data(
+                    category, user_id, start_date, end_date, include_entries, cursor, limit
+                )
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(response_data)
+
+    def _analytics_data(self, category, user_id, start_date, end_date, include_entries, cursor, limit):
+        # Per-description and per-day totals in one query on the daily rollups
+        grouped_entries, daily_stats = category_analytics(category, user_id, start_date, end_date)
 
         # Calculate total duration
         total_duration = sum(grouped_entries.values(), timedelta())
@@ -96,19 +126,32 @@ class CategoryViewSet(viewsets.ModelViewSet):
                     '_duration': str(duration)
                 }
                 for description, duration in grouped_entries.items()
-            ],
-            'time_entries': TimeEntrySerializer(entries, many=True).data
+            ]
         }
 
-        return Response(response_data)
-
-class TimeEntryViewSet(viewsets.ModelViewSet):
+        if include_entries:
+            # Raw entries are paged by (start_time, id) so deep pages stay cheap
+            entries = TimeEntry.objects.filter(
+                category=category,
+                user_id=user_id,
+                start_time__gte=start_date,
+                start_time__lte=end_date
+            ).select_related('category')
+            page, next_cursor = keyset_page(entries, ('start_time', 'id'), cursor, limit)
+            response_data['time_entries'] = TimeEntrySerializer(page, many=True).data
+            response_data['next_cursor'] = next_cursor
+
+        return response_data
+
+class TimeEntryViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = TimeEntrySerializer
     permission_classes = [AllowAny]
+    pagination_class = TimeEntryPagination
+    fields_query_param = '_fields'
 
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
-        queryset = TimeEntry.objects.filter(user_id=user_id)
+        queryset = TimeEntry.objects.filter(user_id=user_id).select_related('category')
         
         category_id = self.request.query_params.get('_categoryId')
         start_date = self.request.query_params.get('_startTime')
@@ -134,8 +177,8 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
         return queryset.order_by('-start_time')
 
     def perform_create(self, serializer):
+        # The serializer starts it with start_timer, which stops the running one
         user_id = self.kwargs.get('user_id')
-        TimeEntry.objects.filter(user_id=user_id, is_active=True).update(is_active=False)
         serializer.save(user_id=user_id, is_active=True)
 
     def perform_update(self, serializer):
@@ -154,43 +197,80 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
         except TimeEntry.DoesNotExist:
             return Response(None)
 
+    @action(detail=False, methods=['get'])
+    def export(self, request, user_id=None):
+        """
+        Stream every matching entry as NDJSON (default) or CSV
+
+        Takes the list filters plus _format=ndjson|csv and _gzip=true. Rows
+        are read in keyset chunks, so memory stays flat for any history.
+        """
+        export_format = request.query_params.get('_format', 'ndjson')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"error": f"_format must be one of: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        compress = request.query_params.get('_gzip', '').lower() in ('1', 'true')
+
+        filename = f'time-entries-{user_id}.{export_format}'
+        content_type = EXPORT_CONTENT_TYPES[export_format]
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        content = export_entries(self.get_queryset(), export_format, compress)
+        if isinstance(request._request, ASGIRequest):
+            # Fetch each keyset chunk from the event loop rather than have the
+            # whole export read into memory first
+            content = iterate_in_thread(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_entries(self, request, user_id=None):
+        """
+        Create completed entries in bulk from a JSON list or a CSV body
+
+        JSON bodies are a list of rows or {"entries": [...]}; a text/csv body
+        is read by its header. Rows use the export's keys. Valid rows are
+        imported and the invalid ones listed with their errors.
+        """
+        user = get_object_or_404(User, pk=user_id)
+
+        if request.content_type.startswith('text/csv'):
+            try:
+                rows = parse_csv(request.body.decode('utf-8-sig'))
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({"error": f"Invalid CSV: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('entries') if isinstance(request.data, dict) else request.data
+            if not isinstance(rows, list):
+                return Response(
+                    {"error": "Expected a list of entries"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response(
+                {"error": f"At most {MAX_IMPORT_ROWS} entries can be imported at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = import_entries(user.pk, rows)
+        failed = result.errors and not result.created
+        return Response(
+            {'created': result.created, 'errors': result.errors},
+            status=status.HTTP_400_BAD_REQUEST if failed else status.HTTP_201_CREATED
+        )
+
     @action(detail=False, methods=['get'])
     def recent_entries(self, request, user_id=None):
-        # Get entries from last 7 days
+        # Entries from the last 7 days, grouped by the day they started
         end_date = timezone.now()
-        start_date = end_date - timedelta(days=7)
-        
-        entries = TimeEntry.objects.filter(
-            user_id=user_id,
-            start_time__gte=start_date,
-            start_time__lte=end_date
-        ).order_by('-start_time')
-
-        # Initialize response dictionary with all dates in the range
-        response_data = {}
-        current_date = end_date.date()
-        for _ in range(7):
-            response_data[current_date.isoformat()] = []
-            current_date -= timedelta(days=1)
-
-        # Group entries by date
-        for entry in entries:
-            date_str = entry.start_time.date().isoformat()
-            entry_data = {
-                "id": entry.id,
-                "description": entry.description,
-                "start_time": entry.start_time.isoformat(),
-                "end_time": entry.end_time.isoformat() if entry.end_time else None,
-                "category": entry.category.name if entry.category else "Uncategorized",
-                "is_active": entry.is_active,
-                "duration": str(entry.duration),
-                "created_at": entry.created_at.isoformat(),
-                "updated_at": entry.updated_at.isoformat(),
-                "user_id": user_id
-            }
-            response_data[date_str].append(entry_data)
-
-        return Response(response_data)
+        entries = recent_entries_query(user_id, end_date)
+        return Response(recent_entries_by_day(user_id, entries, end_date))
 
     @action(detail=False, methods=['get'])
     def analytics(self, request, user_id=None):
@@ -213,65 +293,15 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Base query
-        query = Q(
-            user_id=user_id,
-            start_time__gte=start_date,
-            start_time__lte=end_date
+        response_data = cached_for_user(
+            user_id, 'time-analytics', (start_date, end_date, category_id),
+            lambda: self._analytics_data(user_id, start_date, end_date, category_id)
         )
-
-        if category_id:
-            query &= Q(category_id=category_id)
-
-        entries = TimeEntry.objects.filter(query)
-
-        # Group entries by description and category
-        grouped_entries = defaultdict(lambda: defaultdict(timedelta))
-        category_stats = defaultdict(timedelta)
-        daily_stats = defaultdict(lambda: defaultdict(timedelta))
-        
-        for entry in entries:
-            category_name = entry.category.name if entry.category else "Uncategorized"
-            description = entry.description or "No description"
-            date_str = entry.start_time.date().isoformat()
-            
-            # Group by description and category
-            grouped_entries[category_name][description] += entry.duration
-            
-            # Update category totals
-            category_stats[category_name] += entry.duration
-            
-            # Update daily stats
-            daily_stats[date_str][category_name] += entry.duration
-
-        # Calculate total duration
-        total_duration = sum(category_stats.values(), timedelta())
-
-        # Format the response
-        response_data = {
-            'user_id': user_id,
-            'total_duration': str(total_duration),
-            'category_totals': {
-                category: str(duration)
-                for category, duration in category_stats.items()
-            },
-            'daily_stats': {
-                date: {
-                    category: str(duration)
-                    for category, duration in categories.items()
-                }
-                for date, categories in daily_stats.items()
-            },
-            'grouped_entries': {
-                category: [
-                    {
-                        '_description': description,
-                        '_duration': str(duration)
-                    }
-                    for description, duration in descriptions.items()
-                ]
-                for category, descriptions in grouped_entries.items()
-            }
-        }
-
         return Response(response_data)
+
+    def _analytics_data(self, user_id, start_date, end_date, category_id):
+        # Totals are read from the daily rollups; entries still running have
+        # no duration yet and are left out
+        return time_analytics_response(
+            user_id, *time_analytics(user_id, start_date, end_date, category_id)
+        )